@@ -1,8 +1,10 @@
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
+from django.conf import settings
+from channels.routing import ChannelNameRouter, ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 from core import routing
+from core.workers import AccountTaskConsumer
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
@@ -13,4 +15,8 @@ application = ProtocolTypeRouter({
             routing.websocket_urlpatterns
         )
     ),
+    # Background account jobs: python manage.py runworker account-tasks
+    "channel": ChannelNameRouter({
+        settings.ACCOUNT_TASKS_CHANNEL: AccountTaskConsumer.as_asgi(),
+    }),
 })
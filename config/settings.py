@@ -6,7 +6,7 @@ Generated by 'django-admin startproject' using Django 5.0.6.
 
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 from django.core.management.utils import get_random_secret_key
 from datetime import timedelta
 
@@ -32,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
     'django_extensions',
     'core',
     'rest_framework',
@@ -46,11 +47,19 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Answers /healthz and /readyz before anything else runs (see core.health)
+    'core.health.HealthCheckMiddleware',
+    # Next, so the rest of the chain is profiled (see core.profiler)
+    'core.profiler.ProfilerMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.querybudget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    # Requests for LEAN_API_PATHS go straight to the view from here
+    'core.middleware.LeanAPIMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -58,6 +67,20 @@ MIDDLEWARE = [
     'allauth.account.middleware.AccountMiddleware',
 ]
 
+# Exact paths of JWT-only API routes that need no sessions, CSRF, messages or allauth (see
+# core.middleware). dj-rest-auth's login, logout, registration and password views, the account
+# password, export and delete routes, and batch (whose sub-requests can reach any route) keep
+# the full chain.
+LEAN_API_PATHS = [
+    '/core/user/profile/',
+    '/core/users/',
+    '/core/auth/user/',
+    '/core/auth/token/verify/',
+    '/core/auth/token/refresh/',
+    '/metrics',
+    '/core/payments/webhook/',
+]
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -126,10 +149,28 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Rest Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'dj_rest_auth.jwt_auth.JWTCookieAuthentication',
+        'core.authentication.CachedJWTCookieAuthentication',
     ),
 }
 
+# Query budgets per URL name and method (see core.querybudget)
+QUERY_BUDGET_MODE = config('QUERY_BUDGET_MODE', default='warn' if DEBUG else 'off')        # 'off', 'warn' or 'raise'
+QUERY_BUDGET_REPEAT_THRESHOLD = config('QUERY_BUDGET_REPEAT_THRESHOLD', default=5, cast=int)  # Same statement this often in one request: likely N+1
+QUERY_BUDGETS = {
+    'rest_register': {'POST': 15},
+    'rest_login': {'POST': 6},
+    'user-profile': {'GET': 2, 'PUT': 3, 'PATCH': 3},   # On a cold auth cache: auth fields, then the full user
+    'user-directory': {'GET': 3},
+    'payment-webhook': {'POST': 4},       # Insert in a savepoint, rolled back for duplicates
+}
+
+# Serve the profile and password endpoints from async-native views
+ASYNC_API_VIEWS = config('ASYNC_API_VIEWS', default=False, cast=bool)
+
+# Batch endpoint settings
+BATCH_MAX_REQUESTS = 20     # Maximum number of sub-requests in a single batch
+BATCH_MAX_WORKERS = config('BATCH_MAX_WORKERS', default=4, cast=int)  # Threads for concurrent GET sub-requests (1 disables)
+
 # JWT settings
 REST_USE_JWT = True
 JWT_AUTH_COOKIE = 'my-app-auth'
@@ -143,18 +184,70 @@ REST_AUTH = {
     'USER_DETAILS_SERIALIZER': 'core.serializers.CustomUserDetailsSerializer',
 }
 
+# Cache
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': config('CACHE_REDIS_URL', default='redis://127.0.0.1:6379/1'),
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'LOCAL_MAX_ENTRIES': config('CACHE_LOCAL_MAX_ENTRIES', default=10000, cast=int),         # Per-process LRU size
+            'LOCAL_TIMEOUT': config('CACHE_LOCAL_TIMEOUT', default=5, cast=int),                     # Max staleness across processes (seconds)
+            'LOCAL_VERSION_TIMEOUT': config('CACHE_LOCAL_VERSION_TIMEOUT', default=1, cast=float),   # Seconds a scope version is reused before re-reading Redis
+            'socket_connect_timeout': 0.5,
+            'socket_timeout': 0.5,
+        },
+    },
+}
+
 # Redis
+CHANNEL_REDIS_HOSTS = config('CHANNEL_REDIS_HOSTS', default='redis://127.0.0.1:6379', cast=Csv())  # Comma-separated Redis URLs
+CHANNEL_LAYER_SHARDED = config('CHANNEL_LAYER_SHARDED', default=False, cast=bool)                 # Consistent hashing with failover (see core.channel_layer)
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'BACKEND': 'core.channel_layer.ShardedChannelLayer' if CHANNEL_LAYER_SHARDED else 'channels_redis.core.RedisChannelLayer',
         'CONFIG': {
-            'hosts': [('127.0.0.1', 6379)],
+            'hosts': CHANNEL_REDIS_HOSTS,
         },
     },
 }
+if CHANNEL_LAYER_SHARDED:
+    CHANNEL_LAYERS['default']['CONFIG']['failover_cooldown'] = config('CHANNEL_LAYER_FAILOVER_COOLDOWN', default=10, cast=int)  # Seconds a failed node stays off the ring
+
+# WebSocket heartbeats (see core.consumers)
+WEBSOCKET_HEARTBEAT_INTERVAL = config('WEBSOCKET_HEARTBEAT_INTERVAL', default=25, cast=int)  # Seconds of silence before the server pings a socket
+WEBSOCKET_IDLE_TIMEOUT = config('WEBSOCKET_IDLE_TIMEOUT', default=75, cast=int)              # Seconds of silence before a socket is closed
+
+# On-demand request profiling, switched on with ProfilerRule in the admin (see core.profiler)
+PROFILER_ENABLED = config('PROFILER_ENABLED', default=True, cast=bool)                    # False removes the middleware entirely
+PROFILER_INTERVAL = config('PROFILER_INTERVAL', default=0.005, cast=float)                # Seconds between stack samples
+PROFILER_MAX_PROFILES = config('PROFILER_MAX_PROFILES', default=200, cast=int)            # Stored profiles kept (oldest are dropped)
+PROFILER_REFRESH_INTERVAL = 10                                                            # Seconds between background rule reloads per process
+
+# Load balancer probes (see core.health)
+HEALTH_CHECK_TIMEOUT = config('HEALTH_CHECK_TIMEOUT', default=2, cast=float)        # Seconds each /readyz dependency check may take
+HEALTH_CHECK_CACHE_TTL = config('HEALTH_CHECK_CACHE_TTL', default=2, cast=float)    # Seconds a /readyz report is reused per process
+
+# Background account jobs (see core.workers)
+ACCOUNT_TASKS_CHANNEL = 'account-tasks'
+ACCOUNT_JOB_LEASE = config('ACCOUNT_JOB_LEASE', default=900, cast=int)                  # Seconds a worker holds a job before it is retried
+ACCOUNT_JOB_MAX_ATTEMPTS = config('ACCOUNT_JOB_MAX_ATTEMPTS', default=3, cast=int)      # Claims of a job before it is marked failed
+DATA_EXPORT_TTL_HOURS = config('DATA_EXPORT_TTL_HOURS', default=48, cast=int)   # How long a data export can be downloaded
+ACCOUNT_DELETION_BATCH_SIZE = config('ACCOUNT_DELETION_BATCH_SIZE', default=500, cast=int)    # Rows per DELETE transaction
+ACCOUNT_DELETION_BATCH_PAUSE = config('ACCOUNT_DELETION_BATCH_PAUSE', default=0.0, cast=float)  # Seconds to sleep between batches
+
+# Metrics
+METRICS_MULTIPROCESS_DIR = config('METRICS_MULTIPROCESS_DIR', default=None)    # Shared directory for per-process snapshots
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5, cast=int)  # Seconds between snapshot writes
+METRICS_AUTH_TOKEN = config('METRICS_AUTH_TOKEN', default=None)                # Bearer token required by /metrics, if set
 
 # Stripe
 STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY')
+STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default=None)                     # Signing secret of the webhook endpoint
+PAYMENT_WEBHOOK_TOLERANCE = 300                                                           # Max age of a webhook signature (seconds)
+PAYMENT_EVENT_MAX_ATTEMPTS = config('PAYMENT_EVENT_MAX_ATTEMPTS', default=8, cast=int)    # Processing attempts before an event is marked failed
+PAYMENT_EVENT_LEASE = config('PAYMENT_EVENT_LEASE', default=300, cast=int)               # Seconds before an unfinished claim is retried
+PAYMENT_WORKERS = config('PAYMENT_WORKERS', default=4, cast=int)                          # Threads in the payment worker
 
 # Authentication
 AUTHENTICATION_BACKENDS = (
@@ -170,6 +263,8 @@ ACCOUNT_USER_MODEL_USERNAME_FIELD = None
 ACCOUNT_EMAIL_VERIFICATION = 'mandatory' if not DEBUG else 'optional'
 ACCOUNT_ADAPTER = 'core.adapters.CustomAccountAdapter'
 ACCOUNT_EMAIL_CONFIRMATION_EXPIRE_DAYS = 3
+ACCOUNT_EMAIL_CONFIRMATION_HMAC = True      # Never write EmailConfirmation rows
+EMAIL_CONFIRMATION_STATELESS = True         # Confirm with signed keys and a single UPDATE (see core.email_confirmation)
 ACCOUNT_EMAIL_SUBJECT_PREFIX = 'Welcome to the Boilerplate'
 
 # Login and logout URL configuration
@@ -217,14 +312,26 @@ CORS_ALLOWED_ORIGINS = ["https://localhost:3000"]
 SITE_ID = 1
 
 # Logging configuration
-from utils.custom_logging import get_colored_console_handler
+from utils.custom_logging import get_console_handler
+
+LOG_FORMAT = config('LOG_FORMAT', default='color')                          # 'color' or 'json'
+LOG_USE_QUEUE = config('LOG_USE_QUEUE', default=not DEBUG, cast=bool)       # Format and write records on a listener thread
+ACCESS_LOG_SAMPLE_RATE = config('ACCESS_LOG_SAMPLE_RATE', default=1.0, cast=float)  # Fraction of successful access-log lines kept
 
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'access_sampler': {
+            '()': 'utils.custom_logging.AccessLogSampler',
+            'rate': ACCESS_LOG_SAMPLE_RATE,
+        },
+    },
     'handlers': {
         'console': {
-            '()': get_colored_console_handler,
+            '()': get_console_handler,
+            'fmt': LOG_FORMAT,
+            'use_queue': LOG_USE_QUEUE,
         },
     },
     'loggers': {
@@ -232,6 +339,7 @@ LOGGING = {
         'django': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
         'django.server': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
         'daphne': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'daphne.access': {'handlers': ['console'], 'filters': ['access_sampler'], 'level': 'INFO', 'propagate': False},
         'twisted': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
     },
 }
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+Deletes an account in the background, in bounded batches.
+
+Django's delete() collects every dependent row into memory and deletes it all in one
+transaction. Here dependents are walked children-first through the model relations, and
+each batch of at most ACCOUNT_DELETION_BATCH_SIZE rows is removed with a raw
+`DELETE ... WHERE id IN (...)` in its own short transaction. Files referenced by deleted
+rows are removed from storage once their batch has committed.
+
+Relations are handled like delete() would: CASCADE rows are deleted, SET_NULL, SET_DEFAULT
+and SET() rows are updated, DO_NOTHING rows are left alone. PROTECT and RESTRICT cannot be
+honoured batch by batch, so schedule_deletion() refuses to start if any is reachable.
+
+A deletion is a job leased through core.workers: a lost message or a dead worker is
+retried, and so is a failed run, up to ACCOUNT_JOB_MAX_ATTEMPTS; requeue_deletions() runs
+failed ones again. Every batch is idempotent, so a retry picks up where the last run stopped.
+
+Raw deletes send no pre_delete/post_delete signals; the user's cache scope is bumped
+explicitly when the User row is deleted.
+"""
+import functools
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+from django.db.models import CASCADE, DO_NOTHING, PROTECT, RESTRICT
+from django.utils import timezone
+
+from .cache import bump_version_on_commit, user_scope
+from .models import AccountDeletion, User
+from .workers import claim, enqueue, lease_end, leased
+
+import logging
+logger = logging.getLogger(__name__)
+
+def schedule_deletion(user):
+    """
+    Deactivate the account now and queue the deletion of its data.
+    """
+    blocking = blocking_relations(User)
+    if blocking:
+        raise ImproperlyConfigured(f"Accounts cannot be batch-deleted: {', '.join(blocking)} use PROTECT or RESTRICT")
+    user.is_active = False
+    user.save(update_fields=['is_active'])      # post_save invalidates the cached user
+    deletion = AccountDeletion.objects.create(user_id=user.pk, email=user.email, available_at=lease_end())
+    enqueue('account.delete', deletion_id=deletion.pk)
+    logger.info(f"Account deletion {deletion.pk} scheduled for user: {user.email}")
+    return deletion
+
+def reverse_relations(model):
+    """
+    Foreign keys pointing at `model`, including those of auto-created many-to-many tables.
+    """
+    return [
+        field for field in model._meta.get_fields(include_hidden=True)
+        if (field.one_to_many or field.one_to_one) and field.auto_created and not field.concrete
+    ]
+
+@functools.cache
+def blocking_relations(model, seen=frozenset()):
+    """
+    Labels of the PROTECT or RESTRICT foreign keys reachable from `model` through CASCADE.
+    """
+    blocking = []
+    for relation in reverse_relations(model):
+        related = relation.related_model
+        if relation.on_delete in (PROTECT, RESTRICT):
+            blocking.append(f'{related._meta.label}.{relation.field.name}')
+        elif relation.on_delete is CASCADE and related not in seen:
+            blocking += blocking_relations(related, seen | {model})
+    return blocking
+
+class FieldUpdates:
+    """
+    Stands in for Django's deletion Collector when calling SET_NULL, SET_DEFAULT or SET():
+    they report the value to write, which is applied to the rows right away.
+    """
+    def add_field_update(self, field, value, objs):
+        objs.update(**{field.name: value})
+
+class LeaseLost(Exception):
+    pass
+
+class BatchDeleter:
+    def __init__(self, deletion, batch_size, pause):
+        self.deletion = deletion
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def purge(self, model, **lookup):
+        """
+        Delete the rows of `model` matching `lookup`, and their dependents first.
+        """
+        queryset = model._base_manager.filter(**lookup).order_by('pk')
+        while True:
+            ids = list(queryset.values_list('pk', flat=True)[:self.batch_size])
+            if not ids:
+                return
+            for relation in reverse_relations(model):
+                on_delete = relation.on_delete
+                field_name = relation.field.name
+                if on_delete is CASCADE:
+                    self.purge(relation.related_model, **{f'{field_name}__in': ids})
+                elif on_delete in (PROTECT, RESTRICT):
+                    raise ImproperlyConfigured(f"Cannot batch-delete {model._meta.label}: {relation.related_model._meta.label}.{field_name} uses {on_delete.__name__}")
+                elif on_delete is not DO_NOTHING:
+                    dependents = relation.related_model._base_manager.filter(**{f'{field_name}__in': ids})
+                    on_delete(FieldUpdates(), relation.field, dependents, dependents.db)
+            self.delete_batch(model, ids)
+            if self.pause:
+                time.sleep(self.pause)
+
+    def delete_batch(self, model, ids):
+        file_fields = [field for field in model._meta.concrete_fields if isinstance(field, models.FileField)]
+        files = []
+        if file_fields:
+            for row in model._base_manager.filter(pk__in=ids).values_list(*[field.attname for field in file_fields]):
+                files += [(field.storage, name) for field, name in zip(file_fields, row) if name]
+
+        quote = connection.ops.quote_name
+        placeholders = ', '.join(['%s'] * len(ids))
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} IN ({placeholders})',
+                    ids,
+                )
+                deleted = cursor.rowcount
+            if model is User:
+                for user_id in ids:
+                    bump_version_on_commit(user_scope(user_id))
+        for storage, name in files:
+            storage.delete(name)
+        self.record(model, deleted, len(files))
+
+    def record(self, model, rows, files):
+        deletion = self.deletion
+        label = model._meta.label
+        deletion.progress[label] = deletion.progress.get(label, 0) + rows
+        deletion.rows_deleted += rows
+        deletion.files_deleted += files
+        # Also renews the lease; a run that lost it stops here and leaves the rest to its successor
+        if not leased(deletion).update(
+            progress=deletion.progress, rows_deleted=deletion.rows_deleted, files_deleted=deletion.files_deleted,
+            available_at=lease_end(),
+        ):
+            raise LeaseLost(f"Account deletion {deletion.pk} lost its lease")
+
+def delete_account(deletion_id):
+    """
+    Run a pending account deletion. Called by the account worker (see core.workers).
+    """
+    deletion = claim(AccountDeletion, deletion_id, started_at=timezone.now())
+    if deletion is None:
+        return
+    deleter = BatchDeleter(deletion, settings.ACCOUNT_DELETION_BATCH_SIZE, settings.ACCOUNT_DELETION_BATCH_PAUSE)
+    try:
+        deleter.purge(User, pk=deletion.user_id)
+    except LeaseLost as e:
+        logger.warning(str(e))
+        return
+    except Exception as e:
+        if deletion.attempts >= settings.ACCOUNT_JOB_MAX_ATTEMPTS:
+            logger.exception(f"Account deletion {deletion_id} failed after {deletion.attempts} attempts, giving up")
+            leased(deletion).update(status=AccountDeletion.FAILED, error=repr(e), finished_at=timezone.now())
+        else:
+            # Re-sent by requeue_stale_jobs() on its next run
+            logger.exception(f"Account deletion {deletion_id} failed (attempt {deletion.attempts}), will retry")
+            leased(deletion).update(status=AccountDeletion.PENDING, error=repr(e), available_at=timezone.now())
+        return
+    leased(deletion).update(status=AccountDeletion.DONE, error='', finished_at=timezone.now())
+    logger.info(f"Account deletion {deletion_id} done: {deletion.rows_deleted} rows, {deletion.files_deleted} files")
+
+def requeue_deletions(queryset):
+    """
+    Run failed deletions again, e.g. after fixing what made them fail. Returns how many.
+    """
+    pks = list(queryset.filter(status=AccountDeletion.FAILED).values_list('pk', flat=True))
+    AccountDeletion.objects.filter(pk__in=pks, status=AccountDeletion.FAILED).update(
+        status=AccountDeletion.PENDING, attempts=0, error='', finished_at=None, available_at=lease_end(),
+    )
+    for pk in pks:
+        enqueue('account.delete', deletion_id=pk)
+    return len(pks)
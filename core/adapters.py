@@ -1,5 +1,6 @@
 from allauth.account.adapter import DefaultAccountAdapter
 from config import settings
+from .email_confirmation import StatelessEmailConfirmation
 
 class CustomAccountAdapter(DefaultAccountAdapter):
     def get_signup_redirect_url(self, request):
@@ -9,7 +10,10 @@ class CustomAccountAdapter(DefaultAccountAdapter):
         return settings.LOGIN_REDIRECT_URL
 
     def get_email_confirmation_url(self, request, emailconfirmation):
-        key = emailconfirmation.key
+        if settings.EMAIL_CONFIRMATION_STATELESS:
+            key = StatelessEmailConfirmation.for_email_address(emailconfirmation.email_address).key
+        else:
+            key = emailconfirmation.key
         return f"{settings.FRONTEND_URL}/verify-email/{key}"
 
     def save_user(self, request, user, form, commit=True):
@@ -1,4 +1,106 @@
-from django.contrib import admin
-from .models import User
+from django.contrib import admin, messages
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .account_deletion import requeue_deletions, schedule_deletion
+from .models import User, AccountDeletion, PaymentEvent, ProfilerRule, RequestProfile
+from .payments import requeue
 
-admin.site.register(User)
+@admin.register(User)
+class UserAdmin(admin.ModelAdmin):
+    actions = ['schedule_account_deletion']
+
+    @admin.action(description='Delete selected accounts in the background')
+    def schedule_account_deletion(self, request, queryset):
+        for user in queryset:
+            schedule_deletion(user)
+        self.message_user(request, f"{len(queryset)} account(s) deactivated and scheduled for deletion.", messages.SUCCESS)
+
+@admin.register(AccountDeletion)
+class AccountDeletionAdmin(admin.ModelAdmin):
+    """
+    Read-only progress of background account deletions; failed ones can be run again.
+    """
+    list_display = ['email', 'user_id', 'status', 'attempts', 'rows_deleted', 'files_deleted', 'requested_at', 'started_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['email']
+    readonly_fields = [field.name for field in AccountDeletion._meta.fields]
+    actions = ['requeue_failed_deletions']
+
+    @admin.action(description='Run selected failed deletions again')
+    def requeue_failed_deletions(self, request, queryset):
+        count = requeue_deletions(queryset)
+        self.message_user(request, f"{count} deletion(s) queued again.", messages.SUCCESS)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    """
+    Received payment webhook events and their processing state.
+    """
+    list_display = ['event_id', 'type', 'customer_id', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'type']
+    search_fields = ['event_id', 'customer_id']
+    readonly_fields = [field.name for field in PaymentEvent._meta.fields]
+    actions = ['requeue_events']
+
+    @admin.action(description='Process selected events again now')
+    def requeue_events(self, request, queryset):
+        count = requeue(queryset)
+        self.message_user(request, f"{count} event(s) queued for processing.", messages.SUCCESS)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProfilerRule)
+class ProfilerRuleAdmin(admin.ModelAdmin):
+    """
+    Runtime switches for the request profiler (see core.profiler).
+    """
+    list_display = ['__str__', 'url_name', 'method', 'sample_rate', 'enabled', 'expires_at']
+    list_editable = ['enabled']
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    """
+    Stored request profiles, downloadable as collapsed stacks for flamegraph.pl or speedscope.
+    """
+    list_display = ['created_at', 'method', 'url_name', 'path', 'status_code', 'duration_ms', 'samples', 'download_link']
+    list_filter = ['url_name', 'method']
+    exclude = ['collapsed']
+    readonly_fields = [field.name for field in RequestProfile._meta.fields if field.name != 'collapsed'] + ['download_link']
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download), name='core_requestprofile_download'),
+        ] + super().get_urls()
+
+    @admin.display(description='Profile')
+    def download_link(self, obj):
+        return format_html('<a href="{}">Download</a>', reverse('admin:core_requestprofile_download', args=[obj.pk]))
+
+    def download(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.collapsed + '\n', content_type='text/plain; charset=utf-8')
+        name = (profile.url_name or 'request').replace('"', '')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}-{name}.folded"'
+        return response
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,104 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import cached, user_scope
+from .models import User
+
+AUTH_USER_CACHE_TIMEOUT = 300
+
+# The only fields authentication and permission checks read; never the password hash
+AUTH_USER_FIELDS = ['pk', 'is_active', 'is_staff', 'is_superuser']
+
+@cached('auth-user', key=lambda user_id: user_id, scope=user_scope, timeout=AUTH_USER_CACHE_TIMEOUT, version=2)
+def get_cached_user(user_id):
+    """
+    The auth fields of the user with this id, plus a marker that changes with the
+    password, or None.
+    """
+    user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).only('is_active', 'is_staff', 'is_superuser', 'password').first()
+    if user is None:
+        return None
+    fields = {name: getattr(user, name) for name in AUTH_USER_FIELDS}
+    fields['password_marker'] = get_md5_hash_password(user.password)
+    return fields
+
+class CachedUser(SimpleLazyObject):
+    """
+    The request's user, built from the cached auth fields. Reading those fields costs
+    nothing; reading any other attribute loads the full row, once.
+    """
+    def __init__(self, fields):
+        self.__dict__['_auth_fields'] = {**fields, 'id': fields['pk'], 'is_authenticated': True, 'is_anonymous': False}
+        super().__init__(lambda: User.objects.get(pk=fields['pk']))
+
+    def __getattr__(self, name):
+        fields = self.__dict__['_auth_fields']
+        if self._wrapped is empty and name in fields:
+            return fields[name]
+        return super().__getattr__(name)
+
+    def __bool__(self):
+        return True
+
+def check_user(user, validated_token, password_marker=None):
+    """
+    The checks simplejwt runs on the token's user once it has been loaded.
+    """
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if password_marker is None:
+            password_marker = get_md5_hash_password(user.password)
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != password_marker:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+    return user
+
+class CachedUserMixin:
+    """
+    Resolves the token's user through the cache instead of querying the database on
+    every request. Only the auth fields are cached, and they are invalidated whenever
+    the User row changes (see core.signals); views that read the rest of the user load
+    it on first access.
+    """
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        fields = get_cached_user(validated_token[api_settings.USER_ID_CLAIM])
+        if fields is None:
+            return check_user(None, validated_token)
+        return check_user(CachedUser(fields), validated_token, fields['password_marker'])
+
+class CachedJWTAuthentication(CachedUserMixin, JWTAuthentication):
+    pass
+
+class CachedJWTCookieAuthentication(CachedUserMixin, JWTCookieAuthentication):
+    pass
+
+async def aauthenticate(request):
+    """
+    Async counterpart of JWTCookieAuthentication for views running on the event loop.
+    Token validation is CPU-only; the user is loaded with the async ORM.
+    Returns None when the request carries no token.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is not None:
+        raw_token = authenticator.get_raw_token(header)
+    else:
+        raw_token = request.COOKIES.get(settings.REST_AUTH['JWT_AUTH_COOKIE'])
+    if raw_token is None:
+        return None
+
+    validated_token = authenticator.get_validated_token(raw_token)
+    if api_settings.USER_ID_CLAIM not in validated_token:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+    user = await User.objects.filter(**{api_settings.USER_ID_FIELD: validated_token[api_settings.USER_ID_CLAIM]}).afirst()
+    return check_user(user, validated_token)
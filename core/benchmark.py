@@ -0,0 +1,160 @@
+"""
+In-process load generation against the project's ASGI application.
+
+Requests are sent straight to `config.asgi.application` (no sockets, no TLS), so the
+numbers cover the Django side only: middleware, views, ORM and serialization.
+"""
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+
+class ASGIDriver:
+    """
+    Sends HTTP requests to an ASGI application from the running event loop.
+    """
+    def __init__(self, application, host='localhost', scheme='https'):
+        self.application = application
+        self.host = host
+        self.scheme = scheme
+
+    async def request(self, method, path, body=b'', headers=None):
+        path, _, query = path.partition('?')
+        headers = {**(headers or {}), 'Content-Length': str(len(body))}
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': self.scheme,
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': [(b'host', self.host.encode())] + [
+                (name.lower().encode(), value.encode()) for name, value in headers.items()
+            ],
+            'client': ('127.0.0.1', 50000),
+            'server': (self.host, 443 if self.scheme == 'https' else 80),
+        }
+        request_sent = False
+        response_done = asyncio.Event()
+        response = {'status': None, 'headers': [], 'body': b''}
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+            await response_done.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['headers'] = message.get('headers', [])
+            elif message['type'] == 'http.response.body':
+                response['body'] += message.get('body', b'')
+                if not message.get('more_body', False):
+                    response_done.set()
+
+        await self.application(scope, receive, send)
+        response_done.set()
+        return response
+
+
+async def run_load(make_request, total, concurrency):
+    """
+    Run `total` requests with at most `concurrency` in flight. `make_request(i)` returns
+    a coroutine resolving to a response dict. Returns (latencies, statuses, elapsed).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            statuses[response['status']] = statuses.get(response['status'], 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def summarize(latencies, statuses, elapsed):
+    """
+    Throughput and latency percentiles (in milliseconds) for one load run.
+    """
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'statuses': {str(code): count for code, count in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(cuts[49] * 1000, 2),
+        'p95_ms': round(cuts[94] * 1000, 2),
+        'p99_ms': round(cuts[98] * 1000, 2),
+    }
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Run the block against a throwaway test database and media directory, with the test
+    environment's in-memory email backend.
+    """
+    setup_test_environment()
+    media = tempfile.TemporaryDirectory()
+    media_root = override_settings(MEDIA_ROOT=media.name)
+    media_root.enable()
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        media_root.disable()
+        media.cleanup()
+        teardown_test_environment()
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def find_regressions(baseline, results, threshold):
+    """
+    Scenarios whose throughput dropped, or whose p95 latency grew, by more than
+    `threshold` percent compared with the baseline.
+    """
+    regressions = []
+    for scenario, current in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        if before['throughput_rps'] and current['throughput_rps'] < before['throughput_rps'] * (1 - threshold / 100):
+            regressions.append(f"{scenario}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if before['p95_ms'] and current['p95_ms'] > before['p95_ms'] * (1 + threshold / 100):
+            regressions.append(f"{scenario}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+    return regressions
+
+
+def percent_change(before, after):
+    if not before:
+        return 'n/a'
+    return f"{(after - before) / before * 100:+.0f}%"
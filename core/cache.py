@@ -0,0 +1,300 @@
+"""
+Two-tier cache: a bounded in-process LRU in front of Redis, plus helpers for versioned
+keys and stampede-safe recomputation.
+
+`TieredCache` is a regular Django cache backend (see CACHES in settings). The `cached`
+decorator builds on whatever the default cache is, so it also works with LocMemCache.
+"""
+import math
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import wraps
+import logging
+
+from django.core.cache import cache
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.core.cache.backends.redis import RedisCache
+from django.db import transaction
+from django.db.models import QuerySet
+from redis.exceptions import RedisError
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+class LocalLRU:
+    """
+    Bounded, thread-safe LRU holding pickled values with a per-entry expiry.
+    Values are pickled so callers never share (and mutate) the cached object.
+    """
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return MISSING
+            pickled, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+        return pickle.loads(pickled)
+
+    def set(self, key, value, timeout):
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._data[key] = (pickled, time.monotonic() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class TieredCache(BaseCache):
+    """
+    Cache backend reading from a per-process LRU first and Redis second.
+
+    Entries are kept locally for at most LOCAL_TIMEOUT seconds, which bounds how long
+    another process can serve a value that was changed or deleted elsewhere. Scope
+    versions (see get_version) are kept for LOCAL_VERSION_TIMEOUT seconds. Redis
+    failures are logged and treated as misses so the cache never takes the site down.
+    """
+    def __init__(self, server, params):
+        options = dict(params.get('OPTIONS', {}))
+        self.local_timeout = options.pop('LOCAL_TIMEOUT', 5)
+        self.version_timeout = options.pop('LOCAL_VERSION_TIMEOUT', 1)
+        max_entries = options.pop('LOCAL_MAX_ENTRIES', 1000)
+        super().__init__(params)
+        self.local = LocalLRU(max_entries)
+        self.remote = RedisCache(server, {**params, 'OPTIONS': options})
+
+    def _local_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+
+    def _remote_call(self, method, *args, fallback=None, **kwargs):
+        try:
+            return getattr(self.remote, method)(*args, **kwargs)
+        except RedisError as e:
+            logger.warning(f"Redis cache {method} failed: {e}")
+            return fallback
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        value = self.local.get(local_key)
+        if value is not MISSING:
+            registry.inc('cache_requests_total', tier='local', result='hit')
+            return value
+        registry.inc('cache_requests_total', tier='local', result='miss')
+        value = self._remote_call('get', key, MISSING, version=version, fallback=MISSING)
+        if value is MISSING:
+            registry.inc('cache_requests_total', tier='remote', result='miss')
+            return default
+        registry.inc('cache_requests_total', tier='remote', result='hit')
+        self.local.set(local_key, value, self.local_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local_key = self.make_and_validate_key(key, version=version)
+        self._remote_call('set', key, value, timeout, version=version)
+        local_ttl = self._local_ttl(timeout)
+        if local_ttl > 0:
+            self.local.set(local_key, value, local_ttl)
+        else:
+            self.local.delete(local_key)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._remote_call('add', key, value, timeout, version=version, fallback=False)
+        if added:
+            self.local.delete(self.make_and_validate_key(key, version=version))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._remote_call('touch', key, timeout, version=version, fallback=False)
+
+    def delete(self, key, version=None):
+        local_deleted = self.local.delete(self.make_and_validate_key(key, version=version))
+        return bool(self._remote_call('delete', key, version=version, fallback=False)) or local_deleted
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self.make_and_validate_key(key, version=version))
+        try:
+            return self.remote.incr(key, delta, version=version)
+        except RedisError as e:
+            logger.warning(f"Redis cache incr failed: {e}")
+            raise ValueError(f"Key '{key}' could not be incremented.") from e
+
+    def has_key(self, key, version=None):
+        if self.local.get(self.make_and_validate_key(key, version=version)) is not MISSING:
+            return True
+        return self._remote_call('has_key', key, version=version, fallback=False)
+
+    def clear(self):
+        self.local.clear()
+        self._remote_call('clear')
+
+    def close(self, **kwargs):
+        self.remote.close(**kwargs)
+
+
+# Versioned keys
+
+def _remote_backend():
+    # Version counters live in the shared tier, so a bump in one process is seen by
+    # every other process once its local copy expires
+    return getattr(cache, 'remote', cache)
+
+
+def get_version(scope):
+    key = f'version:{scope}'
+    local = getattr(cache, 'local', None)
+    if local is not None:
+        version = local.get(key)
+        if version is not MISSING:
+            return version
+    try:
+        version = _remote_backend().get(key, 1)
+    except RedisError:
+        return 1
+    if local is not None:
+        local.set(key, version, cache.version_timeout)
+    return version
+
+
+def bump_version(scope):
+    """
+    Invalidate every key built with `scope` by moving it to a new version.
+    """
+    backend = _remote_backend()
+    key = f'version:{scope}'
+    local = getattr(cache, 'local', None)
+    try:
+        try:
+            backend.incr(key)
+        except ValueError:
+            backend.set(key, 2, None)
+    except RedisError as e:
+        logger.warning(f"Could not bump cache version for {scope}: {e}")
+        # Without a new version, entries in this process's local tier would stay valid
+        if local is not None:
+            local.clear()
+        return
+    # This process reads the new version right away
+    if local is not None:
+        local.delete(key)
+
+
+def bump_version_on_commit(scope, using=None):
+    """
+    bump_version for a change made in the current transaction, if any: bumped right
+    away so this process stops serving old entries, and again on commit, which retires
+    entries a concurrent reader re-cached from the old row in between.
+    """
+    bump_version(scope)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: bump_version(scope), using=using)
+
+
+# Stampede protection
+
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _single_flight(key, compute):
+    """
+    Run `compute` once per key and process; concurrent callers wait for the same result.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+    if not leader:
+        return future.result()
+    try:
+        value = compute()
+        future.set_result(value)
+        return value
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def get_or_compute(key, compute, timeout=None, beta=1.0):
+    """
+    Return the cached value for `key`, computing and storing it on a miss.
+
+    Uses probabilistic early recomputation: the closer an entry is to expiring, and the
+    longer it took to compute, the more likely a reader recomputes it ahead of time, so
+    a popular key does not expire for every process at once.
+    """
+    timeout = timeout or cache.default_timeout
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires_at = entry
+        if time.time() - delta * beta * math.log(1.0 - random.random()) < expires_at:
+            return value
+
+    def recompute():
+        start = time.time()
+        value = compute()
+        if isinstance(value, QuerySet):
+            value = list(value)
+        delta = time.time() - start
+        cache.set(key, (value, delta, time.time() + timeout), timeout)
+        return value
+
+    return _single_flight(key, recompute)
+
+
+def cached(namespace, key, scope=None, timeout=None, version=1):
+    """
+    Cache the return value of a function, e.g. serializer output or a queryset
+    (querysets are evaluated into a list before caching).
+
+    `key` and `scope` receive the function arguments. Bumping the scope with
+    `bump_version` invalidates every entry in it; bumping `version` in code retires
+    entries written with an older output shape.
+    """
+    def decorator(func):
+        def make_key(*args, **kwargs):
+            parts = [namespace, f'v{version}', str(key(*args, **kwargs))]
+            if scope is not None:
+                scope_name = scope(*args, **kwargs)
+                parts.append(f'{scope_name}@{get_version(scope_name)}')
+            return ':'.join(parts)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            return get_or_compute(make_key(*args, **kwargs), lambda: func(*args, **kwargs), timeout)
+
+        wrapper.make_key = make_key
+        return wrapper
+    return decorator
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
@@ -0,0 +1,334 @@
+"""
+Channel layer that spreads groups and channels over several Redis nodes.
+
+`ShardedChannelLayer` extends channels_redis' RedisChannelLayer with:
+- a consistent-hash ring with virtual nodes keyed by host address, so adding a node
+  moves about 1/N of the groups instead of nearly all of them (channels_redis maps
+  crc32 % N); all channels of one process live on the same node;
+- failover: a node that raises a connection error is taken off the ring for
+  FAILOVER_COOLDOWN seconds and its keys move to the next node on the ring, then
+  returns to the ring and is re-checked by use;
+- `group_send_many`, which reads the members of many groups with one pipeline per
+  node and sends with one script call per node, all nodes concurrently;
+- local delivery: a message for a channel that is waiting in this process, on this
+  event loop, goes straight into its receive buffer without a Redis round trip.
+
+Messages in flight on a failed node are lost. Group memberships are not: each process
+remembers the ones it added and, whenever the ring changes (a node fails over, or comes
+back after its cooldown), re-adds them on the node that now owns each group. Without
+this, memberships written to the fallback node during an outage would be orphaned when
+the groups hash back to the recovered node. Each process re-adds its own memberships on
+its next use of the layer; consumer processes poll it continuously. Local delivery skips Redis,
+so a local message can overtake an earlier one still queued in Redis.
+"""
+import asyncio
+import bisect
+import contextvars
+import hashlib
+import time
+
+import msgpack
+from channels_redis.core import RedisChannelLayer
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+import logging
+logger = logging.getLogger(__name__)
+
+FAILOVER_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+# Adds a message to each channel key under capacity, after dropping expired messages.
+# KEYS: channel keys; ARGV: one message per key, one capacity per key, now, expiry
+GROUP_SEND_LUA = """
+    local over_capacity = 0
+    local current_time = tonumber(ARGV[#ARGV - 1])
+    local expiry = tonumber(ARGV[#ARGV])
+    for i = 1, #KEYS do
+        redis.call('ZREMRANGEBYSCORE', KEYS[i], 0, current_time - expiry)
+        if redis.call('ZCOUNT', KEYS[i], '-inf', '+inf') < tonumber(ARGV[i + #KEYS]) then
+            redis.call('ZADD', KEYS[i], current_time, ARGV[i])
+            redis.call('EXPIRE', KEYS[i], expiry)
+        else
+            over_capacity = over_capacity + 1
+        end
+    end
+    return over_capacity
+"""
+
+# Index of the node the current task last talked to, to know which one failed
+_current_node = contextvars.ContextVar('channel_layer_node', default=None)
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.md5(value.encode(), usedforsecurity=False).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping keys to node indexes, with `replicas` virtual nodes per node.
+    """
+    def __init__(self, node_names, replicas=128):
+        self.size = len(node_names)
+        points = sorted(
+            (_hash(f'{name}#{replica}'), index)
+            for index, name in enumerate(node_names)
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in points]
+        self._nodes = [index for _, index in points]
+
+    def lookup(self, key, skip=frozenset()):
+        """
+        Node for `key`: the first node clockwise from its hash that is not in `skip`.
+        Falls back to the primary node when every node is skipped.
+        """
+        if self.size == 1:
+            return 0
+        position = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        primary = self._nodes[position]
+        if not skip:
+            return primary
+        for offset in range(len(self._nodes)):
+            index = self._nodes[(position + offset) % len(self._nodes)]
+            if index not in skip:
+                return index
+        return primary
+
+
+class ShardedChannelLayer(RedisChannelLayer):
+    failover_cooldown = 10
+
+    def __init__(self, hosts=None, replicas=128, failover_cooldown=None, local_delivery=True, **kwargs):
+        super().__init__(hosts=hosts, **kwargs)
+        self.ring = HashRing([self._host_name(host) for host in self.hosts], replicas)
+        if failover_cooldown is not None:
+            self.failover_cooldown = failover_cooldown
+        self.local_delivery = local_delivery
+        self._down_until = {}
+        self._ring_state = frozenset()     # Down nodes when memberships were last placed
+        self._memberships = {}              # Group -> channels this process added to it
+        self._membership_nodes = {}         # Group -> node those memberships are stored on
+        self._receive_index_generator = self._healthy_cycle()
+        self._send_index_generator = self._healthy_cycle()
+
+    @staticmethod
+    def _host_name(host):
+        return str(host.get('address') or host)
+
+    ### Node health ###
+
+    def down_nodes(self):
+        now = time.monotonic()
+        for index, until in list(self._down_until.items()):
+            if until <= now:
+                # Cooldown over: the node gets traffic again and is re-checked by use
+                del self._down_until[index]
+        return frozenset(self._down_until)
+
+    def mark_down(self, index, error):
+        if index is None or self.ring_size == 1:
+            return
+        if index not in self._down_until:
+            logger.warning(f"Channel layer node {self._host_name(self.hosts[index])} failed, failing over: {error}")
+        self._down_until[index] = time.monotonic() + self.failover_cooldown
+
+    async def _follow_ring(self):
+        """
+        Re-add this process's group memberships on the node that now owns each group,
+        if the ring changed since they were placed.
+        """
+        down = self.down_nodes()
+        if down == self._ring_state:
+            return
+        self._ring_state = down
+        for group, channels in list(self._memberships.items()):
+            index = self.consistent_hash(group)
+            if self._membership_nodes.get(group) != index:
+                await self._write_memberships(index, group, channels)
+
+    async def _write_memberships(self, index, group, channels):
+        key = self._group_key(group)
+        try:
+            connection = self.connection(index)
+            await connection.zadd(key, {channel: time.time() for channel in channels})
+            await connection.expire(key, self.group_expiry)
+        except FAILOVER_ERRORS as e:
+            # Changes the ring again, so the next _follow_ring() places them elsewhere
+            self.mark_down(index, e)
+            return
+        self._membership_nodes[group] = index
+
+    def _healthy_cycle(self):
+        index = 0
+        while True:
+            down = self.down_nodes()
+            for _ in range(self.ring_size):
+                index = (index + 1) % self.ring_size
+                if index not in down:
+                    break
+            yield index
+
+    def consistent_hash(self, value):
+        if isinstance(value, bytes):
+            value = value.decode('utf8')
+        if '!' in value:
+            # Hash the process part only, so every channel of a process shares a node
+            value = self.non_local_name(value)
+        return self.ring.lookup(value, self.down_nodes())
+
+    def connection(self, index):
+        _current_node.set(index)
+        return super().connection(index)
+
+    async def _with_failover(self, operation, *args):
+        try:
+            return await operation(*args)
+        except FAILOVER_ERRORS as e:
+            if self.ring_size == 1:
+                raise
+            self.mark_down(_current_node.get(), e)
+            return await operation(*args)
+
+    def _live_index(self, index, channel_key):
+        name = channel_key[len(self.prefix):]
+        if '!' in name:
+            return self.consistent_hash(name)
+        if index in self.down_nodes():
+            return next(self._receive_index_generator)
+        return index
+
+    ### Local delivery ###
+
+    def _local_receiver(self, channel):
+        """
+        True if `channel` belongs to this process and is waiting in receive() on the
+        running event loop, so its buffer can be filled directly.
+        """
+        if not self.local_delivery or '!' not in channel or channel not in self.receive_buffer:
+            return False
+        if not self.non_local_name(channel).endswith(self.client_prefix + '!'):
+            return False
+        try:
+            return self.receive_event_loop is asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+    def _deliver_locally(self, channel, message):
+        # Round-trip through msgpack so receivers get the same types, and their own copy
+        self.receive_buffer[channel].put_nowait(msgpack.unpackb(msgpack.packb(message, use_bin_type=True), raw=False))
+
+    ### Channel layer API ###
+
+    async def send(self, channel, message):
+        if self._local_receiver(channel):
+            self._deliver_locally(channel, message)
+            return
+        await self._with_failover(super().send, channel, message)
+
+    async def _brpop_with_clean(self, index, channel, timeout):
+        # Re-route on every poll, so a receiver follows its channel when a node fails over
+        await self._follow_ring()
+        index = self._live_index(index, channel)
+        try:
+            return await super()._brpop_with_clean(index, channel, timeout)
+        except FAILOVER_ERRORS as e:
+            if self.ring_size == 1:
+                raise
+            self.mark_down(index, e)
+            await asyncio.sleep(0.1)
+            return None
+
+    async def _clean_receive_backup(self, index, channel):
+        await super()._clean_receive_backup(self._live_index(index, channel), channel)
+
+    async def group_add(self, group, channel):
+        await self._follow_ring()
+        await self._with_failover(super().group_add, group, channel)
+        channels = self._memberships.setdefault(group, set())
+        channels.add(channel)
+        index = self.consistent_hash(group)
+        if self._membership_nodes.setdefault(group, index) != index:
+            # Failed over while adding: bring the group's other members along
+            await self._write_memberships(index, group, channels)
+
+    async def group_discard(self, group, channel):
+        await self._follow_ring()
+        await self._with_failover(super().group_discard, group, channel)
+        channels = self._memberships.get(group)
+        if channels is not None:
+            channels.discard(channel)
+            if not channels:
+                del self._memberships[group], self._membership_nodes[group]
+
+    async def group_send(self, group, message):
+        await self.group_send_many([group], message)
+
+    async def group_send_many(self, groups, message):
+        """
+        Send `message` to every channel in any of `groups`; a channel that belongs to
+        several of them receives it once.
+        """
+        for group in groups:
+            assert self.valid_group_name(group), "Group name not valid"
+        await self._follow_ring()
+        channel_names = set()
+        for _, members in await self._on_nodes(self._group_members, groups, self.consistent_hash):
+            channel_names.update(members)
+        await self._send_to_channels(sorted(channel_names), message, groups)
+
+    async def _on_nodes(self, operation, items, node_of):
+        """
+        Run `operation(index, items)` for the items of each node, all nodes concurrently,
+        and return (items, result) pairs. Like _with_failover, the items of a node that
+        fails are tried once more on their fallback node; a single node re-raises.
+        """
+        done = []
+        for attempt in range(2):
+            by_node = {}
+            for item in items:
+                by_node.setdefault(node_of(item), []).append(item)
+            nodes = list(by_node.items())
+            results = await asyncio.gather(*(operation(index, node_items) for index, node_items in nodes), return_exceptions=True)
+            items = []
+            for (index, node_items), result in zip(nodes, results):
+                if isinstance(result, FAILOVER_ERRORS) and self.ring_size > 1 and not attempt:
+                    self.mark_down(index, result)
+                    items += node_items
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    done.append((node_items, result))
+            if not items:
+                break
+        return done
+
+    async def _group_members(self, index, groups):
+        pipe = self.connection(index).pipeline(transaction=False)
+        min_score = int(time.time()) - self.group_expiry
+        for group in groups:
+            key = self._group_key(group)
+            pipe.zremrangebyscore(key, min=0, max=min_score)
+            pipe.zrange(key, 0, -1)
+        replies = await pipe.execute()
+        return [name.decode('utf8') for members in replies[1::2] for name in members]
+
+    async def _send_to_channels(self, channel_names, message, groups):
+        remote = []
+        for channel in channel_names:
+            if self._local_receiver(channel):
+                self._deliver_locally(channel, message)
+            else:
+                remote.append(channel)
+        if not remote:
+            return
+        _, messages, capacities = self._map_channel_keys_to_connection(remote, message)
+
+        async def send_to_node(index, keys):
+            args = [messages[key] for key in keys] + [capacities[key] for key in keys] + [time.time(), self.expiry]
+            return await self.connection(index).eval(GROUP_SEND_LUA, len(keys), *keys, *args)
+
+        def node_of(key):
+            return self.consistent_hash(key[len(self.prefix):])
+
+        for keys, over_capacity in await self._on_nodes(send_to_node, list(messages), node_of):
+            if over_capacity:
+                logger.info(f"{over_capacity} of {len(keys)} channels over capacity in groups {', '.join(groups)}")
@@ -1,25 +1,162 @@
+import asyncio
 import json
+import time
+
+from asgiref.sync import async_to_sync
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.conf import settings
+from .metrics import registry
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Close code for sockets that stopped answering heartbeats (4000-4999 are application codes)
+IDLE_CLOSE_CODE = 4408
+
+def notify_user(user_id, message_type, message):
+    """
+    Push a notification to every open NotificationConsumer socket of a user, from sync code.
+    """
+    notify_users([user_id], message_type, message)
+
+def notify_users(user_ids, message_type, message):
+    """
+    Push the same notification to several users, in one round trip per Redis node
+    when the channel layer supports it.
+    """
+    async_to_sync(_group_send_many)([f'user_{user_id}' for user_id in user_ids], {
+        'type': 'send_message',
+        'message_type': message_type,
+        'message': message,
+    })
+
+async def _group_send_many(groups, event):
+    layer = get_channel_layer()
+    if hasattr(layer, 'group_send_many'):
+        await layer.group_send_many(groups, event)
+        return
+    for group in groups:
+        await layer.group_send(group, event)
+
+class ConnectionTracker:
+    """
+    Last-activity time of each open socket of a consumer class, and one task per process
+    that pings idle sockets every WEBSOCKET_HEARTBEAT_INTERVAL seconds and reaps those that
+    sent nothing for WEBSOCKET_IDLE_TIMEOUT seconds. One task for all sockets instead of a
+    heartbeat task per socket keeps the per-connection cost to a dict entry.
+    """
+    def __init__(self):
+        self.last_seen = {}
+        self._task = None
+
+    def __len__(self):
+        return len(self.last_seen)
+
+    def add(self, consumer):
+        self.last_seen[consumer] = time.monotonic()
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self.run())
+
+    def touch(self, consumer):
+        if consumer in self.last_seen:
+            self.last_seen[consumer] = time.monotonic()
+
+    def discard(self, consumer):
+        """
+        Stop tracking `consumer`; returns False if it was not tracked.
+        """
+        return self.last_seen.pop(consumer, None) is not None
+
+    async def run(self):
+        while self.last_seen:
+            await asyncio.sleep(settings.WEBSOCKET_HEARTBEAT_INTERVAL)
+            await self.check()
+
+    async def check(self):
+        now = time.monotonic()
+        for consumer, seen in list(self.last_seen.items()):
+            idle = now - seen
+            try:
+                if idle >= settings.WEBSOCKET_IDLE_TIMEOUT:
+                    await consumer.reap(idle)
+                elif idle >= settings.WEBSOCKET_HEARTBEAT_INTERVAL:
+                    await consumer.ping()
+            except Exception:
+                logger.exception(f"Heartbeat failed for {consumer.channel_name}")
+                await self.drop(consumer)
+
+    async def drop(self, consumer):
+        # Through disconnect(), so the socket also leaves its group and the gauges follow
+        try:
+            await consumer.disconnect(IDLE_CLOSE_CODE)
+        except Exception:
+            logger.exception(f"Could not disconnect {consumer.channel_name}")
+            self.discard(consumer)
 
 class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Pushes notifications to the user's open sockets through the `user_<id>` group.
+
+    The server sends {"type": "ping"} to quiet sockets; clients answer {"type": "pong"}
+    (any message counts). The only per-socket state beyond the scope is the user id, from
+    which the group name is derived.
+    """
+    metrics_name = 'notifications'
+    connections = ConnectionTracker()
+
+    @property
+    def group_name(self):
+        return f'user_{self.user_id}'
+
     async def connect(self):
-        self.user = self.scope["user"]
-        self.group_name = f'user_{self.user.id}'
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            # Anonymous sockets would all share a single "user_None" group
+            await self.close()
+            return
+        self.user_id = user.pk
         await self.channel_layer.group_add(
             self.group_name,
             self.channel_name
         )
         await self.accept()
+        self.connections.add(self)
+        registry.inc('websocket_connections_total', consumer=self.metrics_name)
+        registry.inc('websocket_connections_open', consumer=self.metrics_name)
 
     async def disconnect(self, close_code):
+        if not self.connections.discard(self):
+            # Never accepted, or already reaped
+            return
+        registry.inc('websocket_disconnections_total', consumer=self.metrics_name)
+        registry.inc('websocket_connections_open', -1, consumer=self.metrics_name)
         await self.channel_layer.group_discard(
             self.group_name,
             self.channel_name
         )
 
+    async def ping(self):
+        await self.send(text_data='{"type": "ping"}')
+
+    async def reap(self, idle):
+        """
+        Close a socket that stopped answering, and leave its group right away: a dead
+        peer may never complete the close handshake that would trigger disconnect().
+        """
+        logger.info(f"Closing WebSocket of user {self.user_id} after {idle:.0f}s without activity")
+        await self.disconnect(IDLE_CLOSE_CODE)
+        registry.inc('websocket_idle_closed_total', consumer=self.metrics_name)
+        await self.close(code=IDLE_CLOSE_CODE)
+
     async def receive(self, text_data):
+        self.connections.touch(self)
+        registry.inc('websocket_messages_total', consumer=self.metrics_name, direction='in')
         data = json.loads(text_data)
         message_type = data['type']
+        if message_type == 'pong':
+            return
         message = data['message']
 
         await self.channel_layer.group_send(
@@ -38,3 +175,4 @@ class NotificationConsumer(AsyncWebsocketConsumer):
             'type': message_type,
             'message': message
         }))
+        registry.inc('websocket_messages_total', consumer=self.metrics_name, direction='out')
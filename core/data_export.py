@@ -0,0 +1,127 @@
+"""
+Builds "download my data" ZIP archives without holding the archive, or any table, in
+memory: each section yields archive entries whose content is a generator of byte chunks,
+and the archive is written entry by entry to a temporary file on disk.
+"""
+import json
+import os
+import secrets
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from allauth.account.models import EmailAddress
+from allauth.socialaccount.models import SocialAccount
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .consumers import notify_user
+from .models import DataExport
+from .serializers import UserFullSerializer
+from .workers import claim, lease_end, leased
+
+import logging
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+ROW_CHUNK_SIZE = 500
+
+def json_document(data):
+    yield json.dumps(data, cls=DjangoJSONEncoder, indent=2).encode()
+
+def json_lines(queryset, fields):
+    # A server-side cursor on PostgreSQL, so rows are fetched in chunks
+    for row in queryset.values(*fields).iterator(chunk_size=ROW_CHUNK_SIZE):
+        yield json.dumps(row, cls=DjangoJSONEncoder).encode() + b'\n'
+
+def file_chunks(field_file):
+    with field_file.open('rb') as f:
+        yield from f.chunks(CHUNK_SIZE)
+
+def profile_section(user):
+    yield 'profile.json', json_document(UserFullSerializer(user).data), zipfile.ZIP_DEFLATED
+
+def email_addresses_section(user):
+    queryset = EmailAddress.objects.filter(user=user).order_by('pk')
+    yield 'email_addresses.jsonl', json_lines(queryset, ['email', 'verified', 'primary']), zipfile.ZIP_DEFLATED
+
+def social_accounts_section(user):
+    queryset = SocialAccount.objects.filter(user=user).order_by('pk')
+    yield 'social_accounts.jsonl', json_lines(queryset, ['provider', 'uid', 'date_joined', 'last_login', 'extra_data']), zipfile.ZIP_DEFLATED
+
+def media_section(user):
+    if user.profile_picture and user.profile_picture.storage.exists(user.profile_picture.name):
+        # Images are already compressed
+        yield f'media/{os.path.basename(user.profile_picture.name)}', file_chunks(user.profile_picture), zipfile.ZIP_STORED
+
+# Each section takes a user and yields (archive name, byte chunks, compression)
+SECTIONS = [profile_section, email_addresses_section, social_accounts_section, media_section]
+
+def write_archive(user, fileobj, renew=lambda: True):
+    """
+    Write every section to `fileobj`, calling `renew` after each one. Stops and returns
+    False as soon as `renew` returns a false value.
+    """
+    with zipfile.ZipFile(fileobj, 'w') as archive:
+        for section in SECTIONS:
+            for name, chunks, compression in section(user):
+                info = zipfile.ZipInfo(name, date_time=timezone.now().timetuple()[:6])
+                info.compress_type = compression
+                with archive.open(info, 'w', force_zip64=True) as entry:
+                    for chunk in chunks:
+                        entry.write(chunk)
+            if not renew():
+                return False
+    return True
+
+def build_export(export_id):
+    """
+    Build the archive for a pending export, store it and notify the user.
+    Called by the account worker (see core.workers).
+    """
+    export = claim(DataExport, export_id)
+    if export is None:
+        return
+
+    def renew():
+        # After every section, so a large export outlives ACCOUNT_JOB_LEASE
+        return leased(export).update(available_at=lease_end())
+
+    try:
+        with tempfile.TemporaryFile() as tmp:
+            if not write_archive(export.user, tmp, renew):
+                logger.warning(f"Data export {export.pk} lost its lease, stopping")
+                return
+            export.size = tmp.tell()
+            tmp.seek(0)
+            export.file.save(f'{secrets.token_urlsafe(16)}.zip', File(tmp), save=False)
+    except Exception:
+        logger.exception(f"Data export {export_id} failed")
+        if leased(export).update(status=DataExport.FAILED, finished_at=timezone.now()):
+            notify_user(export.user_id, 'data_export_failed', {'id': export.pk})
+        return
+
+    finished_at = timezone.now()
+    expires_at = finished_at + timedelta(hours=settings.DATA_EXPORT_TTL_HOURS)
+    if not leased(export).update(
+        status=DataExport.READY, file=export.file.name, size=export.size, finished_at=finished_at, expires_at=expires_at,
+    ):
+        # The lease ran out and the export was handed to another worker
+        logger.warning(f"Data export {export.pk} lost its lease, discarding the archive")
+        export.file.delete(save=False)
+        return
+    logger.info(f"Data export {export.pk} ready for user {export.user_id}: {export.size} bytes")
+    notify_user(export.user_id, 'data_export_ready', {'id': export.pk, 'size': export.size})
+
+def purge_expired_exports(limit=100):
+    """
+    Delete up to `limit` expired archives and their rows.
+    Called by the requeue_account_jobs sweeper.
+    """
+    expired = DataExport.objects.filter(expires_at__lt=timezone.now()).order_by('pk')[:limit]
+    for export in expired:
+        if export.file:
+            export.file.delete(save=False)
+        export.delete()
@@ -0,0 +1,105 @@
+"""
+Stateless email confirmation keys.
+
+The key is a signed, timestamped (email address id, email, user id) triple, so confirming
+needs no EmailConfirmation row and no read: the signature is checked in memory and the
+address is marked verified with a single conditional UPDATE.
+"""
+from allauth.account import app_settings as account_settings, signals
+from allauth.account.adapter import DefaultAccountAdapter, get_adapter
+from allauth.account.models import EmailAddress
+from django.conf import settings
+from django.core import signing
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+
+from .cache import bump_version_on_commit, user_scope
+
+
+class StatelessEmailConfirmation:
+    salt = 'core.email_confirmation'
+
+    def __init__(self, email_address_id, email, user_id=None):
+        self.email_address_id = email_address_id
+        self.email = email
+        self.user_id = user_id
+
+    @classmethod
+    def for_email_address(cls, email_address):
+        return cls(email_address.pk, email_address.email, email_address.user_id)
+
+    @property
+    def key(self):
+        return signing.dumps([self.email_address_id, self.email, self.user_id], salt=self.salt, compress=True)
+
+    @classmethod
+    def from_key(cls, key):
+        """
+        Return the confirmation for a valid, unexpired key, or None. Does not touch the database.
+        """
+        max_age = 60 * 60 * 24 * settings.ACCOUNT_EMAIL_CONFIRMATION_EXPIRE_DAYS
+        try:
+            # Keys issued before the user id was added carry two items
+            email_address_id, email, *user_id = signing.loads(key, salt=cls.salt, max_age=max_age)
+        except (signing.BadSignature, ValueError, TypeError):
+            return None
+        return cls(email_address_id, email, *user_id[:1])
+
+    def key_expired(self):
+        # Expiry is enforced by the signature's timestamp in from_key
+        return False
+
+    def confirm(self, request):
+        """
+        Mark the address verified, and primary unless the user already has another
+        primary address. Returns True if an unverified address was confirmed.
+
+        Projects that override the adapter's confirm_email, or use ACCOUNT_CHANGE_EMAIL,
+        go through allauth's own flow instead, which needs the address loaded first.
+        """
+        adapter = get_adapter(request)
+        if account_settings.CHANGE_EMAIL or type(adapter).confirm_email is not DefaultAccountAdapter.confirm_email:
+            email_address = self.load_unverified()
+            confirmed = email_address is not None and adapter.confirm_email(request, email_address)
+        elif self.user_id is None:
+            email_address = self.load_unverified()
+            confirmed = email_address is not None and self.mark_verified(email_address)
+        else:
+            # The conditional UPDATE alone decides; nothing is read first
+            email_address = EmailAddress(pk=self.email_address_id, email=self.email, user_id=self.user_id)
+            confirmed = self.mark_verified(email_address)
+        if not confirmed:
+            return False
+        # The UPDATE sends no post_save
+        bump_version_on_commit(user_scope(email_address.user_id))
+        signals.email_confirmed.send(sender=self.__class__, request=request, email_address=email_address)
+        return True
+
+    def load_unverified(self):
+        return EmailAddress.objects.filter(pk=self.email_address_id, email=self.email, verified=False).first()
+
+    @staticmethod
+    def mark_verified(email_address):
+        """
+        DefaultAccountAdapter.confirm_email as one conditional UPDATE. With
+        ACCOUNT_UNIQUE_EMAIL, it matches nothing if the email is already verified on
+        another account (allauth's can_set_verified check, done in the UPDATE so it
+        cannot race).
+        """
+        queryset = EmailAddress.objects.filter(
+            pk=email_address.pk, email=email_address.email, user_id=email_address.user_id, verified=False,
+        )
+        if account_settings.UNIQUE_EMAIL:
+            verified_elsewhere = EmailAddress.objects.filter(email=OuterRef('email'), verified=True).exclude(pk=OuterRef('pk'))
+            queryset = queryset.filter(~Exists(verified_elsewhere))
+        other_primary = EmailAddress.objects.filter(user_id=OuterRef('user_id'), primary=True).exclude(pk=OuterRef('pk'))
+        updated = queryset.update(
+            verified=True,
+            primary=Case(When(Exists(other_primary), then=F('primary')), default=Value(True)),
+        )
+        if not updated:
+            return False
+        email_address.verified = True
+        if signals.email_confirmed.has_listeners():
+            # Only the database knows whether the address became primary
+            email_address.refresh_from_db(fields=['primary'])
+        return True
@@ -0,0 +1,215 @@
+"""
+Liveness and readiness endpoints for the load balancer.
+
+/healthz answers as soon as the process can serve a request and checks nothing else, so a
+slow dependency never gets a healthy node restarted. /readyz probes PostgreSQL, every
+channel layer Redis node and media storage concurrently, each within HEALTH_CHECK_TIMEOUT
+seconds, and answers 503 if any is down. Its report is cached per process for
+HEALTH_CHECK_CACHE_TTL seconds and concurrent probes share one run, so frequent probing
+does not reach the dependencies more than once per TTL.
+
+Blocking probes run on a small dedicated thread pool, not the event loop's default
+executor. Threads cannot be cancelled, so a probe that times out keeps its thread until
+the call returns; until then that probe is not started again and reports a failure, so
+hung calls never pile up. Probes only observe: a failed channel layer node is reported,
+not taken off the sharded layer's ring.
+
+Both are answered by HealthCheckMiddleware, first in MIDDLEWARE: no host validation, SSL
+redirect, sessions or authentication, and no database access outside the probes.
+"""
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection
+from django.http import JsonResponse
+
+import logging
+logger = logging.getLogger(__name__)
+
+LIVENESS_PATH = '/healthz'
+READINESS_PATH = '/readyz'
+STORAGE_CHECK_DIR = 'health'
+
+# One thread per blocking probe (database, media storage)
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='health-check')
+_in_flight = {}
+
+
+class StillRunning(Exception):
+    """
+    The previous run of a probe timed out and has not returned yet.
+    """
+
+
+async def in_thread(func, timeout):
+    previous = _in_flight.get(func)
+    if previous is not None and not previous.done():
+        raise StillRunning(f"{func.__name__} has not returned yet")
+    future = _in_flight[func] = _executor.submit(func)
+    # On timeout the call is abandoned, not stopped, and keeps its thread until it returns
+    return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+
+def ping_database():
+    try:
+        close_old_connections()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    finally:
+        close_old_connections()
+
+
+def touch_storage():
+    name = default_storage.save(f'{STORAGE_CHECK_DIR}/{uuid.uuid4().hex}', ContentFile(b'ok'))
+    default_storage.delete(name)
+
+
+async def check_database(timeout):
+    await in_thread(ping_database, timeout)
+
+
+async def check_media_storage(timeout):
+    await in_thread(touch_storage, timeout)
+
+
+async def check_channel_layer(timeout):
+    """
+    Ping every Redis node of the channel layer. The sharded layer fails over, so it only
+    needs one node up. Failed nodes are only reported: the layer takes a node off its
+    ring when real traffic fails, not because a probe was slow.
+    """
+    layer = get_channel_layer()
+    if not hasattr(layer, 'connection'):
+        return      # No layer, or an in-process one
+    results = await asyncio.gather(
+        *(asyncio.wait_for(layer.connection(index).ping(), timeout) for index in range(layer.ring_size)),
+        return_exceptions=True,
+    )
+    failed = {index: error for index, error in enumerate(results) if isinstance(error, BaseException)}
+    for index, error in failed.items():
+        logger.warning(f"Channel layer node {layer.hosts[index].get('address', index)} is down: {error!r}")
+    # Layers with mark_down() fail over between nodes
+    if failed and (len(failed) == layer.ring_size or not hasattr(layer, 'mark_down')):
+        raise next(iter(failed.values()))
+
+
+CHECKS = {
+    'database': check_database,
+    'channel_layer': check_channel_layer,
+    'media_storage': check_media_storage,
+}
+
+
+async def run_check(name, check, timeout):
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(timeout), timeout)
+        result = {'ok': True}
+    except Exception as e:
+        logger.warning(f"Readiness check {name} failed: {e!r}")
+        # Only the error type is exposed, the endpoint is unauthenticated
+        result = {'ok': False, 'error': 'timeout' if isinstance(e, asyncio.TimeoutError) else type(e).__name__}
+    result['ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return name, result
+
+
+async def run_checks():
+    timeout = settings.HEALTH_CHECK_TIMEOUT
+    results = dict(await asyncio.gather(*(run_check(name, check, timeout) for name, check in CHECKS.items())))
+    return {'ready': all(result['ok'] for result in results.values()), 'checks': results}
+
+
+class Readiness:
+    """
+    Per-process cache of the latest readiness report.
+    """
+    def __init__(self):
+        self.report = None
+        self.expires_at = 0.0
+        self._task = None
+        self._lock = threading.Lock()
+
+    def cached(self):
+        if self.report is not None and time.monotonic() < self.expires_at:
+            return self.report
+        return None
+
+    async def _refresh(self):
+        report = await run_checks()
+        self.report, self.expires_at = report, time.monotonic() + settings.HEALTH_CHECK_CACHE_TTL
+        return report
+
+    async def acheck(self):
+        report = self.cached()
+        if report is not None:
+            return report
+        # Probes arriving while a run is in flight wait for it instead of starting another
+        task = self._task
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self._task = asyncio.ensure_future(self._refresh())
+        return await asyncio.shield(task)
+
+    def check(self):
+        with self._lock:
+            return self.cached() or async_to_sync(self._refresh)()
+
+    def clear(self):
+        self.report, self.expires_at = None, 0.0
+
+
+readiness = Readiness()
+
+
+def readiness_response(report):
+    status = 200 if report['ready'] else 503
+    response = JsonResponse({'status': 'ok' if report['ready'] else 'unavailable', 'checks': report['checks']}, status=status)
+    response['Cache-Control'] = 'no-store'
+    # Failed checks are logged once per run above, not once per probe by Django
+    response._has_been_logged = True
+    return response
+
+
+class HealthCheckMiddleware:
+    """
+    Answers /healthz and /readyz before any other middleware runs. Place it first in
+    MIDDLEWARE.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    @staticmethod
+    def liveness():
+        response = JsonResponse({'status': 'ok'})
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        path = request.path_info.rstrip('/')
+        if path == LIVENESS_PATH:
+            return self.liveness()
+        if path == READINESS_PATH:
+            return readiness_response(readiness.check())
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        path = request.path_info.rstrip('/')
+        if path == LIVENESS_PATH:
+            return self.liveness()
+        if path == READINESS_PATH:
+            return readiness_response(await readiness.acheck())
+        return await self.get_response(request)
@@ -0,0 +1,94 @@
+"""
+Shared helpers for the import_users and export_users commands.
+"""
+import csv
+import json
+import sys
+import time
+
+import django
+from django.utils.dateparse import parse_date, parse_datetime
+
+# Columns written by export_users and understood by import_users, in order
+USER_FIELDS = ['email', 'first_name', 'last_name', 'is_active', 'is_staff', 'date_joined',
+               'bio', 'birth_date', 'phone_number', 'address']
+PASSWORD_HASH_FIELD = 'password_hash'
+PLAIN_PASSWORD_FIELD = 'password'
+
+BOOLEAN_FIELDS = {'is_active', 'is_staff'}
+DATETIME_FIELDS = {'date_joined'}
+DATE_FIELDS = {'birth_date'}
+NULLABLE_FIELDS = {'bio', 'birth_date', 'phone_number', 'address'}
+
+def open_stream(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode, newline='', encoding='utf-8')
+
+def read_rows(stream, fmt):
+    """
+    Yield one dict per input row without loading the whole file.
+    """
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+def convert_value(field, value):
+    """
+    Convert a CSV/JSON value to what the model field expects.
+    """
+    if value in ('', None):
+        return None if field in NULLABLE_FIELDS else value
+    if field in BOOLEAN_FIELDS and isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 't', 'yes', 'y')
+    if field in DATETIME_FIELDS and isinstance(value, str):
+        return parse_datetime(value)
+    if field in DATE_FIELDS and isinstance(value, str):
+        return parse_date(value)
+    return value
+
+def serialize_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def init_worker():
+    # Hashing workers started with 'spawn' do not inherit the configured settings.
+    # Lives here, not in import_users, so unpickling it does not import any models.
+    django.setup()
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class Progress:
+    """
+    Periodic progress line on stderr with the running rate.
+    """
+    def __init__(self, stream, label, every):
+        self.stream = stream
+        self.label = label
+        self.every = every
+        self.count = 0
+        self.start = time.monotonic()
+        self._next = every
+
+    def add(self, n=1):
+        self.count += n
+        if self.every and self.count >= self._next:
+            self._next += self.every
+            self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.start
+        rate = self.count / elapsed if elapsed else 0
+        self.stream.write(f"{self.label}: {self.count} rows ({rate:.0f} rows/s)")
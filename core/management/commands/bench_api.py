@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+import json
+from io import BytesIO
+
+from allauth.account.models import EmailAddress
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from django.test.client import encode_multipart, BOUNDARY, MULTIPART_CONTENT
+from django.urls import reverse
+from PIL import Image
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmark import (
+    ASGIDriver, benchmark_database, find_regressions, load_baseline, percent_change,
+    run_load, save_baseline, summarize,
+)
+from core.models import User
+
+SCENARIOS = ['register', 'login', 'token-refresh', 'profile-get', 'profile-patch', 'profile-patch-image', 'password-reset']
+PASSWORD = 'benchpassword123'
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the auth and profile API endpoints against the ASGI application '
+        'in-process, on a throwaway test database. Saves and compares JSON baselines.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scenario to run (repeatable, default: all)')
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write the results to a baseline JSON file')
+        parser.add_argument('--baseline', metavar='PATH', help='Compare against a baseline JSON file')
+        parser.add_argument('--threshold', type=float, default=10.0,
+                            help='Regression threshold in percent, for throughput and p95 (default: 10)')
+        parser.add_argument('--smtp-port', type=int,
+                            help='Send mail to a local SMTP stand-in on this port (e.g. `python -m aiosmtpd -n -l localhost:1025`) '
+                                 'instead of the in-memory backend')
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or SCENARIOS
+        mail_settings = {}
+        if options['smtp_port']:
+            mail_settings = {
+                'EMAIL_BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
+                'EMAIL_HOST': 'localhost', 'EMAIL_PORT': options['smtp_port'],
+                'EMAIL_USE_TLS': False, 'EMAIL_USE_SSL': False,
+                'EMAIL_HOST_USER': '', 'EMAIL_HOST_PASSWORD': '',
+            }
+        with benchmark_database(), override_settings(**mail_settings):
+            user = User.objects.create(email='bench@example.com', first_name='Bench')
+            user.set_password(PASSWORD)
+            user.save()
+            EmailAddress.objects.create(user=user, email=user.email, verified=True, primary=True)
+            results = asyncio.run(self.run_scenarios(scenarios, options['requests'], options['concurrency'], user))
+
+        if options['save_baseline']:
+            save_baseline(options['save_baseline'], results)
+        baseline = load_baseline(options['baseline']) if options['baseline'] else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.print_report(results, baseline)
+
+        if baseline is not None:
+            regressions = find_regressions(baseline, results, options['threshold'])
+            if regressions:
+                raise CommandError(f"Regressions beyond {options['threshold']}%:\n" + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']}%."))
+
+    async def run_scenarios(self, scenarios, total, concurrency, user):
+        from config.asgi import application
+        driver = ASGIDriver(application)
+        refresh = RefreshToken.for_user(user)
+        auth = {'Authorization': f'Bearer {refresh.access_token}'}
+        emails = itertools.count()
+        image = make_image()
+
+        def post_json(url, data, headers=None):
+            return driver.request('POST', url, json.dumps(data).encode(), {**(headers or {}), 'Content-Type': 'application/json'})
+
+        def patch_multipart(data):
+            body = encode_multipart(BOUNDARY, data)
+            return driver.request('PATCH', reverse('user-profile'), body, {**auth, 'Content-Type': MULTIPART_CONTENT})
+
+        requests = {
+            'register': lambda i: post_json(reverse('rest_register'), {
+                'email': f'bench-{next(emails)}@example.com', 'password1': PASSWORD, 'password2': PASSWORD,
+            }),
+            'login': lambda i: post_json(reverse('rest_login'), {'email': user.email, 'password': PASSWORD}),
+            'token-refresh': lambda i: post_json(reverse('token_refresh'), {'refresh': str(refresh)}),
+            'profile-get': lambda i: driver.request('GET', reverse('user-profile'), headers=auth),
+            'profile-patch': lambda i: patch_multipart({'first_name': f'Bench {i}'}),
+            'profile-patch-image': lambda i: patch_multipart({'profile_picture': named_file(image, f'bench-{i}.jpg')}),
+            'password-reset': lambda i: post_json(reverse('user-password-reset'), {'email': user.email}),
+        }
+        results = {}
+        for scenario in scenarios:
+            await run_load(requests[scenario], min(concurrency, 10), concurrency)     # Warm-up
+            results[scenario] = summarize(*await run_load(requests[scenario], total, concurrency))
+        return results
+
+    def print_report(self, results, baseline):
+        header = f"{'scenario':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for scenario, r in results.items():
+            self.stdout.write(
+                f"{scenario:<22}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}  {r['statuses']}"
+            )
+            before = (baseline or {}).get(scenario)
+            if before:
+                self.stdout.write(
+                    f"{'  vs baseline':<22}{percent_change(before['throughput_rps'], r['throughput_rps']):>10}"
+                    f"{percent_change(before['p50_ms'], r['p50_ms']):>10}{percent_change(before['p95_ms'], r['p95_ms']):>10}"
+                    f"{percent_change(before['p99_ms'], r['p99_ms']):>10}"
+                )
+
+def make_image(size=(640, 480)):
+    # A noisy image, so processing and JPEG encoding do realistic work
+    buffer = BytesIO()
+    Image.effect_noise(size, 64).convert('RGB').save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+def named_file(content, name):
+    file = BytesIO(content)
+    file.name = name
+    return file
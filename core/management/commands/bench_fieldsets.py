@@ -0,0 +1,90 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmark import ASGIDriver, benchmark_database, percent_change, run_load, summarize
+from core.models import User
+
+# (endpoint, query) pairs; each sparse scenario is compared with the full one before it
+SCENARIOS = {
+    'directory-full': ('user-directory', {'page_size': 100}),
+    'directory-sparse': ('user-directory', {'page_size': 100, 'fields': 'id,email'}),
+    'profile-full': ('user-profile', {}),
+    'profile-sparse': ('user-profile', {'fields': 'id,first_name,last_name'}),
+}
+
+class Command(BaseCommand):
+    help = (
+        'Compare full and sparse (?fields=) user payloads: response size, CPU time per request '
+        'and latency, against the ASGI application in-process on a throwaway test database. '
+        'Profile responses are cached, so the profile rows mostly show the payload size.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Users to create for the directory')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            staff = User.objects.create(email='bench-staff@example.com', first_name='Bench', is_staff=True)
+            User.objects.bulk_create(
+                User(email=f'bench-{i}@example.com', first_name=f'First{i}', last_name=f'Last{i}', bio='x' * 200)
+                for i in range(options['users'])
+            )
+            results = asyncio.run(self.run_scenarios(options['requests'], options['concurrency'], staff))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.print_report(results)
+
+    async def run_scenarios(self, total, concurrency, user):
+        from config.asgi import application
+        driver = ASGIDriver(application)
+        auth = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        results = {}
+        for scenario, (url_name, query) in SCENARIOS.items():
+            path = f'{reverse(url_name)}?{urlencode(query)}'
+            sizes = []
+
+            async def request(i):
+                response = await driver.request('GET', path, headers=auth)
+                sizes.append(len(response['body']))
+                return response
+
+            await run_load(request, min(concurrency, 10), concurrency)     # Warm-up
+            sizes.clear()
+            cpu_start = time.process_time()
+            latencies, statuses, elapsed = await run_load(request, total, concurrency)
+            cpu_ms = (time.process_time() - cpu_start) * 1000
+            results[scenario] = {
+                **summarize(latencies, statuses, elapsed),
+                'bytes': round(sum(sizes) / len(sizes)),
+                'cpu_ms': round(cpu_ms / total, 2),
+            }
+        return results
+
+    def print_report(self, results):
+        header = f"{'scenario':<20}{'bytes':>10}{'cpu ms':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}  statuses"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        full = None
+        for scenario, r in results.items():
+            self.stdout.write(
+                f"{scenario:<20}{r['bytes']:>10}{r['cpu_ms']:>10}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}  {r['statuses']}"
+            )
+            if scenario.endswith('-full'):
+                full = r
+            elif full:
+                self.stdout.write(
+                    f"{'  vs full':<20}{percent_change(full['bytes'], r['bytes']):>10}{percent_change(full['cpu_ms'], r['cpu_ms']):>10}"
+                    f"{percent_change(full['throughput_rps'], r['throughput_rps']):>10}{percent_change(full['p50_ms'], r['p50_ms']):>10}"
+                    f"{percent_change(full['p95_ms'], r['p95_ms']):>10}"
+                )
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.client import encode_multipart, BOUNDARY, MULTIPART_CONTENT
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.benchmark import ASGIDriver, benchmark_database, percent_change, run_load, summarize
+from core.models import User
+
+SCENARIOS = ['profile-get', 'profile-patch', 'password-reset']
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput and latency of the sync and async profile/password views, '
+        'driving the ASGI application in-process against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both')
+        parser.add_argument('--concurrency', type=int, default=100, help='Requests in flight at once')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per scenario')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, help='Scenario to run (repeatable, default: all)')
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        scenarios = options['scenario'] or SCENARIOS
+        current_mode = 'async' if settings.ASYNC_API_VIEWS else 'sync'
+        modes = ['sync', 'async'] if options['mode'] == 'both' else [options['mode']]
+
+        results = {}
+        for mode in modes:
+            if mode == current_mode and len(modes) == 1:
+                results[mode] = self.run_benchmarks(scenarios, options['requests'], options['concurrency'])
+            else:
+                # The view classes are picked when the URLconf is imported, so each mode runs in its own process
+                results[mode] = self.run_in_subprocess(mode, scenarios, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.print_report(results, scenarios)
+
+    def run_in_subprocess(self, mode, scenarios, options):
+        command = [sys.executable, sys.argv[0], 'bench_profile_views', '--mode', mode, '--json',
+                   '--requests', str(options['requests']), '--concurrency', str(options['concurrency'])]
+        for scenario in scenarios:
+            command += ['--scenario', scenario]
+        env = {**os.environ, 'ASYNC_API_VIEWS': str(mode == 'async')}
+        output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+        return json.loads(output.strip().splitlines()[-1])[mode]
+
+    def run_benchmarks(self, scenarios, total, concurrency):
+        with benchmark_database():
+            user = User.objects.create(email='bench@example.com', first_name='Bench')
+            token = str(RefreshToken.for_user(user).access_token)
+            return asyncio.run(self.run_scenarios(scenarios, total, concurrency, user, token))
+
+    async def run_scenarios(self, scenarios, total, concurrency, user, token):
+        from config.asgi import application
+        driver = ASGIDriver(application)
+        auth = {'Authorization': f'Bearer {token}'}
+        profile_url = reverse('user-profile')
+        reset_url = reverse('user-password-reset')
+
+        def profile_get(i):
+            return driver.request('GET', profile_url, headers=auth)
+
+        def profile_patch(i):
+            body = encode_multipart(BOUNDARY, {'first_name': f'Bench {i}'})
+            return driver.request('PATCH', profile_url, body, {**auth, 'Content-Type': MULTIPART_CONTENT})
+
+        def password_reset(i):
+            body = json.dumps({'email': user.email}).encode()
+            return driver.request('POST', reset_url, body, {'Content-Type': 'application/json'})
+
+        requests = {'profile-get': profile_get, 'profile-patch': profile_patch, 'password-reset': password_reset}
+        results = {}
+        for scenario in scenarios:
+            await run_load(requests[scenario], min(concurrency, 10), concurrency)     # Warm-up
+            results[scenario] = summarize(*await run_load(requests[scenario], total, concurrency))
+        return results
+
+    def print_report(self, results, scenarios):
+        header = f"{'scenario':<16}{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for scenario in scenarios:
+            for mode, by_scenario in results.items():
+                r = by_scenario[scenario]
+                self.stdout.write(
+                    f"{scenario:<16}{mode:<8}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}  {r['statuses']}"
+                )
+            if 'sync' in results and 'async' in results:
+                sync, async_ = results['sync'][scenario], results['async'][scenario]
+                self.stdout.write(self.style.SUCCESS(
+                    f"{'':<16}{'delta':<8}{percent_change(sync['throughput_rps'], async_['throughput_rps']):>10}"
+                    f"{percent_change(sync['p50_ms'], async_['p50_ms']):>10}{percent_change(sync['p95_ms'], async_['p95_ms']):>10}"
+                    f"{percent_change(sync['p99_ms'], async_['p99_ms']):>10}"
+                ))
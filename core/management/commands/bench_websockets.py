@@ -0,0 +1,79 @@
+import asyncio
+import gc
+import json
+import tracemalloc
+
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core.consumers import NotificationConsumer
+from core.models import User
+
+class Command(BaseCommand):
+    help = (
+        'Open many NotificationConsumer sockets in-process and report the memory held per '
+        'connection and where it is allocated. Counts the consumer, its scope and the '
+        'in-memory channel layer; the ASGI server\'s own per-socket objects are not included.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=1000, help='Sockets to open')
+        parser.add_argument('--users', type=int, default=0, help='Distinct users the sockets belong to (default: one per socket)')
+        parser.add_argument('--top', type=int, default=10, help='Allocation sites to list')
+        parser.add_argument('--json', action='store_true', help='Print raw results as JSON')
+
+    def handle(self, *args, **options):
+        # Measure the consumer, not a Redis client: use the in-process layer
+        with override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}):
+            results = asyncio.run(self.measure(options['connections'], options['users'] or options['connections'], options['top']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+            return
+        self.stdout.write(
+            f"{results['connections']} connections held: {results['total_kb']} KB, "
+            f"{results['bytes_per_connection']} bytes per connection, "
+            f"{results['retained_kb']} KB retained after they closed"
+        )
+        self.stdout.write('Top allocation sites per connection:')
+        for site in results['top']:
+            self.stdout.write(f"  {site['bytes_per_connection']:>8} B  {site['where']}")
+
+    async def measure(self, count, users, top):
+        application = NotificationConsumer.as_asgi()
+        tracemalloc.start()
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+
+        communicators = []
+        for i in range(count):
+            communicator = WebsocketCommunicator(application, '/ws/notifications/')
+            communicator.scope['user'] = User(pk=i % users + 1, email=f'socket{i % users}@example.com')
+            connected, _ = await communicator.connect()
+            assert connected, 'Socket was rejected'
+            communicators.append(communicator)
+        gc.collect()
+        held = tracemalloc.take_snapshot()
+        open_sockets = len(NotificationConsumer.connections)
+
+        for communicator in communicators:
+            await communicator.disconnect()
+        communicators.clear()
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        stats = held.compare_to(before, 'lineno')
+        total = sum(stat.size_diff for stat in stats)
+        retained = sum(stat.size_diff for stat in after.compare_to(before, 'lineno'))
+        return {
+            'connections': open_sockets,
+            'total_kb': round(total / 1024, 1),
+            'bytes_per_connection': round(total / max(count, 1)),
+            'retained_kb': round(retained / 1024, 1),
+            'top': [
+                {'where': str(stat.traceback), 'bytes_per_connection': round(stat.size_diff / max(count, 1))}
+                for stat in sorted(stats, key=lambda stat: stat.size_diff, reverse=True)[:top]
+            ],
+        }
@@ -0,0 +1,71 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models import User
+from ._users import USER_FIELDS, PASSWORD_HASH_FIELD, open_stream, serialize_value, Progress
+
+class Command(BaseCommand):
+    help = (
+        'Stream core_user to CSV or JSONL in constant memory, using a server-side cursor '
+        'or, with --copy, Postgres COPY.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', nargs='?', default='-', help="Output file ('-' for stdout)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--with-password-hashes', action='store_true',
+                            help=f"Include password hashes in a '{PASSWORD_HASH_FIELD}' column (for import_users)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per cursor round trip')
+        parser.add_argument('--copy', action='store_true', help='Use Postgres COPY (CSV only, fastest)')
+        parser.add_argument('--progress-every', type=int, default=100000, help='Report progress every N rows (0 disables)')
+
+    def handle(self, *args, **options):
+        columns = list(USER_FIELDS)
+        if options['with_password_hashes']:
+            columns.append(PASSWORD_HASH_FIELD)
+
+        stream = open_stream(options['output'], 'w')
+        try:
+            if options['copy']:
+                self.export_with_copy(stream, columns, options)
+            else:
+                self.export_with_cursor(stream, columns, options)
+        finally:
+            if options['output'] == '-':
+                stream.flush()
+            else:
+                stream.close()
+
+    def export_with_copy(self, stream, columns, options):
+        if options['format'] != 'csv':
+            raise CommandError('--copy only supports --format csv.')
+        if connection.vendor != 'postgresql':
+            raise CommandError('--copy requires PostgreSQL.')
+        quote = connection.ops.quote_name
+        select = ', '.join(
+            f"{quote('password')} AS {quote(PASSWORD_HASH_FIELD)}" if column == PASSWORD_HASH_FIELD else quote(column)
+            for column in columns
+        )
+        sql = f"COPY (SELECT {select} FROM {quote(User._meta.db_table)} ORDER BY {quote('id')}) TO STDOUT WITH (FORMAT csv, HEADER true)"
+        with connection.cursor() as cursor:
+            cursor.copy_expert(sql, stream)
+
+    def export_with_cursor(self, stream, columns, options):
+        fields = ['password' if column == PASSWORD_HASH_FIELD else column for column in columns]
+        rows = User.objects.order_by('pk').values_list(*fields).iterator(chunk_size=options['chunk_size'])
+        progress = Progress(self.stderr, 'Exported', options['progress_every'])
+
+        if options['format'] == 'csv':
+            writer = csv.writer(stream)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([serialize_value(value) for value in row])
+                progress.add()
+        else:
+            for row in rows:
+                stream.write(json.dumps(dict(zip(columns, map(serialize_value, row)))) + '\n')
+                progress.add()
+        progress.report()
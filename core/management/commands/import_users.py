@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Upper
+
+from core.models import User
+from ._users import (
+    USER_FIELDS, PASSWORD_HASH_FIELD, PLAIN_PASSWORD_FIELD,
+    open_stream, read_rows, convert_value, batched, init_worker, Progress,
+)
+
+class Command(BaseCommand):
+    help = (
+        'Stream users from CSV or JSONL into core_user in batches. Rows may carry a '
+        f"pre-hashed '{PASSWORD_HASH_FIELD}' (fast path) or a plain '{PLAIN_PASSWORD_FIELD}', "
+        'which is hashed in a process pool while the previous batch is inserted.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help="Input file ('-' for stdin)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT transaction')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: CPU count, 0 hashes in-process)')
+        parser.add_argument('--on-conflict', choices=['skip', 'error'], default='skip',
+                            help='What to do with emails that already exist')
+        parser.add_argument('--verified', action='store_true',
+                            help='Also create verified, primary allauth email addresses')
+        parser.add_argument('--progress-every', type=int, default=100000, help='Report progress every N rows (0 disables)')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.created = self.skipped = self.rows = 0
+        self.progress = Progress(self.stderr, 'Imported', options['progress_every'])
+
+        executor = None
+        if options['workers'] != 0:
+            executor = ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker)
+
+        stream = open_stream(options['input'], 'r')
+        try:
+            pending = None
+            for batch in batched(read_rows(stream, options['format']), options['batch_size']):
+                # Start hashing this batch before inserting the previous one, so both overlap
+                prepared = self.prepare(batch, executor)
+                if pending is not None:
+                    self.insert(*pending)
+                pending = prepared
+            if pending is not None:
+                self.insert(*pending)
+        finally:
+            if options['input'] != '-':
+                stream.close()
+            if executor is not None:
+                executor.shutdown()
+
+        self.progress.report()
+        self.stdout.write(self.style.SUCCESS(f"Created {self.created} users, skipped {self.skipped}."))
+
+    def prepare(self, rows, executor):
+        """
+        Build unsaved users for a batch; returns (users, iterator of hashes to fill in).
+        """
+        users = []
+        to_hash = []
+        for line, row in enumerate(rows, start=self.rows + 1):
+            email = (row.get('email') or '').strip()
+            if not email:
+                self.stderr.write(f"Skipping row {line}: missing email")
+                self.skipped += 1
+                continue
+            user = User(**{
+                field: convert_value(field, row[field])
+                for field in USER_FIELDS if field in row and row[field] not in ('', None)
+            })
+            user.email = User.objects.normalize_email(email)
+
+            password_hash = row.get(PASSWORD_HASH_FIELD)
+            if password_hash:
+                try:
+                    identify_hasher(password_hash)
+                except ValueError:
+                    raise CommandError(f"Row {line}: unrecognized password hash format.")
+                user.password = password_hash
+            elif row.get(PLAIN_PASSWORD_FIELD):
+                to_hash.append((user, row[PLAIN_PASSWORD_FIELD]))
+            else:
+                user.set_unusable_password()
+            users.append(user)
+        self.rows += len(rows)
+
+        passwords = [password for _, password in to_hash]
+        if executor is None:
+            hashes = map(make_password, passwords)
+        else:
+            hashes = executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32))
+        return users, zip([user for user, _ in to_hash], hashes)
+
+    def insert(self, users, hashes):
+        for user, password_hash in hashes:
+            user.password = password_hash
+
+        # Keyed like the case-insensitive unique constraint on email
+        unique = {}
+        for user in users:
+            key = user.email.upper()
+            if key in unique:
+                self.skip(user.email, 'duplicate in input')
+            else:
+                unique[key] = user
+        existing = self.existing(unique)
+        while True:
+            for key in existing:
+                self.skip(unique.pop(key).email, 'already exists')
+            new_users = list(unique.values())
+            try:
+                with transaction.atomic():
+                    self.create(new_users, unique)
+                break
+            except IntegrityError:
+                # Another import inserted some of these emails since the check: skip them and retry
+                existing = self.existing(unique)
+                if not existing:
+                    raise
+        self.created += len(new_users)
+        self.progress.add(len(new_users))
+
+    def existing(self, unique):
+        return set(
+            User.objects.annotate(email_upper=Upper('email')).filter(email_upper__in=unique).values_list('email_upper', flat=True)
+        )
+
+    def create(self, new_users, unique):
+        User.objects.bulk_create(new_users)
+        if self.options['verified']:
+            if new_users and new_users[0].pk is None:
+                # Backends that do not return primary keys from bulk inserts
+                ids = dict(
+                    User.objects.annotate(email_upper=Upper('email')).filter(email_upper__in=unique).values_list('email_upper', 'pk')
+                )
+                for user in new_users:
+                    user.pk = ids[user.email.upper()]
+            EmailAddress.objects.bulk_create([
+                EmailAddress(user_id=user.pk, email=user.email, verified=True, primary=True)
+                for user in new_users
+            ])
+
+    def skip(self, email, reason):
+        if self.options['on_conflict'] == 'error':
+            raise CommandError(f"{email}: {reason}.")
+        self.skipped += 1
@@ -0,0 +1,59 @@
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.payments import process_available
+
+import logging
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = (
+        'Process stored payment webhook events with a pool of worker threads. Events of one '
+        'customer run in arrival order; failures are retried with backoff.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.PAYMENT_WORKERS, help='Worker threads')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds an idle worker waits before looking again')
+        parser.add_argument('--once', action='store_true', help='Process the events that are due, then exit')
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        handled = []
+
+        def work():
+            total = 0
+            try:
+                while not stop.is_set():
+                    try:
+                        count = process_available(limit=100)
+                    finally:
+                        close_old_connections()
+                    total += count
+                    if not count:
+                        if options['once']:
+                            break
+                        stop.wait(options['poll_interval'])
+            except Exception:
+                logger.exception("Payment worker thread crashed")
+                stop.set()
+            finally:
+                handled.append(total)
+
+        threads = [threading.Thread(target=work, name=f'payments-{i}', daemon=True) for i in range(max(options['workers'], 1))]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Processing payment events with {len(threads)} worker(s)")
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping after the events in progress...')
+            stop.set()
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS(f"Processed {sum(handled)} payment event(s)"))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.data_export import purge_expired_exports
+from core.workers import requeue_stale_jobs
+
+import logging
+logger = logging.getLogger(__name__)
+
+class Command(BaseCommand):
+    help = (
+        'Re-send account jobs (data exports, deletions) whose channel message was lost or whose '
+        'worker stopped, so they are not stuck pending or running, and delete expired data exports. '
+        'Run it periodically or with --interval.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0, help='Seconds between sweeps; 0 sweeps once and exits')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                requeued = requeue_stale_jobs()
+                purge_expired_exports()
+            finally:
+                close_old_connections()
+            if not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f"Re-sent {requeued} account job(s)"))
+                return
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                return
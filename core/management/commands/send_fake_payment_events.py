@@ -0,0 +1,82 @@
+import itertools
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmark import summarize
+from core.payments import sign_payload
+
+EVENT_TYPES = ['customer.subscription.updated', 'invoice.paid', 'payment_intent.succeeded', 'charge.refunded']
+
+class Command(BaseCommand):
+    help = (
+        'Send signed fake payment webhook events to a running server, including provider-style '
+        'duplicate deliveries, and report response codes and latency.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='https://localhost:8000/core/payments/webhook/', help='Webhook endpoint')
+        parser.add_argument('--events', type=int, default=100, help='Distinct events to send')
+        parser.add_argument('--customers', type=int, default=10, help='Customers the events are spread over')
+        parser.add_argument('--duplicates', type=int, default=1, help='Deliveries of each event, as in a provider retry storm')
+        parser.add_argument('--concurrency', type=int, default=10, help='Requests in flight at once')
+        parser.add_argument('--secret', help='Webhook signing secret (default: STRIPE_WEBHOOK_SECRET)')
+        parser.add_argument('--insecure', action='store_true', help="Don't verify the server certificate (self-signed dev certificates)")
+
+    def handle(self, *args, **options):
+        secret = options['secret'] or settings.STRIPE_WEBHOOK_SECRET
+        if not secret:
+            raise CommandError('Pass --secret or set STRIPE_WEBHOOK_SECRET')
+
+        payloads = [json.dumps(fake_event(i, options['customers'])) for i in range(options['events'])]
+        deliveries = list(itertools.chain.from_iterable(itertools.repeat(payloads, max(options['duplicates'], 1))))
+        random.shuffle(deliveries)
+        session = requests.Session()
+        session.verify = not options['insecure']
+
+        def deliver(payload):
+            start = time.perf_counter()
+            try:
+                response = session.post(options['url'], data=payload.encode(), timeout=10, headers={
+                    'Content-Type': 'application/json',
+                    'Stripe-Signature': sign_payload(payload, secret),
+                })
+                status = response.status_code
+            except requests.RequestException:
+                status = 'error'
+            return time.perf_counter() - start, status
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(deliver, deliveries))
+        elapsed = time.perf_counter() - start
+
+        statuses = {}
+        for _, status in results:
+            statuses[status] = statuses.get(status, 0) + 1
+        report = summarize([latency for latency, _ in results], statuses, elapsed)
+        self.stdout.write(
+            f"{report['requests']} deliveries of {len(payloads)} events in {report['elapsed_s']}s "
+            f"({report['throughput_rps']} req/s), p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, "
+            f"p99 {report['p99_ms']} ms, statuses {report['statuses']}"
+        )
+
+def fake_event(n, customers):
+    return {
+        'id': f'evt_fake_{uuid.uuid4().hex}',
+        'object': 'event',
+        'type': EVENT_TYPES[n % len(EVENT_TYPES)],
+        'created': int(time.time()),
+        'data': {'object': {
+            'id': f'obj_fake_{n}',
+            'object': 'fake',
+            'customer': f'cus_fake_{n % max(customers, 1)}',
+            'amount': random.randint(100, 10000),
+        }},
+    }
@@ -0,0 +1,366 @@
+"""
+Per-process request, database and WebSocket metrics, rendered in Prometheus text format.
+
+Each thread records into its own shard, so the hot path never takes a lock; readers
+merge the shards into a snapshot. When METRICS_MULTIPROCESS_DIR is set, every process
+writes its snapshot there from a background thread and the /metrics view sums the
+snapshots of the processes still running.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Total HTTP requests by URL name, method and status.', None),
+    'http_request_duration_seconds': ('histogram', 'HTTP request latency by URL name and method.',
+                                      (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)),
+    'http_response_size_bytes': ('histogram', 'HTTP response body size by URL name.',
+                                 (256, 1024, 4096, 16384, 65536, 262144, 1048576)),
+    'http_db_queries': ('histogram', 'Database queries issued per HTTP request by URL name.',
+                        (0, 1, 2, 3, 5, 10, 25, 50, 100)),
+    'http_db_query_seconds_total': ('counter', 'Total time spent in database queries by URL name.', None),
+    'cache_requests_total': ('counter', 'Cache lookups by tier and result (hit or miss).', None),
+    'websocket_connections_total': ('counter', 'WebSocket connections accepted by consumer.', None),
+    'websocket_disconnections_total': ('counter', 'WebSocket disconnections by consumer.', None),
+    'websocket_connections_open': ('gauge', 'Open WebSocket connections by consumer.', None),
+    'websocket_idle_closed_total': ('counter', 'WebSocket connections closed for missing heartbeats by consumer.', None),
+    'websocket_messages_total': ('counter', 'WebSocket messages by consumer and direction.', None),
+}
+
+
+class MetricsRegistry:
+    """
+    Lock-free per-process aggregates. Counters are stored as floats and histograms as
+    [per-bucket counts..., +Inf count, sum, count] lists, keyed by (name, labels).
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._shards.append(shard)      # list.append is atomic under the GIL
+        return shard
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted(labels.items())))
+
+    def inc(self, name, value=1, **labels):
+        shard = self._shard()
+        key = self._key(name, labels)
+        shard[key] = shard.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        shard = self._shard()
+        key = self._key(name, labels)
+        data = shard.get(key)
+        if data is None:
+            data = shard[key] = [0] * (len(buckets) + 3)
+        data[bisect_left(buckets, value)] += 1
+        data[-2] += value
+        data[-1] += 1
+
+    def snapshot(self):
+        merged = {}
+        for shard in list(self._shards):
+            for key, value in dict(shard).items():
+                _merge(merged, key, value)
+        return merged
+
+    def reset(self):
+        for shard in list(self._shards):
+            shard.clear()
+
+
+def _merge(target, key, value):
+    current = target.get(key)
+    if current is None:
+        target[key] = list(value) if isinstance(value, list) else value
+    elif isinstance(current, list):
+        for i, v in enumerate(value):
+            current[i] += v
+    else:
+        target[key] = current + value
+
+
+registry = MetricsRegistry()
+
+
+# Multi-process aggregation
+
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _snapshot_path(directory, pid=None):
+    return Path(directory) / f'{pid or os.getpid()}.json'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def flush():
+    """
+    Write this process's snapshot to METRICS_MULTIPROCESS_DIR.
+    """
+    directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+    if not directory:
+        return
+    entries = [[name, list(labels), value] for (name, labels), value in registry.snapshot().items()]
+    path = _snapshot_path(directory)
+    tmp_path = path.with_suffix('.tmp')
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not write metrics snapshot to {path}: {e}")
+
+
+def _flush_periodically(interval):
+    while True:
+        time.sleep(interval)
+        flush()
+
+
+def start_flusher():
+    """
+    Flush from a daemon thread every METRICS_FLUSH_INTERVAL seconds, keeping file I/O
+    off the request path. Started once per process, including after a fork.
+    """
+    global _flusher_pid
+    if not getattr(settings, 'METRICS_MULTIPROCESS_DIR', None):
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+    threading.Thread(target=_flush_periodically, args=(interval,), name='metrics-flush', daemon=True).start()
+
+
+def remove_snapshot():
+    """
+    Drop this process's snapshot on exit, so its gauges stop counting towards the total.
+    Counters drop with it, which Prometheus reads as a counter reset.
+    """
+    directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+    if directory:
+        _snapshot_path(directory).unlink(missing_ok=True)
+
+
+atexit.register(remove_snapshot)
+
+
+def collect():
+    """
+    Return the snapshot of this process merged with the snapshots written by the others.
+    Snapshots of processes that are gone (killed without running atexit) are deleted.
+    """
+    merged = registry.snapshot()
+    directory = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+    if not directory or not os.path.isdir(directory):
+        return merged
+    for path in Path(directory).glob('*.json'):
+        try:
+            pid = int(path.stem)
+        except ValueError:
+            continue
+        if pid == os.getpid():
+            continue
+        if not _pid_alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in entries:
+            if name in METRICS:
+                _merge(merged, (name, tuple(tuple(label) for label in labels)), value)
+    return merged
+
+
+# Prometheus text exposition
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(snapshot):
+    by_name = {}
+    for (name, labels), value in snapshot.items():
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text, buckets = METRICS[name]
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name[name]):
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-2]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(value[-2])}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+# Database query recording
+
+class QueryStats:
+    """
+    Queries issued while tracking: count, total time and count per SQL statement.
+    """
+    __slots__ = ('count', 'seconds', 'statements')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+
+# Active stats, innermost last; nested blocks (e.g. a test around a request) all see each query
+_query_stats = contextvars.ContextVar('query_stats', default=())
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper that adds the query to every active QueryStats. They live in a
+    context variable so they follow the request across sync_to_async.
+    """
+    active = _query_stats.get()
+    if not active:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for stats in active:
+            stats.count += 1
+            stats.seconds += elapsed
+            stats.statements[sql] += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    Attach `record_query` to a database connection. Connected to `connection_created`.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def track_queries():
+    """
+    Record every query issued in the block, including in sync_to_async threads.
+    """
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+    stats = QueryStats()
+    token = _query_stats.set(_query_stats.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+
+def current_query_stats():
+    """
+    The innermost active QueryStats (the request's, under MetricsMiddleware), or None.
+    """
+    active = _query_stats.get()
+    return active[-1] if active else None
+
+
+# Middleware
+
+def _url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return (match.url_name if match else None) or 'unresolved'
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status, response size and database usage per URL name.
+    Placed right after HealthCheckMiddleware and ProfilerMiddleware, so health probes are
+    not counted and everything after them is timed.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        start_flusher()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with track_queries() as stats:
+            response = self.get_response(request)
+        self._finish(request, response, stats, start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with track_queries() as stats:
+            response = await self.get_response(request)
+        self._finish(request, response, stats, start)
+        return response
+
+    @staticmethod
+    def _finish(request, response, stats, start):
+        duration = time.perf_counter() - start
+        view = _url_name(request)
+        registry.inc('http_requests_total', view=view, method=request.method, status=response.status_code)
+        registry.observe('http_request_duration_seconds', duration, view=view, method=request.method)
+        registry.observe('http_db_queries', stats.count, view=view)
+        registry.inc('http_db_query_seconds_total', stats.seconds, view=view)
+        if not response.streaming:
+            registry.observe('http_response_size_bytes', len(response.content), view=view)
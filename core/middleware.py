@@ -0,0 +1,54 @@
+"""
+Path-scoped middleware: JWT-only API routes skip the session, CSRF, messages, allauth
+and static-file middleware that only the HTML and allauth routes need.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.exception import convert_exception_to_response
+
+
+class ViewHandler(BaseHandler):
+    """
+    Handler with an empty middleware chain: resolves the URL and calls the view, with
+    Django's usual exception-to-response conversion.
+    """
+    def __init__(self, is_async):
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+        self._middleware_chain = convert_exception_to_response(
+            self._get_response_async if is_async else self._get_response
+        )
+
+    def __call__(self, request):
+        return self._middleware_chain(request)
+
+
+class LeanAPIMiddleware:
+    """
+    Sends requests for exactly the paths in LEAN_API_PATHS straight to the view, bypassing
+    every middleware listed after this one; all other requests continue down the full chain.
+
+    Place it after the middleware every route needs (security, CORS, common) and before
+    the ones API routes do not. The middleware after it stays in MIDDLEWARE, which keeps
+    Django's and allauth's configuration checks satisfied.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.paths = frozenset(settings.LEAN_API_PATHS)
+        if not self.paths:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        is_async = iscoroutinefunction(get_response)
+        if is_async:
+            markcoroutinefunction(self)
+        self.view_handler = ViewHandler(is_async)
+
+    def __call__(self, request):
+        if request.path_info in self.paths:
+            return self.view_handler(request)
+        return self.get_response(request)
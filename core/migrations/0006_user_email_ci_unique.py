@@ -0,0 +1,35 @@
+from django.db import migrations, models
+import django.db.models.functions.text
+
+EMAIL_CI_UNIQUE = models.UniqueConstraint(django.db.models.functions.text.Upper('email'), name='core_user_email_ci_uniq')
+
+
+def add_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # Build the index without locking writes on a large user table. Fails if existing
+        # emails differ only in case; merge or rename those accounts first.
+        schema_editor.execute('CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "core_user_email_ci_uniq" ON "core_user" (UPPER("email"))')
+    else:
+        schema_editor.add_constraint(apps.get_model('core', 'User'), EMAIL_CI_UNIQUE)
+
+
+def remove_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS "core_user_email_ci_uniq"')
+    else:
+        schema_editor.remove_constraint(apps.get_model('core', 'User'), EMAIL_CI_UNIQUE)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_payment_event'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[migrations.RunPython(add_constraint, remove_constraint)],
+            state_operations=[migrations.AddConstraint(model_name='user', constraint=EMAIL_CI_UNIQUE)],
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:07
+
+import core.models
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_user_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilerRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_name', models.CharField(blank=True, help_text='URL name to profile, e.g. user-profile; blank for every URL.', max_length=100)),
+                ('method', models.CharField(blank=True, help_text='HTTP method to profile; blank for every method.', max_length=10)),
+                ('sample_rate', models.FloatField(default=1.0, help_text='Fraction of matching requests to profile.', validators=[django.core.validators.MinValueValidator(0.0), django.core.validators.MaxValueValidator(1.0)])),
+                ('enabled', models.BooleanField(default=True)),
+                ('expires_at', models.DateTimeField(default=core.models.one_hour_from_now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2048)),
+                ('url_name', models.CharField(blank=True, max_length=100)),
+                ('status_code', models.PositiveSmallIntegerField(null=True)),
+                ('duration_ms', models.FloatField()),
+                ('samples', models.PositiveIntegerField()),
+                ('collapsed', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
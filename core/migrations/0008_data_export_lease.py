@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-19 12:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_request_profiler'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataexport',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='dataexport',
+            name='available_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
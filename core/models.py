@@ -1,5 +1,11 @@
 from django.contrib.auth.models import AbstractUser, Group, Permission
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from datetime import timedelta
 
 class User(AbstractUser):
     # Inherit from AbstractUser to have all the fields and methods of the default User model
@@ -16,6 +22,19 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'        # Field used for authentication (by default: 'username')            
     REQUIRED_FIELDS = []            # Fields required when creating a user (by default: 'username' and 'password')
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Keyset pagination of the user directory (see core.pagination)
+            models.Index(fields=['date_joined', 'id'], name='core_user_joined_id_idx'),
+            # Trigram indexes on UPPER(...) serve both case-insensitive prefix (LIKE) and fuzzy search
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='core_user_email_trgm'),
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='core_user_first_name_trgm'),
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='core_user_last_name_trgm'),
+        ]
+        constraints = [
+            # Emails differing only in case belong to the same person; enforced on write (see core.serializers)
+            models.UniqueConstraint(Upper('email'), name='core_user_email_ci_uniq'),
+        ]
 
     def __str__(self):
         return self.email
@@ -36,4 +55,119 @@ class User(AbstractUser):
         authenticated in templates.
         It indicates that instances of this model are always considered authenticated.
         """
-        return True
\ No newline at end of file
+        return True
+
+class DataExport(models.Model):
+    """
+    A user's "download my data" archive, built in the background by the account worker.
+    """
+    PENDING, RUNNING, READY, FAILED = 'pending', 'running', 'ready', 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (READY, 'Ready'), (FAILED, 'Failed')]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='data_exports')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    file = models.FileField(upload_to='exports/', null=True, blank=True)
+    size = models.PositiveBigIntegerField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Pending: re-sent after this; running: lease end (see core.workers)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Data export {self.pk} for {self.user_id} ({self.status})"
+
+
+class AccountDeletion(models.Model):
+    """
+    Background deletion of an account and everything that depends on it (see core.account_deletion).
+    Keeps the user id rather than a foreign key, so the record outlives the account.
+    """
+    PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    user_id = models.BigIntegerField(db_index=True)
+    email = models.EmailField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    rows_deleted = models.PositiveBigIntegerField(default=0)
+    files_deleted = models.PositiveIntegerField(default=0)
+    progress = models.JSONField(default=dict, blank=True)      # Rows deleted per model label
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Pending: re-sent after this; running: lease end (see core.workers)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Deletion of {self.email} ({self.status})"
+
+
+class PaymentEvent(models.Model):
+    """
+    A payment provider webhook event, stored raw on receipt and processed by the
+    payment worker (see core.payments). Events of one customer are processed in
+    arrival order; failures are retried with backoff up to PAYMENT_EVENT_MAX_ATTEMPTS.
+    """
+    PENDING, PROCESSED, FAILED = 'pending', 'processed', 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (PROCESSED, 'Processed'), (FAILED, 'Failed')]
+
+    event_id = models.CharField(max_length=255, unique=True)   # Provider event id; retries of one event collide here
+    type = models.CharField(max_length=100)
+    customer_id = models.CharField(max_length=255)              # Ordering key: the provider customer, or the event id
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Not claimable before this: retry backoff or claim lease
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='core_payment_due_idx'),
+            models.Index(fields=['customer_id', 'id'], name='core_payment_customer_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} ({self.status})"
+
+
+def one_hour_from_now():
+    return timezone.now() + timedelta(hours=1)
+
+
+class ProfilerRule(models.Model):
+    """
+    Switches on sampling profiles of matching requests at runtime (see core.profiler).
+    Rules expire, so a forgotten one stops costing anything.
+    """
+    url_name = models.CharField(max_length=100, blank=True, help_text='URL name to profile, e.g. user-profile; blank for every URL.')
+    method = models.CharField(max_length=10, blank=True, help_text='HTTP method to profile; blank for every method.')
+    sample_rate = models.FloatField(default=1.0, validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+                                    help_text='Fraction of matching requests to profile.')
+    enabled = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(default=one_hour_from_now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Profile {self.method or 'any'} {self.url_name or 'any URL'} at {self.sample_rate:.0%}"
+
+
+class RequestProfile(models.Model):
+    """
+    Sampled call stacks of one profiled request, in collapsed-stack format (one
+    "frame;frame;frame count" line per stack), as read by flamegraph.pl and speedscope.
+    Only the newest PROFILER_MAX_PROFILES are kept.
+    """
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    url_name = models.CharField(max_length=100, blank=True)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    duration_ms = models.FloatField()
+    samples = models.PositiveIntegerField()
+    collapsed = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.method} {self.url_name or self.path} ({self.duration_ms:.0f} ms)"
@@ -0,0 +1,173 @@
+"""
+Payment webhook ingestion.
+
+The webhook view only verifies the signature and inserts the raw event; the unique
+event id makes provider retries a no-op. Events are processed by the payment worker
+(`python manage.py process_payment_events`), which uses the PaymentEvent table as its
+queue, so webhook bursts never run business logic on request workers and nothing is
+lost while the worker is down.
+
+Events of one customer are processed one at a time, in arrival order: an event is only
+claimed when no older pending event of the same customer exists. A failed event is
+retried with exponential backoff and holds back the customer's later events until it
+succeeds or runs out of attempts. Handlers subscribe to `payment_event_received`; an
+event whose worker dies mid-way is run again, so handlers must be idempotent.
+"""
+import hashlib
+import hmac
+import time
+from datetime import timedelta
+
+import stripe
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import PaymentEvent
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Sent inside the processing transaction with `event` (a PaymentEvent); raising rolls
+# the handler's writes back and schedules a retry
+payment_event_received = Signal()
+
+# Candidates fetched per claim attempt; other workers may win some of them
+CLAIM_BATCH = 10
+
+
+def sign_payload(payload, secret, timestamp=None):
+    """
+    Stripe-Signature header value for `payload` (str), as the provider computes it.
+    """
+    timestamp = int(time.time() if timestamp is None else timestamp)
+    signature = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def verify_signature(payload, header):
+    """
+    Raises stripe.SignatureVerificationError unless `header` signs `payload` with the
+    endpoint secret and is recent enough.
+    """
+    stripe.WebhookSignature.verify_header(payload, header or '', settings.STRIPE_WEBHOOK_SECRET, settings.PAYMENT_WEBHOOK_TOLERANCE)
+
+
+def ordering_key(event):
+    """
+    Events that concern a customer are ordered per customer; others are independent.
+    """
+    obj = event.get('data', {}).get('object', {})
+    if obj.get('object') == 'customer':
+        return obj['id']
+    return obj.get('customer') or event['id']
+
+
+def store_event(event):
+    """
+    Persist a verified event. Returns False if it was already received.
+    """
+    try:
+        with transaction.atomic():
+            PaymentEvent.objects.create(
+                event_id=event['id'],
+                type=event['type'],
+                customer_id=ordering_key(event),
+                payload=event,
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(10 * 2 ** (attempts - 1), 3600))
+
+
+def claim_next():
+    """
+    Claim the oldest due event whose customer has no older pending event, or return None.
+
+    A claim pushes `available_at` forward by PAYMENT_EVENT_LEASE, so an event whose
+    worker died becomes claimable again once the lease runs out.
+
+    "Older" means a lower pk. Two deliveries for one customer arriving at the same moment
+    can commit out of pk order, and the later one can then be claimed before the earlier
+    one is visible, so handlers must not rely on strict ordering across near-simultaneous
+    deliveries.
+    """
+    now = timezone.now()
+    older_pending = PaymentEvent.objects.filter(
+        customer_id=OuterRef('customer_id'), pk__lt=OuterRef('pk'), status=PaymentEvent.PENDING,
+    )
+    candidates = (
+        PaymentEvent.objects.filter(status=PaymentEvent.PENDING, available_at__lte=now)
+        .exclude(Exists(older_pending))
+        .order_by('pk')
+        .values_list('pk', flat=True)[:CLAIM_BATCH]
+    )
+    for pk in candidates:
+        claimed = PaymentEvent.objects.filter(pk=pk, status=PaymentEvent.PENDING, available_at__lte=now).update(
+            attempts=F('attempts') + 1,
+            available_at=now + timedelta(seconds=settings.PAYMENT_EVENT_LEASE),
+        )
+        if claimed:
+            return PaymentEvent.objects.get(pk=pk)
+    return None
+
+
+def leased(event):
+    # The event while this claim holds it: a worker whose lease ran out, and whose event
+    # was claimed again, matches nothing and cannot overwrite the newer attempt's result
+    return PaymentEvent.objects.filter(pk=event.pk, status=PaymentEvent.PENDING, attempts=event.attempts)
+
+
+def process_event(event):
+    try:
+        with transaction.atomic():
+            payment_event_received.send(sender=PaymentEvent, event=event)
+            if not leased(event).update(status=PaymentEvent.PROCESSED, processed_at=timezone.now(), last_error=''):
+                raise LeaseLost(f"Payment event {event.event_id} was claimed again, rolling back attempt {event.attempts}")
+    except LeaseLost as e:
+        logger.warning(str(e))
+        return False
+    except Exception as e:
+        if event.attempts >= settings.PAYMENT_EVENT_MAX_ATTEMPTS:
+            logger.exception(f"Payment event {event.event_id} failed after {event.attempts} attempts, giving up")
+            leased(event).update(status=PaymentEvent.FAILED, last_error=repr(e))
+        else:
+            delay = retry_delay(event.attempts)
+            logger.warning(f"Payment event {event.event_id} failed (attempt {event.attempts}), retrying in {delay}: {e!r}")
+            leased(event).update(available_at=timezone.now() + delay, last_error=repr(e))
+        return False
+    logger.info(f"Processed payment event {event.type} {event.event_id}")
+    return True
+
+
+def process_available(limit=None):
+    """
+    Process due events until none is left (or `limit` is reached). Returns how many were handled.
+    """
+    handled = 0
+    while limit is None or handled < limit:
+        event = claim_next()
+        if event is None:
+            break
+        process_event(event)
+        handled += 1
+    return handled
+
+
+def requeue(queryset):
+    """
+    Make failed or delayed events claimable again, e.g. after fixing a handler.
+    """
+    return queryset.exclude(status=PaymentEvent.PROCESSED).update(
+        status=PaymentEvent.PENDING, attempts=0, available_at=timezone.now(),
+    )
@@ -0,0 +1,272 @@
+"""
+On-demand sampling profiler for requests.
+
+Staff switch profiling on at runtime with a ProfilerRule (URL name, method, sample rate,
+expiry) in the admin. While a matching request runs, one sampler thread reads every
+thread's stack each PROFILER_INTERVAL seconds with sys._current_frames() and keeps the
+stacks that belong to the request, without touching frame locals:
+- every stack of the threads registered for it: the thread running a sync request, or
+  under ASGI the thread sync_to_async runs the request's sync code in (one per request);
+- stacks of other threads, such as the event loop's, that run through the middleware's
+  own frame for the request, so other requests sharing the loop are skipped.
+Time a coroutine spends awaiting is not on any stack, so async I/O waits do not show.
+
+Rules are reloaded by a per-process background thread every PROFILER_REFRESH_INTERVAL
+seconds, and right away in the process that changes one; requests only read the
+in-memory copy. Each profile is stored as a RequestProfile in collapsed-stack format;
+only the newest PROFILER_MAX_PROFILES are kept.
+"""
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+from .models import ProfilerRule, RequestProfile
+
+import logging
+logger = logging.getLogger(__name__)
+
+RULES_CACHE_KEY = 'profiler:rules'
+MAX_DEPTH = 200
+
+# Longest prefixes first, so frames are named after the package rather than the install path
+_PATH_PREFIXES = sorted(
+    {os.path.join(path, '') for path in sys.path + list(sysconfig.get_paths().values()) if path and os.path.isdir(path)},
+    key=len, reverse=True,
+)
+
+
+def frame_name(code):
+    filename = code.co_filename
+    for prefix in _PATH_PREFIXES:
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):]
+            break
+    # ';' separates frames and ' ' separates the count in collapsed stacks
+    return f'{filename}:{code.co_name}'.replace(';', ':').replace(' ', '_')
+
+
+class Profile:
+    """
+    Stacks sampled for one request.
+    """
+    def __init__(self, request, frame=None):
+        self.request = request
+        self.frame = frame          # The middleware's frame for this request
+        self.threads = set()        # Idents of threads whose every stack belongs to it
+        self.stacks = Counter()
+        self.start = time.perf_counter()
+
+    def collapsed(self):
+        names = {}
+        lines = []
+        for stack, count in self.stacks.most_common():
+            frames = ';'.join(names.get(code) or names.setdefault(code, frame_name(code)) for code in stack)
+            lines.append(f'{frames} {count}')
+        return '\n'.join(lines)
+
+
+class Sampler:
+    """
+    A thread that samples stacks while at least one profile is active, then exits.
+    """
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, profile):
+        with self._lock:
+            self.profiles.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name='request-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, profile):
+        with self._lock:
+            self.profiles.remove(profile)
+
+    def run(self):
+        own_ident = threading.get_ident()
+        while True:
+            time.sleep(settings.PROFILER_INTERVAL)
+            with self._lock:
+                profiles = list(self.profiles)
+                if not profiles:
+                    self._thread = None
+                    return
+            frames = {profile.frame: profile for profile in profiles if profile.frame is not None}
+            for ident, frame in sys._current_frames().items():
+                if ident != own_ident:
+                    owner = next((profile for profile in profiles if ident in profile.threads), None)
+                    self.sample(frame, owner, frames)
+
+    @staticmethod
+    def sample(frame, owner, frames):
+        stack = []
+        while frame is not None and len(stack) < MAX_DEPTH:
+            if owner is None:
+                owner = frames.get(frame)
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        if owner is not None:
+            stack.reverse()
+            owner.stacks[tuple(stack)] += 1
+
+
+sampler = Sampler()
+
+
+def load_rules():
+    """
+    Active rules as (url_name, method, sample_rate, expires_at) tuples, cached until a rule changes.
+    """
+    rules = cache.get(RULES_CACHE_KEY)
+    if rules is None:
+        rules = [
+            (rule.url_name, rule.method.upper(), rule.sample_rate, rule.expires_at)
+            for rule in ProfilerRule.objects.filter(enabled=True, expires_at__gt=timezone.now())
+        ]
+        cache.set(RULES_CACHE_KEY, rules, None)
+    return rules
+
+
+class RuleSet:
+    """
+    This process's copy of the active rules, reloaded by a daemon thread so requests never
+    wait on the cache or the database for them. Started once per process, including after
+    a fork.
+    """
+    def __init__(self):
+        self.rules = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self.run, name='profiler-rules', daemon=True).start()
+
+    def run(self):
+        while True:
+            try:
+                self.refresh()
+            finally:
+                connections.close_all()     # This thread's connections only
+            time.sleep(settings.PROFILER_REFRESH_INTERVAL)
+
+    def refresh(self):
+        try:
+            self.rules = load_rules()
+        except Exception:
+            # Keep the previous rules until the next reload
+            logger.exception("Could not load profiler rules")
+
+
+active_rules = RuleSet()
+
+
+def invalidate_rules():
+    cache.delete(RULES_CACHE_KEY)
+    active_rules.refresh()
+
+
+def save_profile(request, response, profile):
+    try:
+        store_profile(request, response, profile)
+    except Exception:
+        # A profile is never worth failing the request for
+        logger.exception(f"Could not store the profile of {request.method} {request.path}")
+
+
+def store_profile(request, response, profile):
+    match = getattr(request, 'resolver_match', None)
+    RequestProfile.objects.create(
+        method=request.method,
+        path=request.path[:2048],
+        url_name=(match.url_name or '') if match else '',
+        status_code=getattr(response, 'status_code', None),
+        duration_ms=(time.perf_counter() - profile.start) * 1000,
+        samples=sum(profile.stacks.values()),
+        collapsed=profile.collapsed(),
+    )
+    # Ring buffer: drop everything older than the newest PROFILER_MAX_PROFILES
+    oldest_kept = RequestProfile.objects.order_by('-pk').values_list('pk', flat=True)[settings.PROFILER_MAX_PROFILES - 1:settings.PROFILER_MAX_PROFILES]
+    if oldest_kept:
+        RequestProfile.objects.filter(pk__lt=oldest_kept[0]).delete()
+
+
+class ProfilerMiddleware:
+    """
+    Profiles requests matching an active ProfilerRule. Place it first in MIDDLEWARE so the
+    whole chain is profiled and storing the profile is not counted against the request.
+    PROFILER_ENABLED = False removes it from the chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        active_rules.start()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def select(self, request):
+        rules = active_rules.rules
+        if not rules:
+            return False
+        now = timezone.now()
+        try:
+            url_name = resolve(request.path_info).url_name or ''
+        except Resolver404:
+            url_name = ''
+        return any(
+            (not rule_url or rule_url == url_name) and (not method or method == request.method)
+            and expires_at > now and random.random() < rate
+            for rule_url, method, rate, expires_at in rules
+        )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.select(request):
+            return self.get_response(request)
+        profile = Profile(request)
+        profile.threads.add(threading.get_ident())
+        sampler.start(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            sampler.stop(profile)
+        save_profile(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        if not self.select(request):
+            return await self.get_response(request)
+        # The coroutine's frame is on the event loop's stack whenever this request runs there
+        profile = Profile(request, frame=sys._getframe())
+        # The request's thread-sensitive sync code all runs in this one thread
+        profile.threads.add(await sync_to_async(threading.get_ident)())
+        sampler.start(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            sampler.stop(profile)
+        await sync_to_async(save_profile)(request, response, profile)
+        return response
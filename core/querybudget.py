@@ -0,0 +1,166 @@
+"""
+Per-request query budgets and N+1 detection.
+
+Queries are counted by core.metrics' query recorder (the middleware reads the stats
+MetricsMiddleware keeps for the request), grouped by normalized SQL, and checked against
+the budgets declared in QUERY_BUDGETS. The same statement repeated QUERY_BUDGET_REPEAT_THRESHOLD
+times or more in one request is reported as a likely N+1.
+"""
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_IN_LIST = re.compile(r'IN \((?:\?(?:, )?)+\)', re.IGNORECASE)
+_VALUES = re.compile(r'VALUES (?:\((?:\?(?:, )?)+\)(?:, )?)+', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+_SAVEPOINT = re.compile(r'SAVEPOINT "[^"]+"', re.IGNORECASE)
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape: literals and parameters become '?', and IN lists
+    and multi-row VALUES of any length collapse to one form.
+    """
+    sql = _SPACE.sub(' ', sql.strip())
+    sql = _SAVEPOINT.sub('SAVEPOINT ?', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _VALUES.sub('VALUES (...)', sql)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """
+    Query count per normalized statement for one request or block of code, read from the
+    QueryStats recording it. Only queries issued after the recorder is created count.
+    """
+    def __init__(self, stats):
+        self.stats = stats
+        self.start_count = stats.count
+        self.start_statements = Counter(stats.statements)
+
+    @property
+    def count(self):
+        return self.stats.count - self.start_count
+
+    @property
+    def statements(self):
+        normalized = Counter()
+        for sql, n in (self.stats.statements - self.start_statements).items():
+            normalized[normalize_sql(sql)] += n
+        return normalized
+
+    def repeated(self, threshold):
+        return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def problems(self, max_queries=None, repeat_threshold=None):
+        """
+        Human-readable list of budget violations; empty when within budget.
+        """
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"{self.count} queries, budget is {max_queries}")
+        if repeat_threshold:
+            problems += [f"possible N+1, {n} x {sql}" for sql, n in self.repeated(repeat_threshold)]
+        return problems
+
+    def report(self):
+        return '\n'.join(f"{n:>4} x {sql}" for sql, n in self.statements.most_common())
+
+
+@contextmanager
+def track_queries():
+    """
+    Record every query issued in the block, including in sync_to_async threads.
+    """
+    with metrics.track_queries() as stats:
+        yield QueryRecorder(stats)
+
+
+@contextmanager
+def request_queries():
+    """
+    Like track_queries, but reusing the request's stats when MetricsMiddleware keeps them.
+    """
+    stats = metrics.current_query_stats()
+    if stats is None:
+        with track_queries() as recorder:
+            yield recorder
+    else:
+        yield QueryRecorder(stats)
+
+
+@contextmanager
+def query_budget(max_queries=None, repeat_threshold=None, label='block'):
+    """
+    Raise QueryBudgetExceeded if the block issues more than `max_queries` queries, or
+    repeats one statement `repeat_threshold` times or more.
+    """
+    with track_queries() as recorder:
+        yield recorder
+    problems = recorder.problems(max_queries, repeat_threshold)
+    if problems:
+        raise QueryBudgetExceeded(f"Query budget exceeded for {label}: " + '; '.join(problems) + '\n' + recorder.report())
+
+
+def get_budget(url_name, method):
+    return settings.QUERY_BUDGETS.get(url_name, {}).get(method)
+
+
+class QueryBudgetMiddleware:
+    """
+    Checks every request against QUERY_BUDGETS (keyed by URL name, then method).
+    QUERY_BUDGET_MODE 'warn' logs violations, 'raise' raises QueryBudgetExceeded (for the
+    test suite) and 'off' removes the middleware from the chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.QUERY_BUDGET_MODE not in ('warn', 'raise'):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_queries() as recorder:
+            response = self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    async def __acall__(self, request):
+        with request_queries() as recorder:
+            response = await self.get_response(request)
+        self.check(request, recorder)
+        return response
+
+    @staticmethod
+    def check(request, recorder):
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        problems = recorder.problems(get_budget(url_name, request.method), settings.QUERY_BUDGET_REPEAT_THRESHOLD)
+        if not problems:
+            return
+        message = f"Query budget exceeded for {request.method} {url_name or request.path}: " + '; '.join(problems)
+        if settings.QUERY_BUDGET_MODE == 'raise':
+            raise QueryBudgetExceeded(message + '\n' + recorder.report())
+        logger.warning(message)
@@ -1,39 +1,118 @@
 from rest_framework import serializers
+from django.conf import settings
 from dj_rest_auth.registration.serializers import RegisterSerializer
 from dj_rest_auth.serializers import UserDetailsSerializer
 from django.core.validators import validate_email
 from django.contrib.auth.password_validation import validate_password
 from django.core.files.uploadedfile import InMemoryUploadedFile
-from django.db import IntegrityError
-from .models import User
+import re
+
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+from .models import User, DataExport
 
 user_credentials_fields = ['email', 'password']
 user_info_fields = ['username', 'first_name', 'last_name', 'bio', 'birth_date', 'profile_picture', 'phone_number', 'address']
 
+EMAIL_IN_USE = "This email is already in use."
+
+# Unique constraints on core_user, by the name the database reports, and the field error they map to
+USER_UNIQUE_ERRORS = {
+    'core_user_email_ci_uniq': ('email', EMAIL_IN_USE),
+    'core_user_email_key': ('email', EMAIL_IN_USE),        # PostgreSQL name of the email column's own constraint
+    'core_user.email': ('email', EMAIL_IN_USE),            # SQLite reports the column instead
+}
+
+def violated_constraint(error):
+    """
+    Name of the unique constraint or index an IntegrityError reports, or None.
+    """
+    diag = getattr(error.__cause__, 'diag', None)
+    if diag is not None and diag.constraint_name:
+        return diag.constraint_name
+    match = re.search(r"UNIQUE constraint failed: (?:index '(\w+)'|(\S+))", str(error))
+    if match:
+        return match.group(1) or match.group(2)
+    return None
+
+def save_unique(instance, unique_errors=USER_UNIQUE_ERRORS, **kwargs):
+    """
+    Save `instance` and turn unique constraint violations into field errors, so the write
+    itself checks uniqueness instead of a SELECT before it.
+    """
+    try:
+        with transaction.atomic():
+            instance.save(**kwargs)
+    except IntegrityError as e:
+        field_error = unique_errors.get(violated_constraint(e))
+        if field_error is None:
+            raise
+        field, message = field_error
+        raise serializers.ValidationError({field: [message]}) from e
+
+def requested_fields(request, available):
+    """
+    Field names selected by ?fields=a,b and/or ?omit=c on `request`, in `available`
+    order, or None when the request selects nothing.
+    """
+    params = getattr(request, 'query_params', None) or getattr(request, 'GET', {})
+    fields, omit = params.get('fields'), params.get('omit')
+    if not fields and not omit:
+        return None
+    selected = list(available)
+    for param, value in (('fields', fields), ('omit', omit)):
+        if not value:
+            continue
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        unknown = names.difference(available)
+        if unknown:
+            raise serializers.ValidationError({param: f"Unknown field(s): {', '.join(sorted(unknown))}."})
+        selected = [name for name in selected if (name in names) == (param == 'fields')]
+    return selected
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin for ?fields= / ?omit= on the request in the serializer context.
+    Unselected fields are never built nor serialized, and `model_fields(request)` gives
+    the columns to pass to .only() for them.
+    """
+    def get_field_names(self, declared_fields, info):
+        names = super().get_field_names(declared_fields, info)
+        request = self.context.get('request')
+        selected = requested_fields(request, names) if request is not None else None
+        return names if selected is None else selected
+
+    @classmethod
+    def model_fields(cls, request, required=()):
+        """
+        Concrete model fields behind the selected fields, plus `required`, for .only().
+        """
+        names = requested_fields(request, cls.Meta.fields) or cls.Meta.fields
+        concrete = {field.name for field in cls.Meta.model._meta.concrete_fields}
+        return [name for name in names if name in concrete and name not in required] + list(required)
+
 class CustomRegisterSerializer(RegisterSerializer):
     first_name = serializers.CharField(required=False)
     last_name = serializers.CharField(required=False)
 
+    def get_cleaned_data(self):
+        # The account adapter copies the names onto the user before its single INSERT
+        data = super().get_cleaned_data()
+        data['first_name'] = self.validated_data.get('first_name', '')
+        data['last_name'] = self.validated_data.get('last_name', '')
+        return data
+
     def save(self, request):
         try:
-            user = super().save(request)
-            user.first_name = self.validated_data.get('first_name', '')
-            user.last_name = self.validated_data.get('last_name', '')
-            user.save()
-            return user
+            return super().save(request)
         except IntegrityError:
             raise serializers.ValidationError({'email': 'This email address is already in use.'})
 
-    def custom_signup(self, request, user):
-        user.first_name = self.validated_data.get('first_name', '')
-        user.last_name = self.validated_data.get('last_name', '')
-        user.save()
-
 class CustomUserDetailsSerializer(UserDetailsSerializer):
     class Meta(UserDetailsSerializer.Meta):
         fields = UserDetailsSerializer.Meta.fields + ('first_name', 'last_name')
 
-class UserFullSerializer(serializers.ModelSerializer):
+class UserFullSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for the User model with all fields. Used for retrieving full user information.
     """
@@ -42,6 +121,15 @@ class UserFullSerializer(serializers.ModelSerializer):
         fields = ['id', 'email'] + user_info_fields
         read_only_fields = ['id', 'email']
 
+class UserDirectorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Serializer for the staff user directory. Only the columns the directory selects.
+    """
+    class Meta:
+        model = User
+        fields = ['id', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'date_joined']
+        read_only_fields = fields
+
 class UserInfoUpdateSerializer(serializers.ModelSerializer):
     """
     Serializer for updating user information. Handles updates to non-credentials user information.
@@ -51,11 +139,6 @@ class UserInfoUpdateSerializer(serializers.ModelSerializer):
         model = User
         fields = user_info_fields
 
-    def validate_username(self, value):
-        if User.objects.filter(username=value).exclude(pk=self.instance.pk).exists():
-            raise serializers.ValidationError("This username is already in use.")
-        return value
-    
     def validate_profile_picture(self, value):
         if value in (None, '', False):
             return None
@@ -76,14 +159,10 @@ class UserCredentialsUpdateSerializer(serializers.ModelSerializer):
         model = User
         fields = ['email']
 
-    def validate_email(self, value):
-        if User.objects.filter(email=value).exclude(pk=self.instance.pk).exists():
-            raise serializers.ValidationError("This email is already in use.")
-        return value
-
     def update(self, instance, validated_data):
+        # Uniqueness (case-insensitive) is enforced by the database on save
         instance.email = validated_data.get('email', instance.email)
-        instance.save()
+        save_unique(instance, update_fields=['email'])
         return instance
    
 
@@ -128,4 +207,57 @@ class UserPasswordChangeSerializer(serializers.Serializer):
     def validate(self, data):
         if data['old_password'] == data['new_password']:
             raise serializers.ValidationError("New password must be different from the old password.")
-        return data
\ No newline at end of file
+        return data
+
+class AccountDeletionSerializer(serializers.Serializer):
+    """
+    Serializer for confirming an account deletion with the current password.
+    """
+    password = serializers.CharField(required=True, write_only=True)
+
+    def validate_password(self, value):
+        if not self.context['request'].user.check_password(value):
+            raise serializers.ValidationError("Password is incorrect.")
+        return value
+
+class DataExportSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the status of a data export. The archive itself is served by DataExportDownloadView.
+    """
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DataExport
+        fields = ['id', 'status', 'size', 'created_at', 'finished_at', 'expires_at', 'download_url']
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != DataExport.READY:
+            return None
+        return self.context['request'].build_absolute_uri(reverse('user-data-export-download', args=[obj.pk]))
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    """
+    Serializer for a single call inside a batch request.
+    """
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'], default='GET')
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def validate_path(self, value):
+        if not value.startswith('/'):
+            raise serializers.ValidationError("Path must be absolute, e.g. /core/user/profile/.")
+        return value
+
+class BatchRequestSerializer(serializers.Serializer):
+    """
+    Serializer for a batch request. Handles validating the list of sub-requests.
+    """
+    requests = BatchSubRequestSerializer(many=True)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError("At least one request is required.")
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f"A batch can contain at most {settings.BATCH_MAX_REQUESTS} requests.")
+        return value
\ No newline at end of file
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .cache import bump_version_on_commit, user_scope
+from .models import User, ProfilerRule
+from .profiler import invalidate_rules
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Retires every cached entry scoped to this user (auth lookup, profile payload).
+    # Bulk updates and deletes send no signals and bump the scope themselves.
+    bump_version_on_commit(user_scope(instance.pk))
+
+@receiver([post_save, post_delete], sender=ProfilerRule)
+def reload_profiler_rules(sender, instance, **kwargs):
+    # Reloaded in this process now, in the others within PROFILER_REFRESH_INTERVAL
+    invalidate_rules()
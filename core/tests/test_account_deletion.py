@@ -0,0 +1,95 @@
+import tempfile
+from unittest import mock
+
+from allauth.account.models import EmailAddress, EmailConfirmation
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.account_deletion import BatchDeleter, delete_account, requeue_deletions, schedule_deletion
+from core.models import User, AccountDeletion, DataExport
+from core.workers import requeue_stale_jobs
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    ACCOUNT_DELETION_BATCH_SIZE=1,
+)
+class AccountDeletionTestCase(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = User.objects.create(email='leaving@example.com')
+        self.user.set_password('testpassword123')
+        self.user.profile_picture.save('me.jpg', ContentFile(b'jpeg'))
+        self.user.groups.add(Group.objects.create(name='members'))
+        for i in range(3):
+            address = EmailAddress.objects.create(user=self.user, email=f'leaving{i}@example.com')
+            EmailConfirmation.create(address)
+        export = DataExport.objects.create(user=self.user)
+        export.file.save('export.zip', ContentFile(b'zip'))
+        Token.objects.create(user=self.user)
+        self.files = [self.user.profile_picture, export.file]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_requires_password(self):
+        response = self.client.post(reverse('user-delete'), {'password': 'wrong'})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    def test_deactivates_then_deletes_in_background(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('user-delete'), {'password': 'testpassword123'})
+        self.assertEqual(response.status_code, 202)
+        self.assertFalse(User.objects.get(pk=self.user.pk).is_active)
+        message = async_to_sync(get_channel_layer().receive)(settings.ACCOUNT_TASKS_CHANNEL)
+        self.assertEqual(message, {'type': 'account.delete', 'deletion_id': response.data['id']})
+
+        delete_account(message['deletion_id'])
+
+        deletion = AccountDeletion.objects.get(pk=message['deletion_id'])
+        self.assertEqual(deletion.status, AccountDeletion.DONE)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(EmailAddress.objects.exists())
+        self.assertFalse(EmailConfirmation.objects.exists())
+        self.assertFalse(User.groups.through.objects.exists())
+        self.assertEqual(deletion.progress['account.EmailConfirmation'], 3)
+        self.assertEqual(deletion.files_deleted, 2)
+        for file in self.files:
+            self.assertFalse(file.storage.exists(file.name))
+
+    def test_failed_run_is_retried_then_can_be_requeued(self):
+        deletion = schedule_deletion(self.user)
+        with self.settings(ACCOUNT_JOB_MAX_ATTEMPTS=2), mock.patch.object(BatchDeleter, 'delete_batch', side_effect=OSError('disk')):
+            delete_account(deletion.pk)
+            deletion.refresh_from_db()
+            self.assertEqual((deletion.status, deletion.attempts), (AccountDeletion.PENDING, 1))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(requeue_stale_jobs(['account.delete']), 1)
+            delete_account(deletion.pk)
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, AccountDeletion.FAILED)
+        self.assertIn('disk', deletion.error)
+
+        self.assertEqual(requeue_deletions(AccountDeletion.objects.all()), 1)
+        delete_account(deletion.pk)
+        deletion.refresh_from_db()
+        self.assertEqual(deletion.status, AccountDeletion.DONE)
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+
+    def test_protected_relations_are_refused_before_deactivating(self):
+        with mock.patch('core.account_deletion.blocking_relations', return_value=['shop.Order.customer']):
+            with self.assertRaises(ImproperlyConfigured):
+                schedule_deletion(self.user)
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+        self.assertFalse(AccountDeletion.objects.exists())
+
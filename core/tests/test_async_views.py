@@ -0,0 +1,57 @@
+import json
+
+from django.core import mail
+from django.test import TestCase, AsyncRequestFactory, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.views import AsyncUserProfileView, AsyncUserPasswordChangeView, AsyncUserPasswordResetView
+
+User = get_user_model()
+
+@override_settings(SECURE_SSL_REDIRECT=False, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = User.objects.create(email='async@example.com', first_name='Async')
+        self.user.set_password('testpassword123')
+        self.user.save()
+        self.auth = {'headers': {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}}
+
+    async def test_profile_get_and_patch(self):
+        view = AsyncUserProfileView.as_view()
+        response = await view(self.factory.get('/core/user/profile/', **self.auth))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['first_name'], 'Async')
+
+        request = self.factory.patch('/core/user/profile/', {'first_name': 'Changed'}, content_type='application/json', **self.auth)
+        response = await view(request)
+        self.assertEqual(response.status_code, 200)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertEqual(user.first_name, 'Changed')
+
+    async def test_profile_requires_authentication(self):
+        response = await AsyncUserProfileView.as_view()(self.factory.get('/core/user/profile/'))
+        self.assertEqual(response.status_code, 401)
+
+    async def test_password_change(self):
+        request = self.factory.post('/core/user/password/change/', {
+            'old_password': 'testpassword123', 'new_password': 'another-Passw0rd',
+        }, content_type='application/json', **self.auth)
+        response = await AsyncUserPasswordChangeView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertTrue(await user.acheck_password('another-Passw0rd'))
+
+    async def test_password_reset_sends_email(self):
+        request = self.factory.post('/core/user/password/reset/', {'email': 'async@example.com'}, content_type='application/json')
+        response = await AsyncUserPasswordResetView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 1)
+
+    async def test_email_taken_in_another_case_is_a_field_error(self):
+        await User.objects.acreate(email='taken@example.com')
+        request = self.factory.patch('/core/user/profile/', {'email': 'Taken@Example.com'}, content_type='application/json', **self.auth)
+        response = await AsyncUserProfileView.as_view()(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', json.loads(response.content))
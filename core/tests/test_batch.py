@@ -0,0 +1,98 @@
+import contextvars
+import threading
+from urllib.parse import urlsplit
+from unittest import mock
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.request import Request
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.views import BatchView
+
+User = get_user_model()
+
+request_tag = contextvars.ContextVar('request_tag', default=None)
+
+@override_settings(SECURE_SSL_REDIRECT=False, BATCH_MAX_WORKERS=1)
+class BatchTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(email='batch@example.com', first_name='Batch')
+        access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.batch_url = reverse('batch')
+
+    def test_batch_dispatches_sub_requests_as_same_user(self):
+        response = self.client.post(self.batch_url, {'requests': [
+            {'method': 'GET', 'path': reverse('user-profile')},
+            {'method': 'GET', 'path': reverse('rest_user_details')},
+            {'method': 'GET', 'path': '/core/does-not-exist/'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        profile, details, missing = response.json()['responses']
+        self.assertEqual(profile['status'], 200)
+        self.assertEqual(profile['body']['email'], 'batch@example.com')
+        self.assertEqual(details['status'], 200)
+        self.assertEqual(details['body']['first_name'], 'Batch')
+        self.assertEqual(missing['status'], 404)
+
+    def test_writes_are_visible_to_later_reads(self):
+        response = self.client.post(self.batch_url, {'requests': [
+            {'method': 'PATCH', 'path': reverse('rest_user_details'), 'body': {'first_name': 'Changed'}},
+            {'method': 'GET', 'path': reverse('user-profile')},
+        ]}, format='json')
+        update, profile = response.json()['responses']
+        self.assertEqual(update['status'], 200)
+        self.assertEqual(profile['body']['first_name'], 'Changed')
+
+    def test_sub_requests_keep_their_own_permissions(self):
+        self.client.credentials()
+        response = self.client.post(self.batch_url, {'requests': [
+            {'method': 'GET', 'path': reverse('user-profile')},
+        ]}, format='json')
+        self.assertEqual(response.json()['responses'][0]['status'], 401)
+
+    def test_batch_rejects_nesting_and_oversized_batches(self):
+        response = self.client.post(self.batch_url, {'requests': [
+            {'method': 'POST', 'path': self.batch_url, 'body': {'requests': []}},
+        ]}, format='json')
+        self.assertEqual(response.json()['responses'][0]['status'], 400)
+        with self.settings(BATCH_MAX_REQUESTS=1):
+            response = self.client.post(self.batch_url, {'requests': [
+                {'path': reverse('user-profile')}, {'path': reverse('user-profile')},
+            ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(BATCH_MAX_WORKERS=2)
+    def test_concurrent_reads_keep_the_request_context(self):
+        def dispatch_one(request, item):
+            return (request_tag.get(), threading.current_thread() is not threading.main_thread()), {}
+
+        request_tag.set('outer')
+        with mock.patch.object(BatchView, 'dispatch_one', side_effect=dispatch_one):
+            results = BatchView().dispatch_reads(None, [{'path': '/a/'}, {'path': '/b/'}])
+        self.assertEqual([body for body, _ in results], [('outer', True), ('outer', True)])
+
+    def test_sub_requests_get_credentials_but_not_the_session(self):
+        outer = APIRequestFactory().post(self.batch_url, HTTP_COOKIE='sessionid=abc', HTTP_AUTHORIZATION='Bearer token')
+        outer.session = mock.Mock(session_key='abc')
+        request = Request(outer)
+        sub_request = BatchView.build_request(request, {'method': 'GET'}, urlsplit('/core/user/profile/'))
+        self.assertEqual(sub_request.META['HTTP_COOKIE'], 'sessionid=abc')
+        self.assertEqual(sub_request.META['HTTP_AUTHORIZATION'], 'Bearer token')
+        self.assertIsNone(sub_request.session.session_key)
+        self.assertFalse(sub_request.user.is_authenticated)
+
+    def test_token_refresh_can_be_batched(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.client.cookies[settings.REST_AUTH['JWT_AUTH_REFRESH_COOKIE']] = str(refresh)
+        response = self.client.post(self.batch_url, {'requests': [
+            {'method': 'POST', 'path': reverse('token_refresh')},
+        ]}, format='json')
+        result = response.json()['responses'][0]
+        self.assertEqual(result['status'], 200, result)
+        self.assertIn('access', result['body'])
@@ -0,0 +1,16 @@
+from django.test import SimpleTestCase
+
+from core.benchmark import find_regressions
+
+class FindRegressionsTestCase(SimpleTestCase):
+    baseline = {'login': {'throughput_rps': 100.0, 'p95_ms': 50.0}}
+
+    def test_within_threshold(self):
+        self.assertEqual(find_regressions(self.baseline, {'login': {'throughput_rps': 95.0, 'p95_ms': 54.0}}, 10), [])
+
+    def test_throughput_and_latency_regressions(self):
+        regressions = find_regressions(self.baseline, {'login': {'throughput_rps': 80.0, 'p95_ms': 60.0}}, 10)
+        self.assertEqual(len(regressions), 2)
+
+    def test_new_scenarios_are_ignored(self):
+        self.assertEqual(find_regressions(self.baseline, {'register': {'throughput_rps': 1.0, 'p95_ms': 999.0}}, 10), [])
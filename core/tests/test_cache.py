@@ -0,0 +1,101 @@
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.authentication import get_cached_user
+from core.cache import LocalLRU, TieredCache, cached, bump_version, bump_version_on_commit, get_version
+
+User = get_user_model()
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=LOCMEM_CACHES)
+class CacheTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(email='cache@example.com', first_name='Cache')
+        access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+        self.profile_url = reverse('user-profile')
+
+    @skipIf(settings.ASYNC_API_VIEWS, "The async profile view loads the user with the async ORM")
+    def test_profile_is_served_from_cache(self):
+        self.assertEqual(self.client.get(self.profile_url).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.profile_url)
+        self.assertEqual(response.json()['first_name'], 'Cache')
+
+    def test_profile_update_invalidates_cache(self):
+        self.client.get(self.profile_url)
+        response = self.client.patch(self.profile_url, {'first_name': 'Updated'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(self.profile_url).json()['first_name'], 'Updated')
+
+    def test_profile_field_selection_is_cached_separately(self):
+        self.assertIn('bio', self.client.get(self.profile_url).json())
+        self.assertEqual(self.client.get(self.profile_url, {'fields': 'id,first_name'}).json(), {'id': self.user.pk, 'first_name': 'Cache'})
+        self.assertNotIn('email', self.client.get(self.profile_url, {'omit': 'email'}).json())
+        self.assertEqual(self.client.get(self.profile_url, {'fields': 'nope'}).status_code, 400)
+
+    def test_auth_cache_holds_no_password_hash(self):
+        fields = get_cached_user(self.user.pk)
+        self.assertEqual(set(fields), {'pk', 'is_active', 'is_staff', 'is_superuser', 'password_marker'})
+        self.assertNotIn(self.user.password, fields.values())
+
+    def test_deactivation_is_seen_by_cached_authentication(self):
+        self.assertEqual(self.client.get(self.profile_url).status_code, 200)
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        self.assertEqual(self.client.get(self.profile_url).status_code, 401)
+
+    def test_version_is_bumped_again_on_commit(self):
+        with mock.patch('core.cache.bump_version') as bump:
+            with self.captureOnCommitCallbacks(execute=True):
+                bump_version_on_commit('test-scope')
+                self.assertEqual(bump.call_count, 1)
+        self.assertEqual(bump.call_count, 2)
+
+    def test_cached_decorator_scopes_and_querysets(self):
+        calls = []
+
+        @cached('test', key=lambda user_id: user_id, scope=lambda user_id: f'test-user:{user_id}')
+        def users(user_id):
+            calls.append(user_id)
+            return User.objects.filter(pk=user_id)
+
+        self.assertEqual(users(self.user.pk), [self.user])
+        self.assertEqual(users(self.user.pk), [self.user])
+        self.assertEqual(len(calls), 1)
+        bump_version(f'test-user:{self.user.pk}')
+        users(self.user.pk)
+        self.assertEqual(len(calls), 2)
+
+    def test_local_lru_evicts_least_recently_used(self):
+        lru = LocalLRU(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(lru.get('c'), 3)
+        self.assertEqual(len(lru._data), 2)
+        self.assertNotIn('b', lru._data)
+
+    def test_scope_version_is_read_from_redis_once_per_local_timeout(self):
+        tiered = TieredCache('redis://127.0.0.1:6379/1', {'OPTIONS': {'LOCAL_VERSION_TIMEOUT': 60}})
+        tiered.remote = mock.Mock(**{'get.return_value': 3})
+        with mock.patch('core.cache.cache', tiered):
+            self.assertEqual(get_version('test-scope'), 3)
+            self.assertEqual(get_version('test-scope'), 3)
+            self.assertEqual(tiered.remote.get.call_count, 1)
+
+            # A bump in this process is seen right away
+            tiered.remote.get.return_value = 4
+            bump_version('test-scope')
+            tiered.remote.incr.assert_called_once_with('version:test-scope')
+            self.assertEqual(get_version('test-scope'), 4)
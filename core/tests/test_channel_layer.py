@@ -0,0 +1,178 @@
+import asyncio
+import socket
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from channels_redis.core import RedisChannelLayer
+
+from core.channel_layer import HashRing, ShardedChannelLayer
+
+def redis_available(host='127.0.0.1', port=6379):
+    try:
+        socket.create_connection((host, port), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+# Nothing listens on these ports, so any Redis round trip fails
+UNREACHABLE_HOSTS = ['redis://127.0.0.1:1/0', 'redis://127.0.0.1:2/0', 'redis://127.0.0.1:3/0']
+
+class HashRingTestCase(SimpleTestCase):
+    keys = [f'user_{i}' for i in range(2000)]
+
+    def test_adding_a_node_moves_a_fraction_of_keys(self):
+        before = HashRing(['a', 'b', 'c'])
+        after = HashRing(['a', 'b', 'c', 'd'])
+        moved = [key for key in self.keys if before.lookup(key) != after.lookup(key)]
+        # About 1/4 of the keys should move, and only to the new node
+        self.assertLess(len(moved), len(self.keys) * 0.35)
+        self.assertTrue(all(after.lookup(key) == 3 for key in moved))
+
+    def test_skipped_node_only_remaps_its_own_keys(self):
+        ring = HashRing(['a', 'b', 'c'])
+        for key in self.keys:
+            primary = ring.lookup(key)
+            failover = ring.lookup(key, skip={1})
+            if primary == 1:
+                self.assertNotEqual(failover, 1)
+            else:
+                self.assertEqual(failover, primary)
+
+class FakeNode:
+    """
+    Stands in for one Redis node: group members from a shared dict, eval records the keys.
+    """
+    def __init__(self, groups, sent):
+        self.groups = groups
+        self.sent = sent
+        self.down = False
+
+    def pipeline(self, transaction):
+        return FakePipeline(self)
+
+    async def eval(self, script, numkeys, *args):
+        if self.down:
+            raise ConnectionError('refused')
+        self.sent.extend(args[:numkeys])
+        return 0
+
+class FakePipeline:
+    def __init__(self, node):
+        self.node = node
+        self.replies = []
+
+    def zremrangebyscore(self, key, min, max):
+        self.replies.append(0)
+
+    def zrange(self, key, start, end):
+        self.replies.append([channel.encode() for channel in self.node.groups.get(key, [])])
+
+    async def execute(self):
+        if self.node.down:
+            raise ConnectionError('refused')
+        return self.replies
+
+class ShardedChannelLayerTestCase(SimpleTestCase):
+    def make_layer(self, hosts=UNREACHABLE_HOSTS, **kwargs):
+        return ShardedChannelLayer(hosts=hosts, failover_cooldown=60, **kwargs)
+
+    def test_process_channels_share_a_node(self):
+        layer = self.make_layer()
+        self.assertEqual(layer.consistent_hash('specific.abc!one'), layer.consistent_hash('specific.abc!two'))
+        self.assertEqual(layer.consistent_hash('specific.abc!one'), layer.consistent_hash('specific.abc!'))
+
+    def test_failed_node_is_taken_off_the_ring(self):
+        layer = self.make_layer()
+        index = layer.consistent_hash('user_1')
+        with self.assertLogs('core.channel_layer', 'WARNING'):
+            layer.mark_down(index, ConnectionError('refused'))
+        self.assertNotEqual(layer.consistent_hash('user_1'), index)
+
+    def test_memberships_follow_the_group_when_the_ring_changes(self):
+        async def scenario():
+            layer = self.make_layer()
+            primary = layer.consistent_hash('user_1')
+            with mock.patch.object(RedisChannelLayer, 'group_add'), \
+                    mock.patch.object(layer, '_write_memberships', wraps=layer._write_memberships) as write, \
+                    mock.patch.object(layer, 'connection') as connection:
+                connection.return_value.zadd = mock.AsyncMock()
+                connection.return_value.expire = mock.AsyncMock()
+                await layer.group_add('user_1', 'specific.abc!one')
+                write.assert_not_called()
+
+                with self.assertLogs('core.channel_layer', 'WARNING'):
+                    layer.mark_down(primary, ConnectionError('refused'))
+                await layer.group_send_many([], {'type': 'test.message'})
+                fallback = layer.consistent_hash('user_1')
+                write.assert_called_once_with(fallback, 'user_1', {'specific.abc!one'})
+
+                # Cooldown over: the group hashes back and its members are re-added there
+                layer._down_until[primary] = 0
+                await layer.group_send_many([], {'type': 'test.message'})
+                write.assert_called_with(primary, 'user_1', {'specific.abc!one'})
+                self.assertEqual(layer._membership_nodes, {'user_1': primary})
+        asyncio.run(scenario())
+
+    def fake_nodes(self, layer, groups):
+        sent = []
+        groups = {layer._group_key(group): channels for group, channels in groups.items()}
+        nodes = [FakeNode(groups, sent) for _ in layer.hosts]
+        layer.connection = lambda index: nodes[index]
+        return nodes, sent
+
+    def test_group_send_many_reaches_each_channel_once(self):
+        layer = self.make_layer(local_delivery=False)
+        nodes, sent = self.fake_nodes(layer, {'user_1': ['chan.a', 'chan.c'], 'user_2': ['chan.b', 'chan.c']})
+        asyncio.run(layer.group_send_many(['user_1', 'user_2'], {'type': 'test.message'}))
+        self.assertEqual(sorted(sent), [layer.prefix + name for name in ('chan.a', 'chan.b', 'chan.c')])
+
+    def test_group_send_many_retries_a_failed_node_on_its_fallback(self):
+        layer = self.make_layer(local_delivery=False)
+        nodes, sent = self.fake_nodes(layer, {'user_1': ['chan.a'], 'user_2': ['chan.b']})
+        down = layer.consistent_hash('user_1')
+        nodes[down].down = True
+        with self.assertLogs('core.channel_layer', 'WARNING'):
+            asyncio.run(layer.group_send_many(['user_1', 'user_2'], {'type': 'test.message'}))
+        self.assertEqual(sorted(sent), [layer.prefix + 'chan.a', layer.prefix + 'chan.b'])
+        self.assertEqual(layer.down_nodes(), {down})
+
+    def test_group_send_many_raises_with_a_single_node(self):
+        layer = self.make_layer(hosts=UNREACHABLE_HOSTS[:1], local_delivery=False)
+        nodes, sent = self.fake_nodes(layer, {'user_1': ['chan.a']})
+        nodes[0].down = True
+        with self.assertRaises(ConnectionError):
+            asyncio.run(layer.group_send_many(['user_1'], {'type': 'test.message'}))
+        self.assertEqual(layer.down_nodes(), frozenset())
+
+    def test_local_channels_are_delivered_without_redis(self):
+        async def scenario():
+            layer = self.make_layer()
+            channel = await layer.new_channel()
+            receiver = asyncio.ensure_future(layer.receive(channel))
+            # Let the receiver register its buffer before sending
+            while channel not in layer.receive_buffer:
+                await asyncio.sleep(0)
+            await layer.send(channel, {'type': 'test.message', 'text': 'hi'})
+            return await asyncio.wait_for(receiver, 1)
+        self.assertEqual(asyncio.run(scenario()), {'type': 'test.message', 'text': 'hi'})
+
+@skipUnless(redis_available(), "Needs Redis on 127.0.0.1:6379")
+class ShardedChannelLayerRedisTestCase(SimpleTestCase):
+    def test_group_send_many_reaches_each_channel_once(self):
+        async def scenario():
+            layer = ShardedChannelLayer(hosts=['redis://127.0.0.1:6379/14', 'redis://127.0.0.1:6379/15'], local_delivery=False)
+            try:
+                channels = [await layer.new_channel() for _ in range(3)]
+                await layer.group_add('user_1', channels[0])
+                await layer.group_add('user_2', channels[1])
+                await layer.group_add('user_1', channels[2])
+                await layer.group_add('user_2', channels[2])
+                await layer.group_send_many(['user_1', 'user_2'], {'type': 'test.message'})
+                received = [await asyncio.wait_for(layer.receive(channel), 1) for channel in channels]
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(layer.receive(channels[2]), 0.2)
+                return received
+            finally:
+                await layer.flush()
+        self.assertEqual(asyncio.run(scenario()), [{'type': 'test.message'}] * 3)
@@ -0,0 +1,70 @@
+import json
+from unittest import mock
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser
+from django.test import SimpleTestCase, override_settings
+
+from core.consumers import IDLE_CLOSE_CODE, NotificationConsumer
+from core.metrics import registry
+from core.models import User
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    WEBSOCKET_HEARTBEAT_INTERVAL=3600,
+    WEBSOCKET_IDLE_TIMEOUT=7200,
+)
+class NotificationConsumerTestCase(SimpleTestCase):
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    def age(self, seconds):
+        for consumer in NotificationConsumer.connections.last_seen:
+            NotificationConsumer.connections.last_seen[consumer] -= seconds
+
+    async def test_anonymous_sockets_are_rejected(self):
+        _, connected = await self.connect(AnonymousUser())
+        self.assertFalse(connected)
+
+    async def test_quiet_sockets_are_pinged_and_answering_keeps_them(self):
+        communicator, connected = await self.connect(User(pk=1, email='ws@example.com'))
+        self.assertTrue(connected)
+        self.age(3601)
+        await NotificationConsumer.connections.check()
+        self.assertEqual(json.loads(await communicator.receive_from()), {'type': 'ping'})
+
+        await communicator.send_to(text_data=json.dumps({'type': 'pong'}))
+        await communicator.receive_nothing()
+        self.age(3601)
+        await NotificationConsumer.connections.check()
+        self.assertEqual(json.loads(await communicator.receive_from()), {'type': 'ping'})
+        self.assertEqual(len(NotificationConsumer.connections), 1)
+        await communicator.disconnect()
+        self.assertEqual(len(NotificationConsumer.connections), 0)
+
+    async def test_idle_sockets_are_closed_and_leave_their_group(self):
+        communicator, _ = await self.connect(User(pk=2, email='idle@example.com'))
+        self.age(7201)
+        await NotificationConsumer.connections.check()
+        self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': IDLE_CLOSE_CODE})
+        self.assertEqual(len(NotificationConsumer.connections), 0)
+        self.assertEqual(get_channel_layer().groups.get('user_2', {}), {})
+        await communicator.disconnect()
+
+    async def test_failed_heartbeat_leaves_the_group_and_updates_the_gauge(self):
+        communicator, _ = await self.connect(User(pk=3, email='broken@example.com'))
+        open_key = ('websocket_connections_open', (('consumer', 'notifications'),))
+        opened = registry.snapshot()[open_key]
+        self.age(3601)
+        with mock.patch.object(NotificationConsumer, 'ping', side_effect=OSError('broken pipe')), \
+                self.assertLogs('core.consumers', 'ERROR'):
+            await NotificationConsumer.connections.check()
+        self.assertEqual(len(NotificationConsumer.connections), 0)
+        self.assertEqual(get_channel_layer().groups.get('user_3', {}), {})
+        self.assertEqual(registry.snapshot()[open_key], opened - 1)
+        await communicator.disconnect()
+
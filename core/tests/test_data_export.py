@@ -0,0 +1,142 @@
+import io
+import json
+import os
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from allauth.account.models import EmailAddress
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.data_export import build_export
+from core.models import User, DataExport
+from core.workers import claim, requeue_stale_jobs
+
+@override_settings(SECURE_SSL_REDIRECT=False, CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class DataExportTestCase(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = User.objects.create(email='export@example.com', first_name='Export')
+        self.user.profile_picture.save('me.jpg', ContentFile(b'jpeg bytes'))
+        EmailAddress.objects.create(user=self.user, email=self.user.email, verified=True, primary=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_export_is_built_in_background_and_downloadable(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('user-data-export'))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], DataExport.PENDING)
+        message = async_to_sync(get_channel_layer().receive)(settings.ACCOUNT_TASKS_CHANNEL)
+        self.assertEqual(message, {'type': 'export.build', 'export_id': response.data['id']})
+
+        # A second request while the first is pending does not start another export
+        self.assertEqual(self.client.post(reverse('user-data-export')).data['id'], response.data['id'])
+
+        build_export(message['export_id'])
+        status = self.client.get(reverse('user-data-export')).data
+        self.assertEqual(status['status'], DataExport.READY)
+
+        download = self.client.get(status['download_url'])
+        self.assertEqual(download.status_code, 200)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(download.streaming_content)))
+        self.assertEqual(json.loads(archive.read('profile.json'))['first_name'], 'Export')
+        self.assertEqual(json.loads(archive.read('email_addresses.jsonl'))['email'], 'export@example.com')
+        self.assertEqual(archive.read('media/me.jpg'), b'jpeg bytes')
+
+    def test_download_is_owner_only(self):
+        export = DataExport.objects.create(user=self.user)
+        build_export(export.pk)
+        self.client.force_authenticate(User.objects.create(email='other@example.com'))
+        self.assertEqual(self.client.get(reverse('user-data-export-download', args=[export.pk])).status_code, 404)
+
+    def receive(self):
+        return async_to_sync(get_channel_layer().receive)(settings.ACCOUNT_TASKS_CHANNEL)
+
+    def test_lost_message_is_resent_instead_of_blocking_new_exports(self):
+        export = DataExport.objects.create(user=self.user, available_at=timezone.now() - timedelta(seconds=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('user-data-export'))
+        self.assertEqual(response.data['id'], export.pk)
+        self.assertEqual(self.receive(), {'type': 'export.build', 'export_id': export.pk})
+        # Re-sent at most once per lease
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+    def test_expired_lease_is_retried_then_given_up(self):
+        export = DataExport.objects.create(user=self.user)
+        for attempt in range(1, settings.ACCOUNT_JOB_MAX_ATTEMPTS + 1):
+            claimed = claim(DataExport, export.pk)
+            self.assertEqual(claimed.attempts, attempt)
+            DataExport.objects.filter(pk=export.pk).update(available_at=timezone.now())
+            with self.captureOnCommitCallbacks(execute=True):
+                requeue_stale_jobs()
+        export.refresh_from_db()
+        self.assertEqual(export.status, DataExport.FAILED)
+
+    def test_worker_that_lost_its_lease_does_not_write_the_result(self):
+        export = DataExport.objects.create(user=self.user)
+
+        def lose_lease(user, fileobj, renew):
+            fileobj.write(b'archive')
+            # The lease ran out and another worker claimed the export meanwhile
+            DataExport.objects.filter(pk=export.pk).update(status=DataExport.PENDING)
+            claim(DataExport, export.pk)
+            return True
+
+        with mock.patch('core.data_export.write_archive', side_effect=lose_lease):
+            build_export(export.pk)
+        export.refresh_from_db()
+        self.assertEqual((export.status, export.attempts), (DataExport.RUNNING, 2))
+        self.assertFalse(export.file)
+
+    def test_lease_is_renewed_after_each_section(self):
+        export = DataExport.objects.create(user=self.user)
+        leases = []
+
+        def expire_lease(user):
+            DataExport.objects.filter(pk=export.pk).update(available_at=timezone.now())
+            return iter(())
+
+        def record_lease(user):
+            leases.append(DataExport.objects.get(pk=export.pk).available_at)
+            return iter(())
+
+        with mock.patch('core.data_export.SECTIONS', [expire_lease, record_lease]):
+            build_export(export.pk)
+        self.assertGreater(leases[0], timezone.now() + timedelta(seconds=settings.ACCOUNT_JOB_LEASE - 60))
+        export.refresh_from_db()
+        self.assertEqual(export.status, DataExport.READY)
+
+    def test_export_stops_at_the_first_section_after_losing_its_lease(self):
+        export = DataExport.objects.create(user=self.user)
+        after_loss = mock.Mock(return_value=iter(()))
+
+        def lose_lease(user):
+            DataExport.objects.filter(pk=export.pk).update(status=DataExport.PENDING)
+            return iter(())
+
+        with mock.patch('core.data_export.SECTIONS', [lose_lease, after_loss]):
+            build_export(export.pk)
+        after_loss.assert_not_called()
+        export.refresh_from_db()
+        self.assertEqual(export.status, DataExport.PENDING)
+        self.assertFalse(export.file)
+
+    def test_sweeper_purges_expired_exports(self):
+        expired = DataExport.objects.create(user=self.user, status=DataExport.READY, expires_at=timezone.now() - timedelta(seconds=1))
+        expired.file.save('old.zip', ContentFile(b'zip'), save=True)
+        path = expired.file.path
+        call_command('requeue_account_jobs', stdout=io.StringIO())
+        self.assertFalse(DataExport.objects.filter(pk=expired.pk).exists())
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from allauth.account import signals
+from allauth.account.models import EmailAddress, EmailConfirmation
+from django.core import signing
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.adapters import CustomAccountAdapter
+from core.email_confirmation import StatelessEmailConfirmation
+from core.models import User
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class EmailConfirmationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post(reverse('rest_register'), {
+            'email': 'confirm@example.com',
+            'password1': 'testpassword123',
+            'password2': 'testpassword123',
+        })
+        self.email_address = EmailAddress.objects.get(email='confirm@example.com')
+        self.key = StatelessEmailConfirmation.for_email_address(self.email_address).key
+
+    def test_signup_writes_no_confirmation_row(self):
+        self.assertFalse(self.email_address.verified)
+        self.assertEqual(EmailConfirmation.objects.count(), 0)
+
+    def test_confirm_with_a_single_update(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('account_confirm_email', args=[self.key]))
+        self.assertEqual(response.status_code, 200)
+        self.email_address.refresh_from_db()
+        self.assertTrue(self.email_address.verified)
+        self.assertTrue(self.email_address.primary)
+
+        # The key cannot be used twice
+        response = self.client.get(reverse('account_confirm_email', args=[self.key]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_verify_email_endpoint(self):
+        response = self.client.post(reverse('rest_verify_email'), {'key': self.key})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(EmailAddress.objects.get(pk=self.email_address.pk).verified)
+
+    def test_keys_without_user_id_still_confirm(self):
+        key = signing.dumps([self.email_address.pk, self.email_address.email], salt=StatelessEmailConfirmation.salt, compress=True)
+        response = self.client.get(reverse('account_confirm_email', args=[key]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(EmailAddress.objects.get(pk=self.email_address.pk).verified)
+
+    def test_tampered_and_expired_keys_are_rejected(self):
+        response = self.client.get(reverse('account_confirm_email', args=[self.key[:-2] + 'xx']))
+        self.assertEqual(response.status_code, 400)
+        with override_settings(ACCOUNT_EMAIL_CONFIRMATION_EXPIRE_DAYS=-1):
+            self.assertIsNone(StatelessEmailConfirmation.from_key(self.key))
+        self.assertFalse(EmailAddress.objects.get(pk=self.email_address.pk).verified)
+
+    def test_email_verified_on_another_account_is_not_verified_again(self):
+        other = User.objects.create(email='other@example.com')
+        EmailAddress.objects.create(user=other, email='confirm@example.com', verified=True, primary=False)
+        response = self.client.get(reverse('account_confirm_email', args=[self.key]))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EmailAddress.objects.get(pk=self.email_address.pk).verified)
+
+    def test_confirmed_signal_is_sent(self):
+        received = []
+        handler = lambda sender, email_address, **kwargs: received.append(email_address.pk)
+        signals.email_confirmed.connect(handler)
+        self.addCleanup(signals.email_confirmed.disconnect, handler)
+        self.client.get(reverse('account_confirm_email', args=[self.key]))
+        self.assertEqual(received, [self.email_address.pk])
+
+    def test_adapter_override_is_used(self):
+        class Adapter(CustomAccountAdapter):
+            def confirm_email(self, request, email_address):
+                return False
+        with mock.patch('core.email_confirmation.get_adapter', return_value=Adapter()):
+            self.assertEqual(self.client.get(reverse('account_confirm_email', args=[self.key])).status_code, 400)
+        self.assertFalse(EmailAddress.objects.get(pk=self.email_address.pk).verified)
@@ -0,0 +1,105 @@
+import asyncio
+import tempfile
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import health
+
+INMEMORY_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+@override_settings(CHANNEL_LAYERS=INMEMORY_LAYERS, HEALTH_CHECK_CACHE_TTL=60, HEALTH_CHECK_TIMEOUT=0.5)
+class HealthCheckTestCase(TestCase):
+    def setUp(self):
+        health.readiness.clear()
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media.name))
+
+    def test_liveness_skips_the_middleware_chain(self):
+        # No SSL redirect or host validation for load balancer probes
+        with self.assertNumQueries(0):
+            response = self.client.get('/healthz', HTTP_HOST='10.0.0.7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+
+    def test_readiness_checks_dependencies(self):
+        response = self.client.get('/readyz', HTTP_HOST='10.0.0.7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()['checks']), {'database', 'channel_layer', 'media_storage'})
+        self.assertTrue(all(check['ok'] for check in response.json()['checks'].values()))
+
+    def test_readiness_is_cached(self):
+        self.client.get('/readyz')
+        with mock.patch.object(health, 'ping_database') as ping:
+            self.assertEqual(self.client.get('/readyz').status_code, 200)
+        ping.assert_not_called()
+
+    def test_failed_and_slow_checks_are_unavailable(self):
+        async def slow(timeout):
+            await asyncio.sleep(5)
+
+        def broken():
+            raise OSError('disk full')
+
+        with mock.patch.dict(health.CHECKS, {'channel_layer': slow}), mock.patch.object(health, 'touch_storage', broken):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        checks = response.json()['checks']
+        self.assertTrue(checks['database']['ok'])
+        self.assertEqual(checks['channel_layer']['error'], 'timeout')
+        self.assertEqual(checks['media_storage']['error'], 'OSError')
+        # The checks run concurrently, so the timeout is only paid once
+        self.assertLess(sum(check['ms'] for check in checks.values()), 2000)
+
+    def test_hung_probe_is_not_started_again(self):
+        release = threading.Event()
+        calls = []
+
+        def hung():
+            calls.append(1)
+            release.wait(5)
+
+        self.addCleanup(release.set)
+        with mock.patch.object(health, 'ping_database', hung):
+            first = self.client.get('/readyz').json()['checks']['database']
+            health.readiness.clear()
+            second = self.client.get('/readyz').json()['checks']['database']
+        self.assertEqual(first['error'], 'timeout')
+        self.assertEqual(second['error'], 'StillRunning')
+        self.assertEqual(len(calls), 1)
+
+class ChannelLayerCheckTestCase(SimpleTestCase):
+    class Layer:
+        hosts = [{'address': 'redis://a'}, {'address': 'redis://b'}]
+        ring_size = 2
+
+        def __init__(self, down):
+            self.down = down
+            self.marked = []
+
+        def connection(self, index):
+            async def ping():
+                if index in self.down:
+                    raise ConnectionError('refused')
+            return mock.Mock(ping=ping)
+
+    def check(self, layer):
+        with mock.patch.object(health, 'get_channel_layer', return_value=layer):
+            asyncio.run(health.check_channel_layer(1))
+
+    def test_plain_layer_needs_every_node(self):
+        with self.assertRaises(ConnectionError):
+            self.check(self.Layer(down={1}))
+
+    def test_sharded_layer_fails_over(self):
+        layer = self.Layer(down={1})
+        layer.mark_down = lambda index, error: layer.marked.append(index)
+        with self.assertLogs('core.health', 'WARNING'):
+            self.check(layer)
+        # The probe reports the node, it does not take it off the ring
+        self.assertEqual(layer.marked, [])
+        layer.down = {0, 1}
+        with self.assertRaises(ConnectionError):
+            self.check(layer)
@@ -0,0 +1,69 @@
+import io
+import json
+import logging
+import queue
+import sys
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from utils.custom_logging import AccessLogSampler, DeferredQueueHandler, JSONFormatter, get_console_handler
+
+def make_record(msg='GET %s', args=('/core/user/',), level=logging.INFO, exc_info=None, **extra):
+    record = logging.LogRecord('daphne.access', level, __file__, 1, msg, args, exc_info)
+    for name, value in extra.items():
+        setattr(record, name, value)
+    return record
+
+class JSONFormatterTestCase(SimpleTestCase):
+    def test_one_json_line_with_access_fields(self):
+        line = JSONFormatter().format(make_record(client='127.0.0.1:5000', status=200, length=None))
+        self.assertNotIn('\n', line)
+        entry = json.loads(line)
+        self.assertEqual(entry['message'], 'GET /core/user/')
+        self.assertEqual((entry['level'], entry['logger']), ('INFO', 'daphne.access'))
+        self.assertEqual((entry['client'], entry['status']), ('127.0.0.1:5000', 200))
+        self.assertNotIn('length', entry)
+
+    def test_exception_is_included(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = make_record(level=logging.ERROR, exc_info=sys.exc_info())
+        self.assertIn('ValueError: boom', json.loads(JSONFormatter().format(record))['exc_info'])
+
+class AccessLogSamplerTestCase(SimpleTestCase):
+    def test_errors_and_warnings_are_always_kept(self):
+        sampler = AccessLogSampler(rate=0)
+        self.assertTrue(sampler.filter(make_record(status=500)))
+        self.assertTrue(sampler.filter(make_record(status='404')))
+        self.assertTrue(sampler.filter(make_record(level=logging.WARNING, status=200)))
+
+    def test_successes_are_sampled(self):
+        sampler = AccessLogSampler(rate=0.25)
+        with mock.patch('utils.custom_logging.random.random', return_value=0.2):
+            self.assertTrue(sampler.filter(make_record(status=200)))
+        with mock.patch('utils.custom_logging.random.random', return_value=0.3):
+            self.assertFalse(sampler.filter(make_record(status=200)))
+        self.assertFalse(AccessLogSampler(rate=0).filter(make_record(status=200)))
+        self.assertTrue(AccessLogSampler(rate=5).filter(make_record(status=200)))
+
+class DeferredQueueHandlerTestCase(SimpleTestCase):
+    def test_message_is_merged_but_not_formatted(self):
+        log_queue = queue.SimpleQueue()
+        record = make_record()
+        DeferredQueueHandler(log_queue).emit(record)
+        queued = log_queue.get_nowait()
+        self.assertEqual((queued.msg, queued.args), ('GET /core/user/', None))
+        self.assertIsNot(queued, record)
+        self.assertEqual(record.args, ('/core/user/',))
+
+    def test_listener_writes_queued_records(self):
+        stream = io.StringIO()
+        # The console handler writes to the stderr it finds when built
+        with mock.patch('sys.stderr', stream), mock.patch('utils.custom_logging.atexit.register') as register:
+            handler = get_console_handler(fmt='json', use_queue=True)
+        stop_listener = register.call_args.args[0]
+        handler.handle(make_record(status=200))
+        stop_listener()     # Flushes the queue before returning
+        self.assertEqual(json.loads(stream.getvalue().splitlines()[0])['status'], 200)
@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import metrics
+
+User = get_user_model()
+
+@override_settings(SECURE_SSL_REDIRECT=False, METRICS_MULTIPROCESS_DIR=None, METRICS_AUTH_TOKEN=None)
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+        self.user = User.objects.create(email='metrics@example.com')
+        access_token = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token}')
+
+    def test_request_metrics_are_exposed_per_url_name(self):
+        self.client.get(reverse('user-profile'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",status="200",view="user-profile"} 1', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",view="user-profile"} 1', body)
+        self.assertIn('http_db_queries_count{view="user-profile"} 1', body)
+
+    def test_histogram_buckets_are_cumulative(self):
+        metrics.registry.observe('http_db_queries', 2, view='test')
+        metrics.registry.observe('http_db_queries', 7, view='test')
+        body = metrics.render(metrics.registry.snapshot())
+        self.assertIn('http_db_queries_bucket{view="test",le="2"} 1', body)
+        self.assertIn('http_db_queries_bucket{view="test",le="10"} 2', body)
+        self.assertIn('http_db_queries_bucket{view="test",le="+Inf"} 2', body)
+        self.assertIn('http_db_queries_sum{view="test"} 9', body)
+
+    @override_settings(METRICS_AUTH_TOKEN='secret')
+    def test_metrics_require_token_when_configured(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_snapshots_of_dead_processes_are_pruned(self):
+        dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+        dead.wait()
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            for pid in (os.getppid(), dead.pid):
+                Path(directory, f'{pid}.json').write_text(json.dumps([['websocket_connections_open', [['consumer', 'test']], 3]]))
+            metrics.flush()
+            self.assertTrue(Path(directory, f'{os.getpid()}.json').exists())
+            snapshot = metrics.collect()
+            self.assertEqual(snapshot[('websocket_connections_open', (('consumer', 'test'),))], 3)
+            self.assertFalse(Path(directory, f'{dead.pid}.json').exists())
+            metrics.remove_snapshot()
+            self.assertFalse(Path(directory, f'{os.getpid()}.json').exists())
@@ -0,0 +1,35 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import User
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LeanAPIMiddlewareTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(email='lean@example.com')
+
+    def test_api_route_skips_site_middleware(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        response = self.client.get(reverse('user-profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertNotIn('X-Frame-Options', response.headers)
+
+    def test_other_routes_keep_full_chain(self):
+        # dj-rest-auth's login relies on sessions and allauth
+        response = self.client.post(reverse('rest_login'), {'email': 'lean@example.com', 'password': 'wrong'})
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+        self.assertIn('X-Frame-Options', response.headers)
+
+    def test_sibling_account_routes_keep_full_chain(self):
+        for name in ['user-password-change', 'user-data-export', 'user-delete']:
+            response = self.client.post(reverse(name))
+            self.assertTrue(hasattr(response.wsgi_request, 'session'), name)
+            self.assertIn('X-Frame-Options', response.headers)
+
+    @override_settings(LEAN_API_PATHS=['/core/user/missing/'])
+    def test_lean_route_errors_still_become_responses(self):
+        self.assertEqual(self.client.get('/core/user/missing/').status_code, 404)
@@ -0,0 +1,92 @@
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import PaymentEvent
+from core.payments import claim_next, payment_event_received, process_available, process_event, sign_payload
+
+SECRET = 'whsec_test'
+
+def make_event(event_id, customer='cus_1', event_type='invoice.paid'):
+    return {'id': event_id, 'type': event_type, 'data': {'object': {'id': f'in_{event_id}', 'object': 'invoice', 'customer': customer}}}
+
+@override_settings(SECURE_SSL_REDIRECT=False, STRIPE_WEBHOOK_SECRET=SECRET, PAYMENT_EVENT_MAX_ATTEMPTS=2)
+class PaymentWebhookTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('payment-webhook')
+        self.handled = []
+
+    def post_event(self, event, secret=SECRET):
+        payload = json.dumps(event)
+        return self.client.post(self.url, payload, content_type='application/json', HTTP_STRIPE_SIGNATURE=sign_payload(payload, secret))
+
+    def handle(self, sender, event, **kwargs):
+        self.handled.append(event.event_id)
+
+    def test_invalid_signature_is_rejected(self):
+        response = self.post_event(make_event('evt_1'), secret='whsec_other')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_duplicate_deliveries_are_stored_once(self):
+        for _ in range(3):
+            self.assertEqual(self.post_event(make_event('evt_1')).status_code, 200)
+        event = PaymentEvent.objects.get()
+        self.assertEqual((event.event_id, event.customer_id, event.status), ('evt_1', 'cus_1', PaymentEvent.PENDING))
+
+    def test_events_are_processed_in_order_per_customer_with_retry(self):
+        failures = {'evt_1': 1}
+
+        def flaky(sender, event, **kwargs):
+            if failures.get(event.event_id):
+                failures[event.event_id] -= 1
+                raise RuntimeError('provider API down')
+            self.handled.append(event.event_id)
+
+        payment_event_received.connect(flaky)
+        self.addCleanup(payment_event_received.disconnect, flaky)
+        for event in [make_event('evt_1'), make_event('evt_2'), make_event('evt_3', customer='cus_2')]:
+            self.post_event(event)
+
+        with self.assertLogs('core.payments', 'WARNING'):
+            process_available()
+        # evt_2 waits for evt_1 of the same customer; the other customer is not held back
+        self.assertEqual(self.handled, ['evt_3'])
+        self.assertEqual(PaymentEvent.objects.get(event_id='evt_1').attempts, 1)
+
+        PaymentEvent.objects.update(available_at=PaymentEvent._meta.get_field('available_at').default())
+        process_available()
+        self.assertEqual(self.handled, ['evt_3', 'evt_1', 'evt_2'])
+        self.assertEqual(set(PaymentEvent.objects.values_list('status', flat=True)), {PaymentEvent.PROCESSED})
+
+    def test_event_gives_up_after_max_attempts(self):
+        def broken(sender, event, **kwargs):
+            raise RuntimeError('bug')
+
+        payment_event_received.connect(broken)
+        self.addCleanup(payment_event_received.disconnect, broken)
+        self.post_event(make_event('evt_1'))
+        for _ in range(2):
+            PaymentEvent.objects.update(available_at=PaymentEvent._meta.get_field('available_at').default())
+            with self.assertLogs('core.payments'):
+                process_available()
+        event = PaymentEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), (PaymentEvent.FAILED, 2))
+
+    def test_worker_that_lost_its_lease_does_not_write_the_result(self):
+        self.post_event(make_event('evt_1'))
+        stale = claim_next()
+        # The lease runs out and another worker claims the event
+        PaymentEvent.objects.update(available_at=PaymentEvent._meta.get_field('available_at').default())
+        claim_next()
+
+        payment_event_received.connect(self.handle)
+        self.addCleanup(payment_event_received.disconnect, self.handle)
+        with self.assertLogs('core.payments', 'WARNING'):
+            self.assertFalse(process_event(stale))
+        event = PaymentEvent.objects.get()
+        self.assertEqual((event.status, event.attempts), (PaymentEvent.PENDING, 2))
+
@@ -0,0 +1,63 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.http import HttpRequest
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import ProfilerRule, RequestProfile, User
+from core.profiler import Profile, active_rules, sampler
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+def busy_view(request, seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+@override_settings(SECURE_SSL_REDIRECT=False, CACHES=LOCMEM_CACHES, PROFILER_INTERVAL=0.001, PROFILER_MAX_PROFILES=2)
+class ProfilerTestCase(TestCase):
+    def setUp(self):
+        cache.clear()       # Rules cached by an earlier test outlive its rolled-back rows
+        self.addCleanup(setattr, active_rules, 'rules', [])
+        self.client = APIClient()
+        self.user = User.objects.create(email='profiled@example.com', is_staff=True, is_superuser=True)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        self.url = reverse('user-profile')
+
+    def test_requests_are_not_profiled_without_a_rule(self):
+        self.client.get(self.url)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_sampler_attributes_stacks_to_the_request(self):
+        profiled, other = HttpRequest(), HttpRequest()
+        profile = Profile(profiled)
+        sampler.start(profile)
+        threads = [threading.Thread(target=busy_view, args=(request, 0.05)) for request in (profiled, other)]
+        for thread in threads:
+            thread.start()
+        profile.threads.add(threads[0].ident)
+        for thread in threads:
+            thread.join()
+        sampler.stop(profile)
+        self.assertGreater(sum(profile.stacks.values()), 0)
+        # Only the profiled request's thread is sampled, and stacks run outermost first
+        self.assertEqual({stack[-1].co_name for stack in profile.stacks}, {'busy_view'})
+        self.assertIn('core/tests/test_profiler.py:busy_view', profile.collapsed())
+
+    def test_matching_requests_are_stored_in_a_ring_buffer(self):
+        ProfilerRule.objects.create(url_name='user-profile', method='GET')
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.patch(self.url, {'first_name': 'Not profiled'}, format='multipart')
+        profiles = RequestProfile.objects.all()
+        self.assertEqual(len(profiles), 2)
+        self.assertEqual({(p.method, p.url_name, p.status_code) for p in profiles}, {('GET', 'user-profile', 200)})
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:core_requestprofile_download', args=[profiles[0].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment', response['Content-Disposition'])
@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.metrics import record_query
+from core.models import User
+from core.querybudget import QueryBudgetExceeded, normalize_sql, query_budget
+
+class NormalizeSqlTestCase(TestCase):
+    def test_literals_and_lists_collapse(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x'  AND n > 3"),
+            normalize_sql("SELECT * FROM t WHERE id IN (%s) AND name = 'y' AND n > 42"),
+        )
+
+class QueryBudgetTestCase(TestCase):
+    def setUp(self):
+        for i in range(6):
+            User.objects.create(email=f'budget{i}@example.com')
+
+    def test_repeated_statement_is_flagged(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'possible N+1, 6 x'):
+            with query_budget(repeat_threshold=5):
+                for pk in User.objects.values_list('pk', flat=True):
+                    User.objects.get(pk=pk)
+
+    def test_budgets_share_the_metrics_recorder(self):
+        with query_budget(max_queries=1):
+            list(User.objects.all())
+        self.assertEqual(connection.execute_wrappers.count(record_query), 1)
+        self.assertEqual(len(connection.execute_wrappers), 1)
+
+    def test_within_budget(self):
+        with query_budget(max_queries=1, repeat_threshold=5) as recorder:
+            list(User.objects.all())
+        self.assertEqual(recorder.count, 1)
+
+@override_settings(SECURE_SSL_REDIRECT=False, QUERY_BUDGET_MODE='raise')
+class ViewQueryBudgetTestCase(TestCase):
+    """
+    Requests fail with QueryBudgetExceeded when a view exceeds its QUERY_BUDGETS entry.
+    """
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_flow_within_budgets(self):
+        response = self.client.post(reverse('rest_register'), {
+            'email': 'flow@example.com', 'password1': 'testpassword123', 'password2': 'testpassword123',
+            'first_name': 'Flow', 'last_name': 'User',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(User.objects.get(email='flow@example.com').first_name, 'Flow')
+        response = self.client.post(reverse('rest_login'), {'email': 'flow@example.com', 'password': 'testpassword123'})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get(reverse('user-profile')).status_code, 200)
+
+    @override_settings(QUERY_BUDGETS={'user-profile': {'GET': 0}})
+    def test_exceeding_budget_fails(self):
+        user = User.objects.create(email='over@example.com')
+        # Token authentication loads the user, which is one query over the budget
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        with self.assertRaises(QueryBudgetExceeded):
+            self.client.get(reverse('user-profile'))
@@ -0,0 +1,37 @@
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.models import User
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UniqueEmailTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create(email='me@example.com')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        User.objects.create(email='taken@example.com')
+        self.url = reverse('user-profile')
+
+    def test_emails_are_unique_ignoring_case(self):
+        with self.assertRaises(IntegrityError):
+            User.objects.create(email='TAKEN@example.com')
+
+    def test_taken_email_is_a_field_error(self):
+        response = self.client.patch(self.url, {'email': 'Taken@Example.com'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'email': ['This email is already in use.']})
+        self.assertEqual(User.objects.get(pk=self.user.pk).email, 'me@example.com')
+
+    def test_email_change_checks_uniqueness_in_the_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {'email': 'new@example.com'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.get(pk=self.user.pk).email, 'new@example.com')
+        # No uniqueness SELECT: the UPDATE is the only statement that touches the email
+        email_queries = [query['sql'] for query in queries if '"email" = ' in query['sql'] or 'UPPER' in query['sql']]
+        self.assertEqual(len(email_queries), 1)
+        self.assertTrue(email_queries[0].startswith('UPDATE'))
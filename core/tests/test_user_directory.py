@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UserDirectoryTestCase(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.staff = User.objects.create(email='staff@example.com', is_staff=True, date_joined=now - timedelta(days=30))
+        # Two users share a timestamp, so the id tie-breaker is exercised
+        for i in range(5):
+            User.objects.create(email=f'user{i}@example.com', first_name=f'Name{i}', date_joined=now - timedelta(days=i // 2))
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+        self.url = reverse('user-directory')
+
+    def test_requires_staff(self):
+        self.client.force_authenticate(User.objects.get(email='user0@example.com'))
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_keyset_pages_cover_every_user_once(self):
+        emails = []
+        url = f'{self.url}?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            emails += [row['email'] for row in response.data['results']]
+            url = response.data['next']
+        expected = list(User.objects.order_by('-date_joined', '-id').values_list('email', flat=True))
+        self.assertEqual(emails, expected)
+
+    def test_prefix_search_and_count(self):
+        response = self.client.get(self.url, {'search': 'name3', 'count': 'exact'})
+        self.assertEqual([row['email'] for row in response.data['results']], ['user3@example.com'])
+        self.assertEqual(response.data['count'], 1)
+        self.assertNotIn('count', self.client.get(self.url).data)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'garbage'}).status_code, 404)
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,email', 'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['results'][0]), ['id', 'email'])
+        select = next(q['sql'] for q in queries.captured_queries if 'FROM "core_user"' in q['sql'] and 'LIMIT' in q['sql'])
+        self.assertNotIn('"first_name"', select)
+        # Later pages keep the selection and still page on date_joined
+        self.assertIn('fields=id%2Cemail', response.data['next'])
+        self.assertEqual(list(self.client.get(response.data['next']).data['results'][0]), ['id', 'email'])
+
+    def test_omit_and_unknown_fields(self):
+        row = self.client.get(self.url, {'omit': 'date_joined,is_staff'}).data['results'][0]
+        self.assertEqual(list(row), ['id', 'email', 'first_name', 'last_name', 'is_active'])
+        response = self.client.get(self.url, {'fields': 'email,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
@@ -0,0 +1,92 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from allauth.account.models import EmailAddress
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.management.commands.import_users import Command as ImportCommand
+from core.models import User
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserImportExportTestCase(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def import_users(self, path, *args):
+        call_command('import_users', path, '--workers', '0', *args, stdout=StringIO(), stderr=StringIO())
+
+    def test_import_csv_hashes_plain_passwords(self):
+        path = self.write('users.csv', (
+            'email,password,first_name,is_staff,birth_date\n'
+            'a@example.com,secret123,Ann,true,1990-01-02\n'
+            'b@example.com,,Bob,false,\n'
+            'a@example.com,other,Dup,false,\n'
+        ))
+        self.import_users(path, '--verified', '--batch-size', '2')
+
+        ann = User.objects.get(email='a@example.com')
+        self.assertTrue(check_password('secret123', ann.password))
+        self.assertTrue(ann.is_staff)
+        self.assertEqual(str(ann.birth_date), '1990-01-02')
+        self.assertFalse(User.objects.get(email='b@example.com').has_usable_password())
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(EmailAddress.objects.filter(verified=True, primary=True).count(), 2)
+
+    def test_import_skips_emails_differing_only_in_case(self):
+        User.objects.create(email='Taken@example.com')
+        path = self.write('users.csv', (
+            'email,first_name\n'
+            'taken@EXAMPLE.com,Clash\n'
+            'new@example.com,New\n'
+            'NEW@example.com,Dup\n'
+        ))
+        self.import_users(path, '--batch-size', '3')
+        self.assertEqual(sorted(User.objects.values_list('email', flat=True)), ['Taken@example.com', 'new@example.com'])
+
+    def test_import_skips_emails_inserted_concurrently(self):
+        path = self.write('users.csv', (
+            'email,first_name\n'
+            'race@example.com,Race\n'
+            'calm@example.com,Calm\n'
+        ))
+        User.objects.create(email='RACE@example.com')
+        existing = ImportCommand.existing
+        checks = []
+
+        def stale_first_check(command, unique):
+            # Another import committed RACE@example.com between the check and the insert
+            checks.append(unique)
+            return set() if len(checks) == 1 else existing(command, unique)
+
+        stderr = StringIO()
+        with mock.patch.object(ImportCommand, 'existing', stale_first_check):
+            call_command('import_users', path, '--workers', '0', '--verified', '--progress-every', '1', stdout=StringIO(), stderr=stderr)
+        self.assertEqual(len(checks), 2)
+        self.assertEqual(sorted(User.objects.values_list('email', flat=True)), ['RACE@example.com', 'calm@example.com'])
+        self.assertEqual(EmailAddress.objects.get().email, 'calm@example.com')
+        self.assertIn('Imported: 1 rows', stderr.getvalue())
+
+    def test_export_then_import_round_trip(self):
+        user = User.objects.create(email='round@example.com', first_name='Round')
+        user.set_password('trip12345')
+        user.save()
+        path = os.path.join(self.tmpdir.name, 'users.jsonl')
+        call_command('export_users', path, '--format', 'jsonl', '--with-password-hashes', stderr=StringIO())
+
+        User.objects.all().delete()
+        self.import_users(path, '--format', 'jsonl')
+
+        imported = User.objects.get(email='round@example.com')
+        self.assertEqual(imported.first_name, 'Round')
+        self.assertTrue(imported.check_password('trip12345'))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 # from dj_rest_auth.views import PasswordResetConfirmView
 # from rest_framework_simplejwt.views import (
@@ -7,6 +8,16 @@ from django.urls import path, include
 
 from core import views
 
+# Serve the hot user endpoints from async-native views when enabled (see ASYNC_API_VIEWS)
+if settings.ASYNC_API_VIEWS:
+    profile_view = views.AsyncUserProfileView
+    password_change_view = views.AsyncUserPasswordChangeView
+    password_reset_view = views.AsyncUserPasswordResetView
+else:
+    profile_view = views.UserProfileView
+    password_change_view = views.UserPasswordChangeView
+    password_reset_view = views.UserPasswordResetView
+
 urlpatterns = [
     # Note: The following URLs are automatically included by dj-rest-auth and don't need to be explicitly defined:
     # Login:                     /auth/login/ (POST)                        rest_login
@@ -22,12 +33,29 @@ urlpatterns = [
     # Password Reset Complete:   /auth/password/reset/complete/ (POST)      rest_password_reset_complete
 
     path('auth/', include('dj_rest_auth.urls')),
+    # Listed before the dj-rest-auth registration URLs so it takes over rest_verify_email
+    path('auth/registration/verify-email/', views.CustomVerifyEmailView.as_view(), name='rest_verify_email'),
     path('auth/registration/', include('dj_rest_auth.registration.urls')),
     # Custom auth-related views
     path('auth/account-confirm-email/<str:key>/', views.CustomConfirmEmailView.as_view(), name='account_confirm_email'),
 
     # User profile
-    path('user/profile/', views.UserProfileView.as_view(), name='user-profile'),
+    path('user/profile/', profile_view.as_view(), name='user-profile'),
+    path('user/password/change/', password_change_view.as_view(), name='user-password-change'),
+    path('user/password/reset/', password_reset_view.as_view(), name='user-password-reset'),
+    path('user/export/', views.DataExportView.as_view(), name='user-data-export'),
+    path('user/export/<int:pk>/download/', views.DataExportDownloadView.as_view(), name='user-data-export-download'),
+    path('user/delete/', views.AccountDeletionView.as_view(), name='user-delete'),
+
+    # Staff user directory
+    path('users/', views.UserDirectoryView.as_view(), name='user-directory'),
+
+    # Payment provider webhooks
+    path('payments/webhook/', views.payment_webhook_view, name='payment-webhook'),
+
+    # Batch of API calls in a single round trip
+    path('batch/', views.BatchView.as_view(), name='batch'),
+
     # Override the default password reset confirm view
     # This is necessary because dj-rest-auth doesn't provide a default URL for this view
     # path('auth/password/reset/confirm/<uidb64>/<token>/', PasswordResetConfirmView.as_view(), name='password_reset_confirm'),
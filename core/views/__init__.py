@@ -1,9 +1,27 @@
 from .user import UserProfileView, UserPasswordChangeView, UserPasswordResetView
-from .auth import CustomConfirmEmailView
+from .async_user import AsyncUserProfileView, AsyncUserPasswordChangeView, AsyncUserPasswordResetView
+from .auth import CustomConfirmEmailView, CustomVerifyEmailView
+from .metrics import metrics_view
+from .batch import BatchView
+from .directory import UserDirectoryView
+from .export import DataExportView, DataExportDownloadView
+from .account import AccountDeletionView
+from .payments import payment_webhook_view
 
 __all__ = [
     'UserProfileView',
     'UserPasswordChangeView',
     'UserPasswordResetView',
+    'AsyncUserProfileView',
+    'AsyncUserPasswordChangeView',
+    'AsyncUserPasswordResetView',
     'CustomConfirmEmailView',
+    'CustomVerifyEmailView',
+    'metrics_view',
+    'BatchView',
+    'UserDirectoryView',
+    'DataExportView',
+    'DataExportDownloadView',
+    'AccountDeletionView',
+    'payment_webhook_view',
 ]
\ No newline at end of file
@@ -0,0 +1,21 @@
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..account_deletion import schedule_deletion
+from ..serializers import AccountDeletionSerializer
+
+class AccountDeletionView(APIView):
+    """
+    API view for deleting the user's own account.
+
+    The account is deactivated immediately; its data and media are deleted afterwards by
+    the account worker.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = AccountDeletionSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        deletion = schedule_deletion(request.user)
+        return Response({'message': 'Account scheduled for deletion', 'id': deletion.pk}, status=status.HTTP_202_ACCEPTED)
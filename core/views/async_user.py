@@ -0,0 +1,153 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import aupdate_session_auth_hash
+from django.contrib.auth.forms import PasswordResetForm
+from django.db import close_old_connections
+from django.http import JsonResponse, QueryDict
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions, status
+
+from ..authentication import CachedUser, aauthenticate
+from ..models import User
+from ..serializers import UserFullSerializer, UserInfoUpdateSerializer, UserCredentialsUpdateSerializer, UserPasswordChangeSerializer, save_unique
+from .user import UserProfileView, save_profile_picture, remove_profile_picture, send_password_reset_email
+
+import logging
+logger = logging.getLogger(__name__)
+
+async def run_off_loop(func, *args, **kwargs):
+    """
+    Run blocking CPU or I/O work (hashing, PIL, file writes, SMTP) on the shared thread
+    pool, so it neither blocks the event loop nor queues behind the thread used by the ORM.
+    """
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return await sync_to_async(call, thread_sensitive=False)()
+
+def parse_body(request):
+    """
+    Parse JSON, multipart and urlencoded bodies for any method; Django itself only
+    populates request.POST and request.FILES for POST.
+    """
+    content_type = request.content_type or ''
+    if content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            raise exceptions.ParseError()
+    if content_type == 'multipart/form-data':
+        post, files = request.parse_file_upload(request.META, request)
+        data = post.copy()
+        data.update(files)
+        return data
+    return QueryDict(request.body, encoding=request.encoding)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAPIView(View):
+    """
+    Minimal async counterpart of DRF's APIView for hot endpoints: JWT authentication,
+    optional authenticated-only access and DRF-style JSON errors, all on the event loop.
+    """
+    authentication_required = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            user = await aauthenticate(request)
+            if isinstance(user, CachedUser):
+                # Lazy attributes would query the database from the event loop
+                user = await User.objects.aget(pk=user.pk)
+            if user is None and self.authentication_required:
+                raise exceptions.NotAuthenticated()
+            if user is not None:
+                request.user = user
+            return await super().dispatch(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+            return JsonResponse(detail, status=exc.status_code, safe=False)
+
+class AsyncUserProfileView(AsyncAPIView):
+    """
+    Async version of UserProfileView.
+
+    This view allows authenticated users to:
+    - GET their own profile information
+    - PUT to fully update their profile
+    - PATCH to partially update their profile
+    """
+    async def get(self, request):
+        return JsonResponse(UserFullSerializer(request.user, context={'request': request}).data)
+
+    async def put(self, request):
+        return await self.update(request, partial=False)
+
+    async def patch(self, request):
+        return await self.update(request, partial=True)
+
+    async def update(self, request, partial):
+        data = parse_body(request)
+        instance = request.user
+        serializer_class = UserCredentialsUpdateSerializer if 'email' in data else UserInfoUpdateSerializer
+        serializer = serializer_class(instance, data=data, partial=partial, context={'request': request})
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = dict(serializer.validated_data)
+        if 'profile_picture' in validated_data:
+            file = validated_data.pop('profile_picture')
+            if file is None:
+                if instance.profile_picture:
+                    await run_off_loop(remove_profile_picture, instance)
+                    instance.profile_picture = None
+                    logger.info(f"Removed profile picture for user: {instance.email}")
+            else:
+                logger.info(f"Received file: {file.name}, size: {file.size}, content type: {file.content_type}")
+                processed_image = await run_off_loop(UserProfileView.process_image, file)
+                instance.profile_picture = await run_off_loop(save_profile_picture, processed_image)
+                logger.info(f"Saved processed profile picture to: {instance.profile_picture.name}")
+
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Raises a field error if the new email is taken
+        await sync_to_async(save_unique)(instance)
+        return JsonResponse(serializer.data)
+
+class AsyncUserPasswordChangeView(AsyncAPIView):
+    """
+    Async version of UserPasswordChangeView. Password hashing runs off the event loop.
+    """
+    async def post(self, request):
+        serializer = UserPasswordChangeSerializer(data=parse_body(request), context={'request': request})
+        if not await run_off_loop(serializer.is_valid):
+            logger.warning(f"Invalid password change attempt for user: {request.user.email}")
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        user = request.user
+        await run_off_loop(user.set_password, serializer.validated_data['new_password'])
+        await user.asave()
+        if hasattr(request, 'session'):
+            await aupdate_session_auth_hash(request, user)
+        logger.info(f"Password changed successfully for user: {user.email}")
+        return JsonResponse({'message': 'Password changed successfully'}, status=status.HTTP_200_OK)
+
+class AsyncUserPasswordResetView(AsyncAPIView):
+    """
+    Async version of UserPasswordResetView. The email is rendered and sent off the event loop.
+    """
+    authentication_required = False
+
+    async def post(self, request):
+        data = parse_body(request)
+        form = PasswordResetForm(data)
+        if form.is_valid():
+            user = await User.objects.filter(email=form.cleaned_data['email']).afirst()
+            if user is not None:
+                await run_off_loop(send_password_reset_email, user)
+                logger.info(f"Password reset email sent to: {user.email}")
+                return JsonResponse({'message': 'Password reset email sent'}, status=status.HTTP_200_OK)
+        logger.warning(f"Invalid password reset attempt for email: {data.get('email')}")
+        return JsonResponse({'error': 'Invalid email'}, status=status.HTTP_400_BAD_REQUEST)
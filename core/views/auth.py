@@ -1,15 +1,46 @@
 from allauth.account.views import ConfirmEmailView
 from allauth.account.utils import send_email_confirmation
-from django.http import JsonResponse
+from dj_rest_auth.registration.views import VerifyEmailView
+from django.conf import settings
+from django.http import Http404, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.response import Response
+
+from ..email_confirmation import StatelessEmailConfirmation
+
+class StatelessConfirmationMixin:
+    """
+    Resolves confirmation keys with StatelessEmailConfirmation when EMAIL_CONFIRMATION_STATELESS
+    is on, so looking up the key costs no query.
+    """
+    def get_object(self, queryset=None):
+        if not settings.EMAIL_CONFIRMATION_STATELESS:
+            return super().get_object(queryset)
+        confirmation = StatelessEmailConfirmation.from_key(self.kwargs['key'])
+        if confirmation is None:
+            raise Http404()
+        return confirmation
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CustomConfirmEmailView(ConfirmEmailView):
+class CustomConfirmEmailView(StatelessConfirmationMixin, ConfirmEmailView):
     def get(self, *args, **kwargs):
         try:
             self.object = self.get_object()
-            self.object.confirm(self.request)
+            if not self.object.confirm(self.request):
+                raise Http404()
             return JsonResponse({"success": True, "message": "Email successfully confirmed"})
         except Exception as e:
-            return JsonResponse({"success": False, "message": str(e)}, status=400)
\ No newline at end of file
+            return JsonResponse({"success": False, "message": str(e)}, status=400)
+
+class CustomVerifyEmailView(StatelessConfirmationMixin, VerifyEmailView):
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.kwargs['key'] = serializer.validated_data['key']
+        confirmation = self.get_object()
+        if not confirmation.confirm(self.request):
+            raise Http404()
+        return Response({'detail': _('ok')}, status=status.HTTP_200_OK)
@@ -0,0 +1,150 @@
+import contextvars
+import json
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import resolve, Resolver404
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..serializers import BatchRequestSerializer
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Request headers that describe the outer body and must not leak into sub-requests.
+# Cookie and Authorization are forwarded: sub-requests authenticate through the view's
+# own authenticators, and token refresh reads the httponly refresh cookie.
+EXCLUDED_META = {'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'}
+
+_executor = None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix='batch')
+    return _executor
+
+def release_connections():
+    """
+    Keep a worker's database connections open for its next sub-request, at most one per
+    worker, unless a transaction was left open or the connection broke.
+    """
+    for connection in connections.all(initialized_only=True):
+        if connection.in_atomic_block or not connection.get_autocommit() or (connection.errors_occurred and not connection.is_usable()):
+            connection.close()
+
+class BatchView(APIView):
+    """
+    API view for running several API calls in a single round trip.
+
+    Sub-requests are dispatched directly through the URLconf: the middleware chain runs
+    once, for the batch request. Each sub-request carries the batch request's cookies and
+    Authorization header and is authenticated by its view as usual, but gets a fresh
+    session. Consecutive GETs run concurrently; any other method runs on its own, in
+    order, so later calls see its effects. Responses are returned in request order.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = []
+        pending_reads = []
+        for item in serializer.validated_data['requests']:
+            if item['method'] == 'GET':
+                pending_reads.append(item)
+                continue
+            results.extend(self.dispatch_reads(request, pending_reads))
+            pending_reads = []
+            results.append(self.dispatch_one(request, item))
+        results.extend(self.dispatch_reads(request, pending_reads))
+
+        response = Response({'responses': [body for body, _ in results]}, status=status.HTTP_200_OK)
+        for _, cookies in results:
+            response.cookies.update(cookies)
+        return response
+
+    def dispatch_reads(self, request, items):
+        if len(items) <= 1 or settings.BATCH_MAX_WORKERS <= 1:
+            return [self.dispatch_one(request, item) for item in items]
+        # Each sub-request runs in a copy of this request's context (metrics, query budgets)
+        futures = [
+            get_executor().submit(contextvars.copy_context().run, self.dispatch_threaded, request, item)
+            for item in items
+        ]
+        return [future.result() for future in futures]
+
+    def dispatch_threaded(self, request, item):
+        try:
+            return self.dispatch_one(request, item)
+        finally:
+            release_connections()
+
+    def dispatch_one(self, request, item):
+        url = urlsplit(item['path'])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return {'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Not found.'}}, {}
+        if getattr(match.func, 'view_class', None) is type(self):
+            return {'status': status.HTTP_400_BAD_REQUEST, 'body': {'detail': 'Batch requests cannot be nested.'}}, {}
+
+        sub_request = self.build_request(request, item, url)
+        sub_request.resolver_match = match
+        try:
+            view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+            response = view(sub_request, *match.args, **match.kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        except Exception:
+            logger.exception(f"Batch sub-request failed: {item['method']} {item['path']}")
+            return {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'detail': 'Server error.'}}, {}
+
+        return {
+            'status': response.status_code,
+            'body': self.decode_body(response),
+        }, response.cookies
+
+    @staticmethod
+    def build_request(request, item, url):
+        outer = request._request
+        body = b''
+        if item.get('body') is not None:
+            body = json.dumps(item['body']).encode()
+        environ = {key: value for key, value in outer.META.items() if isinstance(value, str) and key not in EXCLUDED_META}
+        environ.update({
+            'REQUEST_METHOD': item['method'],
+            'PATH_INFO': url.path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+            'wsgi.url_scheme': outer.scheme,
+        })
+        sub_request = WSGIRequest(environ)
+
+        # A fresh, never saved session for views that expect one; the outer session is not
+        # shared, so plain Django views see no session user. DRF views replace the user
+        # with the one their authenticators find in the forwarded headers.
+        sub_request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        sub_request.user = AnonymousUser()
+        return sub_request
+
+    @staticmethod
+    def decode_body(response):
+        if response.streaming or not response.content:
+            return None
+        if response.get('Content-Type', '').startswith('application/json'):
+            return json.loads(response.content)
+        return response.content.decode(response.charset or 'utf-8', errors='replace')
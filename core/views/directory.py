@@ -0,0 +1,48 @@
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Upper
+from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+
+from ..models import User
+from ..pagination import KeysetPagination
+from ..serializers import UserDirectorySerializer
+
+SEARCH_FIELDS = ['email', 'first_name', 'last_name']
+
+class UserDirectoryView(generics.ListAPIView):
+    """
+    Staff-only API view for listing and searching users.
+
+    Query parameters:
+    - search: matches email, first or last name
+    - mode: 'prefix' (default, case-insensitive) or 'fuzzy' (trigram word similarity)
+    - cursor, page_size, count: see KeysetPagination
+    - fields, omit: comma-separated fields to include or leave out
+    """
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = UserDirectorySerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        # The pagination keys are always loaded, for the cursor
+        queryset = User.objects.only(*UserDirectorySerializer.model_fields(self.request, required=['id', 'date_joined']))
+        search = self.request.query_params.get('search', '').strip()
+        if not search:
+            return queryset
+
+        mode = self.request.query_params.get('mode', 'prefix')
+        if mode == 'prefix':
+            lookup = 'startswith'
+        elif mode == 'fuzzy':
+            # Trigram operators are PostgreSQL-only
+            lookup = 'trigram_word_similar' if connection.vendor == 'postgresql' else 'contains'
+        else:
+            raise ValidationError({'mode': "Expected 'prefix' or 'fuzzy'."})
+
+        # Filter on UPPER(column) so the trigram GIN indexes on the same expressions apply
+        queryset = queryset.alias(**{f'{field}_upper': Upper(field) for field in SEARCH_FIELDS})
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f'{field}_upper__{lookup}': search.upper()})
+        return queryset.filter(condition)
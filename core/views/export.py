@@ -0,0 +1,52 @@
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..models import DataExport
+from ..serializers import DataExportSerializer
+from ..workers import enqueue, lease_end, requeue_stale_jobs
+
+import logging
+logger = logging.getLogger(__name__)
+
+class DataExportView(APIView):
+    """
+    API view for requesting a download of the user's data.
+
+    - POST starts a new export in the background (or returns the one already in progress,
+      re-sending it to the worker if it is stale); a `data_export_ready` notification is
+      sent over the notifications socket when done
+    - GET returns the status of the latest export
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        export = request.user.data_exports.order_by('-created_at').first()
+        if export is None:
+            raise NotFound('No data export has been requested.')
+        return Response(DataExportSerializer(export, context={'request': request}).data)
+
+    def post(self, request):
+        requeue_stale_jobs(['export.build'], user=request.user)
+        export = request.user.data_exports.filter(status__in=[DataExport.PENDING, DataExport.RUNNING]).first()
+        if export is None:
+            export = DataExport.objects.create(user=request.user, available_at=lease_end())
+            enqueue('export.build', export_id=export.pk)
+            logger.info(f"Data export {export.pk} requested by user: {request.user.email}")
+        return Response(DataExportSerializer(export, context={'request': request}).data, status=status.HTTP_202_ACCEPTED)
+
+class DataExportDownloadView(APIView):
+    """
+    API view streaming a ready data export archive to its owner.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        export = get_object_or_404(DataExport, pk=pk, user=request.user, status=DataExport.READY)
+        if export.expires_at and export.expires_at < timezone.now():
+            raise NotFound('This data export has expired.')
+        return FileResponse(export.file.open('rb'), as_attachment=True, filename=f'data-export-{export.pk}.zip')
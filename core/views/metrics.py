@@ -0,0 +1,18 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .. import metrics
+
+def metrics_view(request):
+    """
+    Exposes request, database and WebSocket metrics in Prometheus text format,
+    aggregated across every process writing to METRICS_MULTIPROCESS_DIR.
+    """
+    token = getattr(settings, 'METRICS_AUTH_TOKEN', None)
+    if token:
+        provided = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(provided, token):
+            return HttpResponse(status=401)
+    return HttpResponse(metrics.render(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,44 @@
+import json
+
+import stripe
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from ..metrics import registry
+from ..payments import store_event, verify_signature
+
+import logging
+logger = logging.getLogger(__name__)
+
+@csrf_exempt
+@require_POST
+def payment_webhook_view(request):
+    """
+    Receives payment provider webhooks: verifies the signature, stores the raw event
+    once and answers 200. Processing happens in the payment worker (see core.payments).
+    """
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        logger.error("Payment webhook received but STRIPE_WEBHOOK_SECRET is not set")
+        # The provider keeps retrying until the endpoint is configured
+        return JsonResponse({'error': 'Webhook not configured'}, status=503)
+
+    payload = request.body.decode('utf-8', errors='replace')
+    try:
+        verify_signature(payload, request.headers.get('Stripe-Signature'))
+        event = json.loads(payload)
+        event_id, event_type = event['id'], event['type']
+    except stripe.SignatureVerificationError as e:
+        registry.inc('payment_webhooks_total', result='bad_signature')
+        logger.warning(f"Payment webhook with invalid signature: {e}")
+        return JsonResponse({'error': 'Invalid signature'}, status=400)
+    except (ValueError, KeyError, TypeError):
+        registry.inc('payment_webhooks_total', result='invalid')
+        return JsonResponse({'error': 'Invalid payload'}, status=400)
+
+    created = store_event(event)
+    registry.inc('payment_webhooks_total', result='stored' if created else 'duplicate')
+    if not created:
+        logger.info(f"Duplicate payment event {event_type} {event_id}")
+    return JsonResponse({'received': True})
@@ -2,7 +2,6 @@ from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.parsers import MultiPartParser, FormParser
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
 from django.conf import settings
 from django.core.mail import send_mail
@@ -14,8 +13,10 @@ from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.forms import PasswordResetForm
 from django.template.loader import render_to_string
 
+from ..authentication import CachedJWTAuthentication
+from ..cache import cached, user_scope
 from ..models import User
-from ..serializers import UserFullSerializer, UserInfoUpdateSerializer, UserCredentialsUpdateSerializer, UserPasswordChangeSerializer
+from ..serializers import UserFullSerializer, UserInfoUpdateSerializer, UserCredentialsUpdateSerializer, UserPasswordChangeSerializer, requested_fields
 
 import os
 import uuid
@@ -24,6 +25,15 @@ from io import BytesIO
 import logging
 logger = logging.getLogger(__name__)
 
+def profile_key(request, user):
+    # Keyed by site root as well, since the profile picture URL is absolute
+    selected = requested_fields(request, UserFullSerializer.Meta.fields)
+    return f"{request.build_absolute_uri('/')}|{'*' if selected is None else ','.join(selected)}"
+
+@cached('user-profile', key=profile_key, scope=lambda request, user: user_scope(user.pk))
+def serialize_profile(request, user):
+    return UserFullSerializer(user, context={'request': request}).data
+
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """
     API view for retrieving and updating user profiles.
@@ -34,7 +44,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     - PATCH to partially update their profile
     """
     permission_classes = [permissions.IsAuthenticated]
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [CachedJWTAuthentication]
     parser_classes = (MultiPartParser, FormParser)
 
     def get_serializer_class(self):
@@ -46,6 +56,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         return self.request.user
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(serialize_profile(request, self.get_object()))
     
     @staticmethod
     def process_image(file):
@@ -94,34 +107,42 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
             if file is None or file == '':
                 # Remove the existing profile picture
                 if instance.profile_picture:
-                    # Delete the file from storage
-                    if os.path.isfile(instance.profile_picture.path):
-                        os.remove(instance.profile_picture.path)
+                    remove_profile_picture(instance)
                     # Clear the field
                     instance.profile_picture = None
                     instance.save()
                     logger.info(f"Removed profile picture for user: {instance.username}")
             elif isinstance(file, InMemoryUploadedFile):
-                # Process and save the new profile picture
-                # Ensure the upload directory exists
-                upload_dir = os.path.join(settings.MEDIA_ROOT, 'profile_pics')
-                os.makedirs(upload_dir, exist_ok=True)
-
-                # Save the processed image
-                filename = file.name
-                full_path = os.path.join(upload_dir, filename)
-
-                with open(full_path, 'wb') as destination:
-                    for chunk in file.chunks():
-                        destination.write(chunk)
-
                 # Update the profile_picture field with the new path
-                relative_path = os.path.join('profile_pics', filename)
+                relative_path = save_profile_picture(file)
                 instance.profile_picture = relative_path
                 instance.save()
 
                 logger.info(f"Saved processed profile picture to: {relative_path}")
-    
+
+def save_profile_picture(file):
+    """
+    Write a processed profile picture under MEDIA_ROOT/profile_pics and return its relative path.
+    """
+    # Ensure the upload directory exists
+    upload_dir = os.path.join(settings.MEDIA_ROOT, 'profile_pics')
+    os.makedirs(upload_dir, exist_ok=True)
+
+    # Save the processed image
+    filename = file.name
+    full_path = os.path.join(upload_dir, filename)
+
+    with open(full_path, 'wb') as destination:
+        for chunk in file.chunks():
+            destination.write(chunk)
+
+    return os.path.join('profile_pics', filename)
+
+def remove_profile_picture(instance):
+    # Delete the file from storage
+    if os.path.isfile(instance.profile_picture.path):
+        os.remove(instance.profile_picture.path)
+
 class UserPasswordChangeView(APIView):
     """
     API view for changing user password.
@@ -134,7 +155,9 @@ class UserPasswordChangeView(APIView):
             user = request.user
             user.set_password(serializer.validated_data['new_password'])
             user.save()
-            update_session_auth_hash(request, user)
+            # Routes in LEAN_API_PATHS run without sessions
+            if hasattr(request, 'session'):
+                update_session_auth_hash(request, user)
             logger.info(f"Password changed successfully for user: {user.email}")
             return Response({'message': 'Password changed successfully'}, status=status.HTTP_200_OK)
         logger.warning(f"Invalid password change attempt for user: {request.user.email}")
@@ -151,20 +174,23 @@ class UserPasswordResetView(APIView):
             users = User.objects.filter(email=email)
             if users.exists():
                 user = users.first()
-                subject = 'Password Reset Requested'
-                email_template_name = 'password_reset_email.txt'
-                c = {
-                    "email": user.email,
-                    'domain': 'localhost:8000',  # Change this to your domain
-                    'site_name': 'Your Site',
-                    "uid": urlsafe_base64_encode(force_bytes(user.pk)),
-                    "user": user,
-                    'token': default_token_generator.make_token(user),
-                    'protocol': 'https',
-                }
-                email = render_to_string(email_template_name, c)
-                send_mail(subject, email, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
+                send_password_reset_email(user)
                 logger.info(f"Password reset email sent to: {user.email}")
                 return Response({'message': 'Password reset email sent'}, status=status.HTTP_200_OK)
         logger.warning(f"Invalid password reset attempt for email: {request.data.get('email')}")
-        return Response({'error': 'Invalid email'}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        return Response({'error': 'Invalid email'}, status=status.HTTP_400_BAD_REQUEST)
+
+def send_password_reset_email(user):
+    subject = 'Password Reset Requested'
+    email_template_name = 'password_reset_email.txt'
+    c = {
+        "email": user.email,
+        'domain': 'localhost:8000',  # Change this to your domain
+        'site_name': 'Your Site',
+        "uid": urlsafe_base64_encode(force_bytes(user.pk)),
+        "user": user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https',
+    }
+    email = render_to_string(email_template_name, c)
+    send_mail(subject, email, settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=False)
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Background account jobs, consumed from the ACCOUNT_TASKS_CHANNEL channel by
+`python manage.py runworker account-tasks` (see the "channel" route in config/asgi.py).
+
+Channel messages are only a wake-up call: they expire, are dropped when the channel is
+full and are lost when Redis or the worker restarts. The job row is the source of truth.
+A worker claims a pending row for ACCOUNT_JOB_LEASE seconds, and requeue_stale_jobs()
+(`python manage.py requeue_account_jobs`) re-sends pending rows that nobody claimed within
+a lease and puts back running rows whose lease ran out, up to ACCOUNT_JOB_MAX_ATTEMPTS.
+"""
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.consumer import SyncConsumer
+from channels.layers import get_channel_layer
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+import logging
+logger = logging.getLogger(__name__)
+
+# Message type -> (job model, payload key holding its pk)
+JOBS = {
+    'export.build': ('core.DataExport', 'export_id'),
+    'account.delete': ('core.AccountDeletion', 'deletion_id'),
+}
+REQUEUE_BATCH = 100
+
+def send(message_type, **payload):
+    async_to_sync(get_channel_layer().send)(settings.ACCOUNT_TASKS_CHANNEL, {'type': message_type, **payload})
+
+def enqueue(message_type, **payload):
+    """
+    Send a job message once the current transaction commits, so the worker sees the row.
+    """
+    transaction.on_commit(lambda: send(message_type, **payload))
+
+def lease_end():
+    return timezone.now() + timedelta(seconds=settings.ACCOUNT_JOB_LEASE)
+
+def claim(model, pk, **fields):
+    """
+    Move a pending job to running for one lease. Returns the claimed job, or None if it was
+    already claimed, finished or gone.
+    """
+    claimed = model.objects.filter(pk=pk, status=model.PENDING).update(
+        status=model.RUNNING, attempts=F('attempts') + 1, available_at=lease_end(), **fields,
+    )
+    return model.objects.get(pk=pk) if claimed else None
+
+def leased(job):
+    """
+    The job's row while `job` still holds the lease it was claimed with: filter on it to
+    renew the lease or write a result, so a worker that lost its lease cannot.
+    """
+    return type(job).objects.filter(pk=job.pk, status=job.RUNNING, attempts=job.attempts)
+
+def requeue_stale_jobs(message_types=None, **filters):
+    """
+    Give up on running jobs that ran out of attempts, put back the ones whose lease expired
+    and re-send pending ones not claimed within a lease. Returns how many were re-sent.
+    """
+    requeued = 0
+    for message_type in message_types or JOBS:
+        label, key = JOBS[message_type]
+        model = apps.get_model(label)
+        now = timezone.now()
+        expired = model.objects.filter(status=model.RUNNING, available_at__lte=now, **filters)
+        failed = expired.filter(attempts__gte=settings.ACCOUNT_JOB_MAX_ATTEMPTS).update(status=model.FAILED, finished_at=now)
+        if failed:
+            logger.warning(f"Gave up on {failed} {message_type} job(s) after {settings.ACCOUNT_JOB_MAX_ATTEMPTS} attempts")
+        expired.update(status=model.PENDING)
+
+        stale = model.objects.filter(status=model.PENDING, available_at__lte=now, **filters)
+        for pk in stale.order_by('available_at').values_list('pk', flat=True)[:REQUEUE_BATCH]:
+            if model.objects.filter(pk=pk, status=model.PENDING, available_at__lte=now).update(available_at=lease_end()):
+                enqueue(message_type, **{key: pk})
+                requeued += 1
+    if requeued:
+        logger.info(f"Re-sent {requeued} stale account job(s)")
+    return requeued
+
+class AccountTaskConsumer(SyncConsumer):
+    """
+    Runs one job at a time per worker process; scale by running more workers.
+    Handlers run through database_sync_to_async, which also closes stale connections.
+    """
+    def export_build(self, message):
+        # Imported here: this module is loaded by config.asgi before the app registry is ready
+        from .data_export import build_export
+        build_export(message['export_id'])
+
+    def account_delete(self, message):
+        from .account_deletion import delete_account
+        delete_account(message['deletion_id'])
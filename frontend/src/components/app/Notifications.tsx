@@ -1,7 +1,9 @@
 /// <reference types="node" />
 import React, { useEffect, useState } from 'react';
+import { answerHeartbeats } from '@lib/websocket';
 
 interface Notification {
+  type?: string;
   notification: string;
 }
 
@@ -12,8 +14,12 @@ const Notifications: React.FC = () => {
 
   useEffect(() => {
     const ws = new WebSocket(process.env.REACT_APP_WS_URL + '/ws/notifications/');
+    answerHeartbeats(ws);
     ws.onmessage = (e) => {
       const data: Notification = JSON.parse(e.data);
+      if (data.type === 'ping') {
+        return;
+      }
       setNotifications((prevNotifications) => [...prevNotifications, data.notification]);
     };
     setSocket(ws);
@@ -3,6 +3,7 @@ let socket: WebSocket | null = null;
 export const initializeWebSocket = () => {
   if (!socket) {
     socket = new WebSocket((process.env.REACT_APP_WS_URL as string) + '/ws/notifications/');
+    answerHeartbeats(socket);
   }
   return socket;
 };
@@ -15,3 +16,12 @@ export const closeWebSocket = () => {
     socket = null;
   }
 };
+
+// The server closes sockets that stay silent; answer its pings so idle tabs stay connected
+export const answerHeartbeats = (ws: WebSocket) => {
+  ws.addEventListener('message', (event) => {
+    if (JSON.parse(event.data).type === 'ping') {
+      ws.send(JSON.stringify({ type: 'pong' }));
+    }
+  });
+};
@@ -1,4 +1,10 @@
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
 from colorama import Fore, Style, init
 
 init(autoreset=True)
@@ -24,8 +30,82 @@ class ColoredFormatter(logging.Formatter):
 
         return formatted_msg
 
+class JSONFormatter(logging.Formatter):
+    """
+    Formats each record as a single JSON line, suitable for log shippers.
+    Access-log fields attached through `extra` are emitted as top-level keys.
+    """
+    EXTRA_FIELDS = ('client', 'request', 'status', 'length')
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'message': record.getMessage(),
+        }
+        for field in self.EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class AccessLogSampler(logging.Filter):
+    """
+    Keeps a random `rate` fraction of successful access-log records.
+    Records with a 4xx/5xx status or a level of WARNING and above are always kept.
+    """
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, float(rate)))
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        status = getattr(record, 'status', None)
+        if status is not None and int(status) >= 400:
+            return True
+        return random.random() < self.rate
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that only merges the message arguments on the calling thread.
+    Formatting (colors, JSON, tracebacks) is left to the handler behind the QueueListener.
+    """
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+FORMATTERS = {
+    'color': lambda: ColoredFormatter('%(levelname)s %(asctime)s %(module)s - %(message)s'),
+    'json': lambda: JSONFormatter(),
+}
+
 def get_colored_console_handler():
     console_handler = logging.StreamHandler()
     colored_formatter = ColoredFormatter('%(levelname)s %(asctime)s %(module)s - %(message)s')
     console_handler.setFormatter(colored_formatter)
-    return console_handler
\ No newline at end of file
+    return console_handler
+
+def get_console_handler(fmt='color', use_queue=False):
+    """
+    Build the console handler used by settings.LOGGING.
+
+    With `use_queue`, records are pushed to an in-memory queue and a QueueListener
+    thread formats and writes them, keeping stream I/O off the request thread.
+    """
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(FORMATTERS[fmt]())
+    if not use_queue:
+        return console_handler
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return DeferredQueueHandler(log_queue)
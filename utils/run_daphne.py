@@ -14,13 +14,12 @@ django.setup()
 
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from daphne.access import AccessLogGenerator
 from daphne.cli import CommandLineInterface
 from daphne.server import Server
 from django.core.management import execute_from_command_line
 import threading
 import logging
-from custom_logging import get_colored_console_handler
-import logging
 
 class ReloadHandler(FileSystemEventHandler):
     def __init__(self, callback):
@@ -40,37 +39,35 @@ class ReloadHandler(FileSystemEventHandler):
 def restart_daphne():
     os.execv(sys.executable, [sys.executable] + sys.argv)
 
-def configure_logging():
-    # Remove all handlers from the root logger
-    for handler in logging.root.handlers[:]:
-        logging.root.removeHandler(handler)
-
-    # Configure the colored console handler
-    handler = get_colored_console_handler()
+class LoggingAccessLogGenerator(AccessLogGenerator):
+    """
+    Sends Daphne access-log entries to the 'daphne.access' logger instead of writing
+    them to stdout, so they go through the configured handlers, formatters and sampler.
+    """
+    logger = logging.getLogger('daphne.access')
 
-    # Set up the root logger
-    logging.root.setLevel(logging.INFO)
-    logging.root.addHandler(handler)
+    def __init__(self):
+        super().__init__(stream=None)
 
-    # Set up the Daphne logger
-    daphne_logger = logging.getLogger('daphne')
-    daphne_logger.setLevel(logging.INFO)
-    daphne_logger.addHandler(handler)
+    def write_entry(self, host, date, request, status=None, length=None, ident=None, user=None):
+        self.logger.info(
+            f"{host} \"{request}\" {status or '-'} {length or '-'}",
+            extra={'client': host, 'request': request, 'status': status, 'length': length},
+        )
 
-    # Prevent the Daphne logger from propagating to the root logger
-    daphne_logger.propagate = False
+class LoggingServer(Server):
+    def __init__(self, *args, action_logger=None, **kwargs):
+        if action_logger is not None:
+            action_logger = LoggingAccessLogGenerator()
+        super().__init__(*args, action_logger=action_logger, **kwargs)
 
-    # Set up the Django logger
-    django_logger = logging.getLogger('django')
-    django_logger.setLevel(logging.INFO)
-    django_logger.addHandler(handler)
+class LoggingCommandLineInterface(CommandLineInterface):
+    server_class = LoggingServer
 
-    # Set up the Twisted logger
-    twisted_logger = logging.getLogger('twisted')
-    twisted_logger.setLevel(logging.INFO)
-    twisted_logger.addHandler(handler)
-
-    return daphne_logger
+def configure_logging():
+    # Handlers, formatters and the access-log sampler are set up by Django from
+    # settings.LOGGING during django.setup(), so only Daphne's logger is needed here
+    return logging.getLogger('daphne')
 
 def run_daphne():
     os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
@@ -97,7 +94,7 @@ def run_daphne():
     observer.start()
 
     def run_daphne_server():
-        cli = CommandLineInterface()
+        cli = LoggingCommandLineInterface()
         cli.run([
             "-e", "ssl:8000:privateKey=ssl/localhost.key:certKey=ssl/localhost.crt",
             "--access-log", "-",